@@ -1,5 +1,11 @@
 import { DashboardFilters } from "./interfaces";
 import { DateTime } from "luxon";
+import axios from "axios";
+import { Extent } from "ol/extent";
+import { Projection } from "ol/proj";
+import { LoadFunction } from "ol/Tile";
+import TileState from "ol/TileState";
+import VectorTile from "ol/VectorTile";
 const qs = require("qs");
 
 export function filtersToQuerystring(filters: DashboardFilters): string {
@@ -17,3 +23,77 @@ export function dateTimeToFilterParam(dt: DateTime | null): string | null {
 export function formatCount(val: number): string {
   return new Intl.NumberFormat().format(val);
 }
+
+// Keep in sync with views.maps.BATCH_MAX_TILES
+const BATCH_MAX_TILES = 64;
+
+interface PendingTile {
+  tile: VectorTile;
+  extent: Extent;
+  projection: Projection;
+}
+
+// tileLoadFunction for the observation layers (VectorTileSource): the tiles requested by OpenLayers in the same frame
+// are grouped by zoom level, and fetched at once from the batch endpoint (batchUrlTemplate has a {z} placeholder)
+export function batchedTileLoadFunction(
+  batchUrlTemplate: string,
+  filtersQuerystring: string
+): LoadFunction {
+  let pendingTiles: PendingTile[] = [];
+
+  const fetchPendingTiles = function (): void {
+    const tilesPerZoom: { [zoom: string]: PendingTile[] } = {};
+    for (const pendingTile of pendingTiles) {
+      const zoom = pendingTile.tile.getTileCoord()[0].toString();
+      (tilesPerZoom[zoom] = tilesPerZoom[zoom] || []).push(pendingTile);
+    }
+    pendingTiles = [];
+
+    for (const [zoom, tiles] of Object.entries(tilesPerZoom)) {
+      for (let i = 0; i < tiles.length; i += BATCH_MAX_TILES) {
+        const batch = tiles.slice(i, i + BATCH_MAX_TILES);
+        const tilesQuerystring = batch
+          .map((t) => "tiles[]=" + t.tile.getTileCoord().slice(1).join("/"))
+          .join("&");
+        axios
+          .get(
+            batchUrlTemplate.replace("{z}", zoom) +
+              "?" +
+              tilesQuerystring +
+              "&" +
+              filtersQuerystring
+          )
+          .then((response) => {
+            for (const { tile, extent, projection } of batch) {
+              const key = tile.getTileCoord().join("/");
+              const bytes = Uint8Array.from(
+                atob(response.data.tiles[key]),
+                (c) => c.charCodeAt(0)
+              );
+              tile.setFeatures(
+                tile.getFormat().readFeatures(bytes.buffer, {
+                  extent: extent,
+                  featureProjection: projection,
+                })
+              );
+            }
+          })
+          .catch(() => {
+            for (const { tile } of batch) {
+              tile.setState(TileState.ERROR);
+            }
+          });
+      }
+    }
+  };
+
+  return function (tile) {
+    const vectorTile = tile as VectorTile;
+    vectorTile.setLoader(function (extent, resolution, projection) {
+      if (pendingTiles.length === 0) {
+        window.setTimeout(fetchPendingTiles, 0);
+      }
+      pendingTiles.push({ tile: vectorTile, extent, projection });
+    });
+  };
+}
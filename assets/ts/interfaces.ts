@@ -48,6 +48,9 @@ export interface DataImportInformation {
   id: number;
   str: string;
   startTimestamp: string; // Format: "2022-01-21T11:31:35.490Z"
+  importedObservationsCounter: number;
+  skippedObservationsCounter: number;
+  skippedObservationsByReason: { [reason: string]: number }; // Reasons: see import_observations.row_skip_reason()
 }
 
 export interface EndpointsUrls {
@@ -57,6 +60,8 @@ export interface EndpointsUrls {
   dataImportsListUrl: string;
   tileServerAggregatedUrlTemplate: string; // On this URL, observations are aggregated per hexagon
   tileServerUrlTemplate: string; // On this URL, observations are *not* aggregated
+  tileServerAggregatedBatchUrlTemplate: string; // Several tiles at once, see helpers.batchedTileLoadFunction()
+  tileServerBatchUrlTemplate: string;
   areasUrlTemplate: string;
   observationsCounterUrl: string;
   observationsJsonUrl: string;
@@ -1,4 +1,5 @@
 from django.contrib.gis import admin
+from django.utils.html import format_html, format_html_join
 from django.contrib.auth.admin import UserAdmin
 from import_export import resources  # type: ignore
 from import_export.admin import ImportExportModelAdmin  # type: ignore
@@ -61,7 +62,49 @@ class SpeciesAdmin(ImportExportModelAdmin):
 
 @admin.register(DataImport)
 class DataImportAdmin(admin.ModelAdmin):
-    list_display = ("pk", "start", "imported_observations_counter")
+    list_display = (
+        "pk",
+        "start",
+        "imported_observations_counter",
+        "rows_per_second",
+        "peak_memory_mb",
+    )
+    readonly_fields = ["stage_metrics_report", "skipped_observations_report"]
+
+    @admin.display(description="Rows/s")
+    def rows_per_second(self, obj):
+        return (obj.stage_metrics or {}).get("rows_per_second")
+
+    @admin.display(description="Peak memory (MB)")
+    def peak_memory_mb(self, obj):
+        return (obj.stage_metrics or {}).get("peak_memory_mb")
+
+    @admin.display(description="Time per stage")
+    def stage_metrics_report(self, obj):
+        if not obj.stage_metrics:
+            return "-"
+        return format_html(
+            "<ul>{}</ul>",
+            format_html_join(
+                "",
+                "<li>{}: {}s</li>",
+                (
+                    (stage["name"], stage["seconds"])
+                    for stage in obj.stage_metrics["stages"]
+                ),
+            ),
+        )
+
+    @admin.display(description="Skipped observations per reason")
+    def skipped_observations_report(self, obj):
+        if not obj.skipped_observations_by_reason:
+            return "-"
+        return format_html(
+            "<ul>{}</ul>",
+            format_html_join(
+                "", "<li>{}: {}</li>", obj.skipped_observations_by_reason.items()
+            ),
+        )
 
 
 @admin.register(Dataset)
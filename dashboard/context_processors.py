@@ -9,7 +9,9 @@ from dashboard.utils import human_readable_git_version_number
 
 def latest_data_import_processor(_: HttpRequest):
     try:
-        data_import: Optional[DataImport] = DataImport.objects.latest("id")
+        data_import: Optional[DataImport] = DataImport.objects.filter(
+            staging=False
+        ).latest("id")
     except DataImport.DoesNotExist:
         data_import = None
     return {
@@ -0,0 +1,76 @@
+import multiprocessing
+import resource
+import time
+from multiprocessing.connection import Connection
+from typing import Tuple
+
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from dwca.read import DwCAReader  # type: ignore
+
+from .helpers import StreamingDwCAReader, receive_from_child_process
+from .import_observations import parse_row
+
+READERS = {
+    "extracting (DwCAReader)": DwCAReader,
+    "streaming (StreamingDwCAReader)": StreamingDwCAReader,
+}
+
+
+def _read_and_parse(reader_name: str, dwca_path: str, results: Connection) -> None:
+    """Read and parse all core rows of the archive, then send (rows, seconds, peak RSS increase in kB)
+
+    Runs in its own process, so peak RSS measurements of the different readers don't interfere.
+    """
+    try:
+        baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        rows_counter = 0
+        with READERS[reader_name](dwca_path) as dwca:
+            for core_row in dwca:
+                parse_row(core_row)
+                rows_counter = rows_counter + 1
+        elapsed = time.perf_counter() - start
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results.send((rows_counter, elapsed, peak_rss - baseline_rss))
+    except Exception as e:
+        results.send(e)
+        raise
+
+
+def measure(reader_name: str, dwca_path: str) -> Tuple[int, float, int]:
+    context = multiprocessing.get_context("fork")
+    receiving_end, sending_end = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_read_and_parse, args=(reader_name, dwca_path, sending_end)
+    )
+    process.start()
+    results = receive_from_child_process(process, receiving_end)
+    process.join()
+    if isinstance(results, Exception):
+        raise CommandError(
+            f"Reading {dwca_path} with the {reader_name} reader failed: {results}"
+        )
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the time and peak memory usage (RSS) of the DwC-A readers when reading and parsing all rows of the "
+        "given archives (nothing is written to the database). Run it on archives of increasing size: the peak RSS "
+        "of the streaming reader should stay flat."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "dwca_paths", nargs="+", help="Path(s) to zipped DwC-A file(s)"
+        )
+
+    def handle(self, *args, **options) -> None:
+        for dwca_path in options["dwca_paths"]:
+            self.stdout.write(dwca_path)
+            for reader_name in READERS:
+                rows_counter, elapsed, rss_increase = measure(reader_name, dwca_path)
+                self.stdout.write(
+                    f"  {reader_name}: {rows_counter} rows in {elapsed:.2f}s "
+                    f"({rows_counter / elapsed:.0f} rows/s), peak RSS +{rss_increase / 1024:.1f} MB"
+                )
@@ -0,0 +1,229 @@
+import multiprocessing
+import random
+import resource
+import tempfile
+import time
+from io import StringIO
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Dict, Any
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from django.db import connection, connections
+
+from dashboard.models import (
+    DataImport,
+    Observation,
+    ObservationComment,
+    ObservationView,
+    User,
+)
+from .generate_synthetic_dwca import (
+    SyntheticDwcaOptions,
+    write_synthetic_dwca,
+    add_synthetic_dwca_arguments,
+    species_weights_from_options,
+)
+from .helpers import receive_from_child_process
+
+DEFAULT_ROWS = [10_000, 100_000]
+DEFAULT_LINKED_RATIO = 0.05
+BENCHMARK_USERNAME = "benchmark_import_observations"
+
+
+class QueriesCounter(object):
+    """Count the queries sent to the database (to be used with connection.execute_wrapper())"""
+
+    def __init__(self) -> None:
+        self.counter = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counter = self.counter + 1
+        return execute(sql, params, many, context)
+
+
+def _run_import(
+    dwca_path: str, import_options: Dict[str, Any], results: Connection
+) -> None:
+    """Import the DwC-A, then send (seconds, queries, peak RSS increase in kB, DataImport.stage_metrics)
+
+    Runs in its own process, so peak RSS measurements of the different imports don't interfere.
+    """
+    try:
+        baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        queries_counter = QueriesCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries_counter):
+            with open(dwca_path, "rb") as dwca_file:
+                call_command(
+                    "import_observations",
+                    source_dwca=dwca_file,
+                    stdout=StringIO(),
+                    **import_options,
+                )
+        elapsed = time.perf_counter() - start
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stage_metrics = DataImport.objects.latest("pk").stage_metrics
+        results.send(
+            (elapsed, queries_counter.counter, peak_rss - baseline_rss, stage_metrics)
+        )
+    except Exception as e:
+        results.send(e)
+        raise
+    finally:
+        connections.close_all()
+
+
+def add_comments_and_views(ratio: float, batch_size: int = 5000) -> int:
+    """Add a comment and a view (by the benchmark user) to this ratio of the observations, return their number
+
+    Observations are picked at random (with a fixed seed), so the re-import migrates a realistic number of them.
+    """
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    observation_ids = sorted(Observation.objects.values_list("pk", flat=True))
+    picked_ids = random.Random(0).sample(
+        observation_ids, round(len(observation_ids) * ratio)
+    )
+    for i in range(0, len(picked_ids), batch_size):
+        batch_ids = picked_ids[i : i + batch_size]
+        ObservationComment.objects.bulk_create(
+            ObservationComment(
+                observation_id=observation_id, author=user, text="Benchmark comment"
+            )
+            for observation_id in batch_ids
+        )
+        ObservationView.objects.bulk_create(
+            ObservationView(observation_id=observation_id, user=user)
+            for observation_id in batch_ids
+        )
+    return len(picked_ids)
+
+
+def measure(dwca_path: str, import_options: Dict[str, Any]) -> tuple:
+    # The database connection can't be shared with the forked process: it will open its own
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    receiving_end, sending_end = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_run_import, args=(dwca_path, import_options, sending_end)
+    )
+    process.start()
+    results = receive_from_child_process(process, receiving_end)
+    process.join()
+    if isinstance(results, Exception):
+        raise CommandError(f"The import of {dwca_path} failed: {results}")
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the performance of import_observations on synthetic DwC-A files of increasing size (see "
+        "generate_synthetic_dwca). For each size, an archive is imported, then a second one that shares most of its "
+        "stable_ids (so observations are replaced and comments/views migrated: --linked-ratio of the observations get a "
+        "comment and a view before the second import). Wall time, number of queries, peak memory usage (RSS) and the "
+        "time spent in each stage are reported. "
+        "WARNING: all observations in the database are replaced, only run this on a development database."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=DEFAULT_ROWS,
+            help=f"Size(s) of the generated archives (default: {' '.join(str(r) for r in DEFAULT_ROWS)})",
+        )
+        add_synthetic_dwca_arguments(parser)
+        parser.add_argument(
+            "--linked-ratio",
+            type=float,
+            default=DEFAULT_LINKED_RATIO,
+            help="Proportion of the observations that get a comment and a view before the re-import, so it measures "
+            f"their migration (default: {DEFAULT_LINKED_RATIO})",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, help="Passed to import_observations"
+        )
+        parser.add_argument("--workers", type=int, help="Passed to import_observations")
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--zero-downtime",
+            action="store_true",
+            help="Passed to import_observations",
+        )
+        mode.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Passed to import_observations",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask for confirmation before replacing the observations",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["interactive"]:
+            confirm = input(
+                "This will replace ALL the observations in the database by synthetic ones. Type 'yes' to continue: "
+            )
+            if confirm != "yes":
+                raise CommandError("Benchmark cancelled.")
+
+        species_weights = species_weights_from_options(options)
+        import_options = {
+            name: options[name]
+            for name in ("batch_size", "workers")
+            if options[name] is not None
+        }
+        for name in ("zero_downtime", "incremental"):
+            if options[name]:
+                import_options[name] = True
+
+        with tempfile.TemporaryDirectory() as archives_dir:
+            for rows in options["rows"]:
+                self.stdout.write(f"{rows} rows")
+                runs = [
+                    ("initial import", 0),
+                    (
+                        f"re-import ({options['replaced_ratio']:.0%} of the stable_ids already imported)",
+                        1,
+                    ),
+                ]
+                for run_name, seed in runs:
+                    dwca_path = str(Path(archives_dir) / f"synthetic_{rows}_{seed}.zip")
+                    write_synthetic_dwca(
+                        dwca_path,
+                        SyntheticDwcaOptions(
+                            rows=rows,
+                            species_weights=species_weights,
+                            datasets=options["datasets"],
+                            missing_coordinates_ratio=options[
+                                "missing_coordinates_ratio"
+                            ],
+                            replaced_ratio=options["replaced_ratio"],
+                            seed=seed,
+                        ),
+                    )
+                    if seed > 0:
+                        linked_counter = add_comments_and_views(options["linked_ratio"])
+                        self.stdout.write(
+                            f"  {linked_counter} observations commented and viewed"
+                        )
+                    elapsed, queries, rss_increase, stage_metrics = measure(
+                        dwca_path, import_options
+                    )
+                    self.stdout.write(
+                        f"  {run_name}: {elapsed:.2f}s ({rows / elapsed:.0f} rows/s), {queries} queries, "
+                        f"peak RSS +{rss_increase / 1024:.1f} MB"
+                    )
+                    self.stdout.write(
+                        "    "
+                        + ", ".join(
+                            f"{stage['name']}: {stage['seconds']:.2f}s"
+                            for stage in stage_metrics["stages"]
+                        )
+                    )
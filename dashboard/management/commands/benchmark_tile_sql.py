@@ -0,0 +1,105 @@
+import time
+from typing import Callable, Dict, Tuple
+
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from jinjasql import JinjaSql
+
+from dashboard.utils import readable_string
+from dashboard.views.maps import (
+    JINJASQL,
+    SQL_OBSERVATIONS_TILE,
+    SQL_TEMPLATE_OBSERVATIONS_TILE,
+    SQL_AGGREGATED_TILE,
+    SQL_TEMPLATE_AGGREGATED_TILE,
+    SQL_MIN_MAX,
+    SQL_TEMPLATE_MIN_MAX,
+)
+
+DEFAULT_ITERATIONS = 2000
+
+# Parameters of typical requests, with and without filters
+TILE_PARAMS = {"zoom": 12, "tiles": [(2100, 1380)], "tile_buffer_meters": 610.0}
+FILTERS = {
+    "species_ids": [1, 2, 3],
+    "datasets_ids": [4, 5],
+    "start_date": "2020-01-01",
+    "end_date": "2022-12-31",
+}
+QUERIES = {
+    "observations tile": (
+        SQL_OBSERVATIONS_TILE,
+        SQL_TEMPLATE_OBSERVATIONS_TILE,
+        {**TILE_PARAMS, "thinning_grid_size_meters": 38.2, "max_features": 5000},
+    ),
+    "aggregated tile": (
+        SQL_AGGREGATED_TILE,
+        SQL_TEMPLATE_AGGREGATED_TILE,
+        {**TILE_PARAMS, "hex_size_meters": 320, "grid_extent_viewport": True},
+    ),
+    "min/max": (
+        SQL_MIN_MAX,
+        SQL_TEMPLATE_MIN_MAX,
+        {"hex_size_meters": 320, "grid_extent_viewport": False},
+    ),
+}
+
+
+def microseconds_per_call(function: Callable[[], Tuple], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the time spent preparing the SQL queries of the tile server (no query is sent to the database): "
+        "parsing the JinjaSQL template at each request (as it was done before) versus rendering the template "
+        "compiled at import time."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=DEFAULT_ITERATIONS,
+            help=f"Number of queries prepared for each measurement (default: {DEFAULT_ITERATIONS})",
+        )
+
+    def handle(self, *args, **options) -> None:
+        iterations = options["iterations"]
+        for query_name, (source, compiled_template, params) in QUERIES.items():
+            for params_name, sql_params in (
+                ("no filters", params),
+                ("with filters", {**params, **FILTERS}),
+            ):
+                self._compare(
+                    f"{query_name}, {params_name}",
+                    source,
+                    compiled_template,
+                    sql_params,
+                    iterations,
+                )
+
+    def _compare(
+        self,
+        name: str,
+        source: str,
+        compiled_template,
+        sql_params: Dict,
+        iterations: int,
+    ) -> None:
+        def per_request_parsing() -> Tuple:
+            return JinjaSql().prepare_query(readable_string(source), sql_params)
+
+        def compiled() -> Tuple:
+            return JINJASQL.prepare_query(compiled_template, sql_params)
+
+        if per_request_parsing() != compiled():
+            raise CommandError(f"{name}: both methods give different queries")
+
+        before = microseconds_per_call(per_request_parsing, iterations)
+        after = microseconds_per_call(compiled, iterations)
+        self.stdout.write(
+            f"{name}: {before:.0f}µs -> {after:.0f}µs per request ({before / after:.1f}x faster)"
+        )
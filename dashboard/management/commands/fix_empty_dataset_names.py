@@ -8,7 +8,7 @@
 
 from django.core.management import BaseCommand
 
-from .helpers import get_dataset_name_from_gbif_api
+from .helpers import get_dataset_names_from_gbif_api
 from dashboard.models import Dataset
 
 
@@ -16,9 +16,14 @@ class Command(BaseCommand):
     def handle(self, *args, **options) -> None:
         self.stdout.write("Will fix every dataset with an empty name...")
         datasets = Dataset.objects.filter(name="")
+        names = get_dataset_names_from_gbif_api(d.gbif_dataset_key for d in datasets)
         for dataset in datasets:
             self.stdout.write(f"dataset key={dataset.gbif_dataset_key}...")
-            name = get_dataset_name_from_gbif_api(dataset.gbif_dataset_key)
+            try:
+                name = names[dataset.gbif_dataset_key]
+            except KeyError:
+                self.stdout.write("Name not found")
+                continue
             self.stdout.write(f"Found name: {name}")
             dataset.name = name
             dataset.save()
@@ -0,0 +1,249 @@
+import io
+import random
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import Dict
+
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from dwca.darwincore.utils import qualname as qn  # type: ignore
+
+from dashboard.models import Species
+
+# The core file only has the columns read by import_observations.parse_row()
+SYNTHETIC_DWCA_TERMS = [
+    "http://rs.gbif.org/terms/1.0/gbifID",
+    qn("occurrenceID"),
+    qn("occurrenceStatus"),
+    qn("year"),
+    qn("month"),
+    qn("day"),
+    qn("decimalLongitude"),
+    qn("decimalLatitude"),
+    qn("coordinateUncertaintyInMeters"),
+    qn("individualCount"),
+    qn("locality"),
+    qn("municipality"),
+    qn("basisOfRecord"),
+    qn("recordedBy"),
+    qn("references"),
+    "http://rs.gbif.org/terms/1.0/datasetKey",
+    qn("datasetName"),
+    "http://rs.gbif.org/terms/1.0/taxonKey",
+    "http://rs.gbif.org/terms/1.0/acceptedTaxonKey",
+    "http://rs.gbif.org/terms/1.0/speciesKey",
+]
+
+META_XML_TEMPLATE = """<archive xmlns="http://rs.tdwg.org/dwc/text/" metadata="metadata.xml">
+  <core encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n" fieldsEnclosedBy="" ignoreHeaderLines="1" rowType="http://rs.tdwg.org/dwc/terms/Occurrence">
+    <files>
+      <location>occurrence.txt</location>
+    </files>
+    <id index="0" />
+{fields}
+  </core>
+</archive>
+"""
+
+METADATA_XML_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<eml:eml xmlns:eml="eml://ecoinformatics.org/eml-2.1.1" packageId="{download_id}" system="http://gbif.org" scope="system" xml:lang="en">
+<dataset>
+    <alternateIdentifier>{download_id}</alternateIdentifier>
+    <title>Synthetic occurrence download {download_id}</title>
+</dataset>
+</eml:eml>
+"""
+
+# Roughly Belgium
+MIN_LONGITUDE, MAX_LONGITUDE = 2.55, 6.4
+MIN_LATITUDE, MAX_LATITUDE = 49.5, 51.5
+
+BASIS_OF_RECORDS = ["HUMAN_OBSERVATION", "PRESERVED_SPECIMEN", "MACHINE_OBSERVATION"]
+
+
+@dataclass
+class SyntheticDwcaOptions:
+    rows: int
+    # {gbif_taxon_key: weight}: rows are assigned to species proportionally to their weight
+    species_weights: Dict[int, float]
+    datasets: int = 10
+    missing_coordinates_ratio: float = 0.05
+    # Proportion of rows whose stable_id is the same in all archives (whatever the seed): when archives generated with
+    # different seeds are imported one after the other, those rows replace an observation of the previous import
+    replaced_ratio: float = 0.9
+    seed: int = 0
+    download_id: str = ""
+
+    def __post_init__(self) -> None:
+        if not self.download_id:
+            self.download_id = f"synthetic-{self.rows}-{self.seed}"
+
+
+def synthetic_dataset_key(dataset_number: int) -> str:
+    """Dataset keys are the same in all archives"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"synthetic-dataset-{dataset_number}"))
+
+
+def write_synthetic_dwca(path: str, options: SyntheticDwcaOptions) -> None:
+    """Write a zipped DwC-A that looks like a GBIF download, with randomly generated occurrences
+
+    Rows are generated and compressed on the fly: memory usage doesn't depend on the number of rows.
+    """
+    rng = random.Random(options.seed)
+    taxon_keys = list(options.species_weights.keys())
+    weights = list(options.species_weights.values())
+    replaced_rows = round(options.rows * options.replaced_ratio)
+    dataset_keys = [synthetic_dataset_key(n) for n in range(options.datasets)]
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "meta.xml",
+            META_XML_TEMPLATE.format(
+                fields="\n".join(
+                    f'    <field index="{i}" term="{term}"/>'
+                    for i, term in enumerate(SYNTHETIC_DWCA_TERMS)
+                )
+            ),
+        )
+        archive.writestr(
+            "metadata.xml",
+            METADATA_XML_TEMPLATE.format(download_id=options.download_id),
+        )
+
+        with archive.open(
+            "occurrence.txt", "w", force_zip64=True
+        ) as raw_stream, io.TextIOWrapper(
+            raw_stream, encoding="utf-8"
+        ) as occurrences_file:
+            occurrences_file.write(
+                "\t".join(term.rsplit("/", 1)[-1] for term in SYNTHETIC_DWCA_TERMS)
+                + "\n"
+            )
+            for i in range(options.rows):
+                if i < replaced_rows:
+                    # Same occurrenceID and dataset (=> same stable_id) in all archives
+                    occurrence_id = f"synthetic:{i}"
+                    dataset_number = i % options.datasets
+                else:
+                    occurrence_id = f"synthetic:{options.seed}:{i}"
+                    dataset_number = rng.randrange(options.datasets)
+
+                if rng.random() < options.missing_coordinates_ratio:
+                    longitude, latitude = "", ""
+                else:
+                    longitude = f"{rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE):.6f}"
+                    latitude = f"{rng.uniform(MIN_LATITUDE, MAX_LATITUDE):.6f}"
+
+                taxon_key = str(rng.choices(taxon_keys, weights)[0])
+                values = [
+                    str(options.seed * 10**9 + i),
+                    occurrence_id,
+                    "PRESENT",
+                    str(rng.randint(1990, 2022)),
+                    str(rng.randint(1, 12)),
+                    str(rng.randint(1, 28)),
+                    longitude,
+                    latitude,
+                    rng.choice(["", "10", "250", "1000"]),
+                    rng.choice(["", "1", "2", "12"]),
+                    f"Locality {rng.randrange(1000)}",
+                    f"Municipality {rng.randrange(500)}",
+                    rng.choice(BASIS_OF_RECORDS),
+                    f"Observer {rng.randrange(5000)}",
+                    f"https://example.org/occurrences/{occurrence_id}",
+                    dataset_keys[dataset_number],
+                    f"Synthetic dataset {dataset_number}",
+                    taxon_key,
+                    taxon_key,
+                    taxon_key,
+                ]
+                occurrences_file.write("\t".join(values) + "\n")
+
+
+def parse_species_weights(value: str) -> Dict[int, float]:
+    """Parse a comma-separated list of GBIF taxon keys, each optionally followed by :<weight> (default: 1)"""
+    species_weights = {}
+    try:
+        for item in value.split(","):
+            taxon_key, _, weight = item.partition(":")
+            species_weights[int(taxon_key)] = float(weight) if weight else 1.0
+    except ValueError:
+        raise CommandError(f"Invalid species keys: {value}")
+    return species_weights
+
+
+def add_synthetic_dwca_arguments(parser: CommandParser) -> None:
+    """Options of the generator, also used by the benchmark_import_observations command"""
+    parser.add_argument(
+        "--species-keys",
+        help="Comma-separated GBIF taxon keys, each optionally followed by :<weight> to set its proportion of rows "
+        "(for example 1224034:10,7972617:1). Default: all species in the database, evenly distributed",
+    )
+    parser.add_argument(
+        "--datasets",
+        type=int,
+        default=10,
+        help="Number of source datasets (default: 10)",
+    )
+    parser.add_argument(
+        "--missing-coordinates-ratio",
+        type=float,
+        default=0.05,
+        help="Proportion of rows without coordinates (skipped during the import, default: 0.05)",
+    )
+    parser.add_argument(
+        "--replaced-ratio",
+        type=float,
+        default=0.9,
+        help="Proportion of rows whose stable_id is shared by all generated archives, whatever their seed (they "
+        "replace an observation from the previous import, default: 0.9)",
+    )
+
+
+def species_weights_from_options(options: Dict) -> Dict[int, float]:
+    if options["species_keys"]:
+        return parse_species_weights(options["species_keys"])
+
+    species_weights = {s.gbif_taxon_key: 1.0 for s in Species.objects.all()}
+    if not species_weights:
+        raise CommandError(
+            "There are no species in the database, use the --species-keys option"
+        )
+    return species_weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a DwC-A that looks like a GBIF download, with randomly generated occurrences. It can be imported "
+        "with import_observations --source-dwca, to measure the importer performance on archives of any size."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("output_path", help="Path of the zipped DwC-A to create")
+        parser.add_argument(
+            "--rows", type=int, required=True, help="Number of occurrences"
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random generator (default: 0). Generate successive archives with different seeds "
+            "to simulate daily downloads",
+        )
+        add_synthetic_dwca_arguments(parser)
+
+    def handle(self, *args, **options) -> None:
+        write_synthetic_dwca(
+            options["output_path"],
+            SyntheticDwcaOptions(
+                rows=options["rows"],
+                species_weights=species_weights_from_options(options),
+                datasets=options["datasets"],
+                missing_coordinates_ratio=options["missing_coordinates_ratio"],
+                replaced_ratio=options["replaced_ratio"],
+                seed=options["seed"],
+            ),
+        )
+        self.stdout.write(
+            f"{options['rows']} occurrences written to {options['output_path']}"
+        )
@@ -1,11 +1,318 @@
-from functools import cache
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import List, Iterator, Optional, Dict, Iterable, Any
+from xml.etree import ElementTree
 
 import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.utils import timezone
+from dwca.descriptors import ArchiveDescriptor, DataFileDescriptor  # type: ignore
+from dwca.rows import CoreRow  # type: ignore
 
+from dashboard.models import (
+    CachedDatasetName,
+    Observation,
+    DataImport,
+    ObservationComment,
+    ObservationView,
+)
 
-@cache
-def get_dataset_name_from_gbif_api(gbif_dataset_key: str) -> str:
-    query_url = f"https://api.gbif.org/v1/dataset/{gbif_dataset_key}"
+OBSERVATIONS_TABLE_NAME = Observation.objects.model._meta.db_table
+OBSERVATIONS_DEFAULT_PARTITION_NAME = f"{OBSERVATIONS_TABLE_NAME}_default"
 
-    dataset_details = requests.get(query_url).json()
-    return dataset_details["title"]
+
+GBIF_API_URL = "https://api.gbif.org/v1"
+GBIF_API_TIMEOUT = 30  # seconds
+GBIF_API_CONCURRENT_REQUESTS = 8
+
+
+def _fetch_dataset_name(
+    session: requests.Session, gbif_api_url: str, gbif_dataset_key: str
+) -> str:
+    response = session.get(
+        f"{gbif_api_url}/dataset/{gbif_dataset_key}", timeout=GBIF_API_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()["title"]
+
+
+def get_dataset_names_from_gbif_api(
+    gbif_dataset_keys: Iterable[str], gbif_api_url: str = GBIF_API_URL
+) -> Dict[str, str]:
+    """Return the names of those datasets ({gbif_dataset_key: name})
+
+    Names are cached in the database (see CachedDatasetName): only the missing ones (or those older than
+    RIPARIAS["GBIF_DATASET_NAMES_CACHE_TTL_DAYS"]) are requested to the GBIF API, concurrently and over a pool of
+    connections. Datasets whose name can't be retrieved are absent from the result.
+    """
+    gbif_dataset_keys = set(gbif_dataset_keys)
+    oldest_fetched_at = timezone.now() - datetime.timedelta(
+        days=settings.RIPARIAS["GBIF_DATASET_NAMES_CACHE_TTL_DAYS"]
+    )
+    names = dict(
+        CachedDatasetName.objects.filter(
+            gbif_dataset_key__in=gbif_dataset_keys, fetched_at__gte=oldest_fetched_at
+        ).values_list("gbif_dataset_key", "name")
+    )
+
+    keys_to_fetch = gbif_dataset_keys - names.keys()
+    if keys_to_fetch:
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_maxsize=GBIF_API_CONCURRENT_REQUESTS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            with ThreadPoolExecutor(
+                max_workers=GBIF_API_CONCURRENT_REQUESTS
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        _fetch_dataset_name, session, gbif_api_url, gbif_dataset_key
+                    ): gbif_dataset_key
+                    for gbif_dataset_key in keys_to_fetch
+                }
+                # Database writes stay in this thread
+                for future in as_completed(futures):
+                    gbif_dataset_key = futures[future]
+                    try:
+                        name = future.result()
+                    except (requests.RequestException, KeyError, ValueError):
+                        continue
+                    CachedDatasetName.objects.update_or_create(
+                        gbif_dataset_key=gbif_dataset_key,
+                        defaults={"name": name, "fetched_at": timezone.now()},
+                    )
+                    names[gbif_dataset_key] = name
+
+    return names
+
+
+# Local cache of GBIF downloads
+def gbif_download_cache_path(
+    gbif_predicate: Dict, download_date: datetime.date
+) -> Path:
+    """Path of the cached GBIF download for this predicate, on this date (the file may not exist)"""
+    predicate_hash = hashlib.sha1(
+        json.dumps(gbif_predicate, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return (
+        Path(settings.RIPARIAS["GBIF_DOWNLOADS_CACHE_DIR"])
+        / f"{predicate_hash}_{download_date.isoformat()}.zip"
+    )
+
+
+def prune_gbif_downloads_cache(today: datetime.date) -> List[Path]:
+    """Delete the cached GBIF downloads that are older than the retention period
+
+    :return: the paths of the deleted files
+    """
+    oldest_kept_date = today - datetime.timedelta(
+        days=settings.RIPARIAS["GBIF_DOWNLOADS_CACHE_RETENTION_DAYS"]
+    )
+    deleted_paths = []
+    for path in Path(settings.RIPARIAS["GBIF_DOWNLOADS_CACHE_DIR"]).glob("*_*.zip"):
+        try:
+            download_date = datetime.date.fromisoformat(path.stem.split("_")[-1])
+        except ValueError:  # Not a file from the cache
+            continue
+        if download_date < oldest_kept_date:
+            path.unlink()
+            deleted_paths.append(path)
+    return deleted_paths
+
+
+class StreamingDwCAReader(object):
+    """Read the core rows of a zipped DwC-A (such as a GBIF download) without extracting it
+
+    Unlike dwca.read.DwCAReader, nothing is written to disk and no index of the data files is built: the core file is
+    decompressed on the fly and read sequentially, by buffers of a fixed number of lines. Memory usage is therefore the
+    same whatever the archive size.
+
+    Usage:
+        with StreamingDwCAReader(path) as dwca:
+            for line_buffer in dwca.iter_line_buffers(1000):
+                ...
+    """
+
+    def __init__(self, path: str) -> None:
+        self._zipfile = zipfile.ZipFile(path)
+        descriptor = ArchiveDescriptor(self._zipfile.read("meta.xml").decode("utf-8"))
+        self.core_descriptor: DataFileDescriptor = descriptor.core
+        self.metadata: Optional[ElementTree.Element] = None
+        if descriptor.metadata_filename:
+            self.metadata = ElementTree.fromstring(
+                self._zipfile.read(descriptor.metadata_filename)
+            )
+
+    def __enter__(self) -> "StreamingDwCAReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zipfile.close()
+
+    def iter_line_buffers(
+        self, buffer_size: int, start_row: int = 0
+    ) -> Iterator[List[str]]:
+        """Yield the (raw) lines of the core file, by lists of at most buffer_size lines
+
+        Header lines are skipped, as well as the start_row first rows (to resume a previous reading).
+        """
+        with self._zipfile.open(self.core_descriptor.file_location) as raw_stream:
+            text_stream = io.TextIOWrapper(
+                raw_stream,
+                encoding=self.core_descriptor.file_encoding,
+                newline=self.core_descriptor.lines_terminated_by,
+                errors="replace",
+            )
+            for _ in range(self.core_descriptor.lines_to_ignore + start_row):
+                text_stream.readline()
+
+            while True:
+                line_buffer = list(itertools.islice(text_stream, buffer_size))
+                if not line_buffer:
+                    break
+                yield line_buffer
+
+    def __iter__(self) -> Iterator[CoreRow]:
+        position = 0
+        for line_buffer in self.iter_line_buffers(1000):
+            for line in line_buffer:
+                yield CoreRow(line, position, self.core_descriptor)
+                position = position + 1
+
+
+# Observations table partitioning (see the partition_observations_table command)
+def observations_table_is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS(SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+            [OBSERVATIONS_TABLE_NAME],
+        )
+        return cursor.fetchone()[0]
+
+
+def foreign_keys_referencing_observations() -> List[str]:
+    """The names of the foreign key constraints referencing the observations table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass",
+            [OBSERVATIONS_TABLE_NAME],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def observations_partition_name(data_import_id: int) -> str:
+    return f"{OBSERVATIONS_TABLE_NAME}_di_{int(data_import_id)}"
+
+
+def observations_partitions_data_import_ids() -> List[int]:
+    """The ids of the data imports having their own partition"""
+    prefix = observations_partition_name(0)[:-1]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "INNER JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [OBSERVATIONS_TABLE_NAME],
+        )
+        return [
+            int(relname[len(prefix) :])
+            for (relname,) in cursor.fetchall()
+            if relname.startswith(prefix)
+        ]
+
+
+def create_observations_partition(data_import: DataImport) -> None:
+    """Create the partition that will store the observations of data_import"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {observations_partition_name(data_import.pk)} "
+            f"PARTITION OF {OBSERVATIONS_TABLE_NAME} FOR VALUES IN ({int(data_import.pk)})"
+        )
+
+
+def drop_observations_partition(data_import_id: int) -> None:
+    """Detach and drop a partition. Entities linked to its observations should be deleted first."""
+    partition_name = observations_partition_name(data_import_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} DETACH PARTITION {partition_name}"
+        )
+        cursor.execute(f"DROP TABLE {partition_name}")
+
+
+def delete_data_import_observations(data_import_id: int) -> None:
+    """Delete all observations of a data import (and their linked entities), without loading them
+
+    The partition of the data import is dropped if it has one, its rows are deleted with a single statement otherwise.
+    """
+    with connection.cursor() as cursor:
+        for Model in (ObservationComment, ObservationView):
+            cursor.execute(
+                f"DELETE FROM {Model.objects.model._meta.db_table} WHERE observation_id IN "
+                f"(SELECT id FROM {OBSERVATIONS_TABLE_NAME} WHERE data_import_id = %s)",
+                [data_import_id],
+            )
+
+        if data_import_id in observations_partitions_data_import_ids():
+            drop_observations_partition(data_import_id)
+        else:
+            cursor.execute(
+                f"DELETE FROM {OBSERVATIONS_TABLE_NAME} WHERE data_import_id = %s",
+                [data_import_id],
+            )
+
+
+def retire_observations_partitions(keep_data_import: DataImport) -> None:
+    """Delete all observations except those of keep_data_import, on a partitioned table
+
+    Partitions of other data imports are dropped instead of deleting their rows one by one. Since there's no foreign
+    key constraint (and therefore no cascading) at the database level, linked entities are explicitly deleted first.
+    """
+    with connection.cursor() as cursor:
+        for Model in (ObservationComment, ObservationView):
+            cursor.execute(
+                f"DELETE FROM {Model.objects.model._meta.db_table} WHERE observation_id IN "
+                f"(SELECT id FROM {OBSERVATIONS_TABLE_NAME} WHERE data_import_id <> %s)",
+                [keep_data_import.pk],
+            )
+
+        for data_import_id in observations_partitions_data_import_ids():
+            if data_import_id != keep_data_import.pk:
+                drop_observations_partition(data_import_id)
+
+        # Observations that landed in the default partition
+        cursor.execute(
+            f"DELETE FROM {OBSERVATIONS_TABLE_NAME} WHERE data_import_id <> %s",
+            [keep_data_import.pk],
+        )
+
+
+def receive_from_child_process(process: BaseProcess, receiving_end: Connection) -> Any:
+    """Wait for what a (benchmark) child process sends through receiving_end, and return it
+
+    Raise CommandError if the process exits without sending anything (killed, out of memory, unpicklable exception...)
+    instead of waiting forever.
+    """
+    while not receiving_end.poll(1):
+        if not process.is_alive():
+            # It may have sent something right before exiting
+            if receiving_end.poll():
+                break
+            raise CommandError(
+                f"The child process exited without sending its results (exit code: {process.exitcode})"
+            )
+    return receiving_end.recv()
@@ -1,24 +1,75 @@
 import argparse
-import tempfile
+import hashlib
+import itertools
+import multiprocessing
+import os
 import datetime
-from typing import Dict, Optional
+import resource
+import time
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from string import Template
+from typing import (
+    Dict,
+    Optional,
+    List,
+    Tuple,
+    NamedTuple,
+    Iterator,
+    Any,
+    Union,
+)
+from xml.etree import ElementTree
 
 from django.conf import settings
-from django.contrib.gis.geos import Point
 
 from django.core.mail import mail_admins
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandParser, CommandError
-from django.db import transaction
+from django.db import transaction, connection
 from django.db.models import QuerySet
 from django.utils import timezone
-from dwca.read import DwCAReader  # type: ignore
+from dwca.descriptors import DataFileDescriptor  # type: ignore
 from dwca.darwincore.utils import qualname as qn  # type: ignore
 from dwca.rows import CoreRow  # type: ignore
 from gbif_blocking_occurrences_download import download_occurrences as download_gbif_occurrences  # type: ignore
 from maintenance_mode.core import set_maintenance_mode  # type: ignore
 
-from .helpers import get_dataset_name_from_gbif_api
-from dashboard.models import Species, Observation, DataImport, Dataset
+from .helpers import (
+    StreamingDwCAReader,
+    get_dataset_names_from_gbif_api,
+    observations_table_is_partitioned,
+    create_observations_partition,
+    delete_data_import_observations,
+    retire_observations_partitions,
+    gbif_download_cache_path,
+    prune_gbif_downloads_cache,
+)
+from dashboard.models import (
+    DATA_SRID,
+    Species,
+    Observation,
+    DataImport,
+    Dataset,
+    ObservationComment,
+    ObservationView,
+    ObservationHexagonAggregate,
+)
+from dashboard.utils import ZOOM_TO_HEX_SIZE
+from dashboard.tiles_cache import get_tiles_cache, tiles_cache_is_shared
+
+DEFAULT_BATCH_SIZE = 5000
+# The DwC-A core file is streamed (and parsed) by buffers of this number of lines
+ROWS_BUFFER_SIZE = 1000
+# While loading observations, the number of processed rows is printed at most every ... seconds
+PROGRESS_REPORT_INTERVAL = 30
+
+OBSERVATIONS_TABLE_NAME = Observation.objects.model._meta.db_table
+OBSERVATIONCOMMENTS_TABLE_NAME = ObservationComment.objects.model._meta.db_table
+OBSERVATIONVIEWS_TABLE_NAME = ObservationView.objects.model._meta.db_table
+DATAIMPORTS_TABLE_NAME = DataImport.objects.model._meta.db_table
+HEXAGON_AGGREGATES_TABLE_NAME = ObservationHexagonAggregate.objects.model._meta.db_table
 
 
 def build_gbif_predicate(country_code: str, species_list: QuerySet[Species]) -> Dict:
@@ -39,33 +90,56 @@ def build_gbif_predicate(country_code: str, species_list: QuerySet[Species]) ->
     }
 
 
-def species_for_row(row: CoreRow) -> Species:
-    """Based first on taxonKey, with fallback to acceptedTaxonKey then speciesKey
+class SpeciesAndDatasetResolver(object):
+    """Resolve the species and dataset of DwC-A rows during a data import, without hitting the database every time
+
+    Both tables are small and barely change during an import: they are loaded once (create one resolver per
+    DataImport) and lookups are answered from dicts. Unknown datasets are lazily created in the database.
 
-    Raise Species.DoesNotExist if the corresponding species cannot be found
+    Rows sometimes have an empty datasetName: datasets created from them are kept in unnamed_datasets
+    ({gbif_dataset_key: Dataset}), so their names can be retrieved from the GBIF API by chunks of rows (see
+    Command._name_new_datasets()).
     """
-    taxon_key = int(
-        get_string_data(row, field_name="http://rs.gbif.org/terms/1.0/taxonKey")
-    )
 
-    accepted_taxon_key = int(
-        get_string_data(row, field_name="http://rs.gbif.org/terms/1.0/acceptedTaxonKey")
-    )
+    def __init__(self) -> None:
+        self.unnamed_datasets: Dict[str, Dataset] = {}
+        self.species_by_taxon_key: Dict[int, Species] = {
+            s.gbif_taxon_key: s for s in Species.objects.all()
+        }
+        self.datasets_by_key: Dict[str, Dataset] = {
+            d.gbif_dataset_key: d for d in Dataset.objects.all()
+        }
 
-    species_key = int(
-        get_string_data(row, field_name="http://rs.gbif.org/terms/1.0/speciesKey")
-    )
+    def species_for_taxon_keys(self, taxon_keys: Tuple[str, ...]) -> Species:
+        """Return the species matching the first possible taxon key (see ParsedObservation.taxon_keys)
 
-    try:
-        return Species.objects.get(gbif_taxon_key=taxon_key)
-    except Species.DoesNotExist:
+        Raise Species.DoesNotExist if the corresponding species cannot be found
+        """
+        for taxon_key in taxon_keys:
+            try:
+                return self.species_by_taxon_key[int(taxon_key)]
+            except (KeyError, ValueError):
+                pass
+
+        raise Species.DoesNotExist
+
+    def dataset_for_key(self, gbif_dataset_key: str, dataset_name: str) -> Dataset:
+        """Return the dataset with this key, creating it if it doesn't exist yet"""
         try:
-            return Species.objects.get(gbif_taxon_key=accepted_taxon_key)
-        except Species.DoesNotExist:
-            return Species.objects.get(gbif_taxon_key=species_key)
+            return self.datasets_by_key[gbif_dataset_key]
+        except KeyError:
+            dataset, _ = Dataset.objects.get_or_create(
+                gbif_dataset_key=gbif_dataset_key,
+                defaults={"name": dataset_name},
+            )
+            # Ugly hack necessary to circumvent a GBIF bug. See https://github.com/riparias/early-warning-webapp/issues/41
+            if dataset.name == "":
+                self.unnamed_datasets[gbif_dataset_key] = dataset
+            self.datasets_by_key[gbif_dataset_key] = dataset
+            return dataset
 
 
-def extract_gbif_download_id_from_dwca(dwca: DwCAReader) -> str:
+def extract_gbif_download_id_from_dwca(dwca: StreamingDwCAReader) -> str:
     return dwca.metadata.find("dataset").find("alternateIdentifier").text
 
 
@@ -90,35 +164,96 @@ def get_int_data(row: CoreRow, field_name: str) -> int:
     return int(get_string_data(row, field_name))
 
 
-def import_single_observation(row: CoreRow, current_data_import: DataImport) -> bool:
-    """Import a single observation into the database
+class ParsedObservation(NamedTuple):
+    """The values of a usable DwC-A row, parsed and validated but not yet linked to database objects
 
-    :raise: Species.DoesNotExist if the species referenced in the row cannot be found in the database
+    Those are cheap to pickle, so rows can be parsed in worker processes (see iter_parsed_rows())
+    """
+
+    gbif_id: int
+    occurrence_id: str
+    stable_id: str
+    # taxonKey, acceptedTaxonKey and speciesKey: the species is matched on the first known one
+    taxon_keys: Tuple[str, str, str]
+    gbif_dataset_key: str
+    dataset_name: str
+    longitude: float
+    latitude: float
+    date: datetime.date
+    individual_count: Optional[int]
+    locality: str
+    municipality: str
+    basis_of_record: str
+    recorded_by: str
+    coordinate_uncertainty_in_meters: Optional[float]
+    references: str
+
+
+# The terms needed to know if a row should be imported (in the order of row_skip_reason() arguments)
+FILTERING_TERMS = [
+    qn("year"),
+    qn("decimalLongitude"),
+    qn("decimalLatitude"),
+    qn("occurrenceID"),
+    qn("occurrenceStatus"),
+]
 
-    :return True if successful, False if observation was skipped (=unusable OR is an absence)
+# Why a DwC-A row is skipped (see DataImport.skipped_observations_by_reason)
+SKIP_REASON_NO_YEAR = "no_year"
+SKIP_REASON_NO_COORDINATES = "no_coordinates"
+SKIP_REASON_NO_OCCURRENCE_ID = "no_occurrence_id"
+SKIP_REASON_ABSENT = "absent"
+# Only known when the row is resolved (see resolve_parsed_row())
+SKIP_REASON_UNKNOWN_SPECIES = "unknown_species"
+
+
+def row_skip_reason(
+    year_str: str,
+    longitude_str: str,
+    latitude_str: str,
+    occurrence_id_str: str,
+    occurrence_status_str: str,
+) -> Optional[str]:
+    """Only import records with a year, coordinates, an occurrenceID which represent "presence" data
+
+    :return the reason why the row should be skipped, None if it can be imported
     """
-    # For-filtering data extraction
-    year_str = get_string_data(row, field_name=qn("year"))
+    if year_str.strip() == "":
+        return SKIP_REASON_NO_YEAR
 
     try:
-        point: Optional[Point] = Point(
-            get_float_data(row, field_name=qn("decimalLongitude")),
-            get_float_data(row, field_name=qn("decimalLatitude")),
-            srid=4326,
-        )
+        float(longitude_str.strip())
+        float(latitude_str.strip())
     except ValueError:
-        point = None
-
-    occurrence_id_str = get_string_data(row, field_name=qn("occurrenceID"))
-    occurrence_status_str = get_string_data(row, field_name=qn("occurrenceStatus"))
-
-    # Only import records with a year, coordinates, an occurrenceID which represent "presence" data
-    if (
-        year_str != ""
-        and point
-        and occurrence_id_str != ""
-        and occurrence_status_str == "PRESENT"
-    ):
+        return SKIP_REASON_NO_COORDINATES
+
+    if occurrence_id_str.strip() == "":
+        return SKIP_REASON_NO_OCCURRENCE_ID
+
+    if occurrence_status_str.strip() != "PRESENT":
+        return SKIP_REASON_ABSENT
+
+    return None
+
+
+class SkippedRow(NamedTuple):
+    """A DwC-A row that won't be imported"""
+
+    reason: str
+
+
+def parse_row(row: CoreRow) -> Union[ParsedObservation, SkippedRow]:
+    """Extract and validate the values of a DwC-A row. This doesn't access the database.
+
+    :return SkippedRow if the observation should be skipped (=unusable OR is an absence)
+    """
+    skip_reason = row_skip_reason(*(row.data[term] for term in FILTERING_TERMS))
+    if skip_reason is None:
+        year_str = get_string_data(row, field_name=qn("year"))
+        longitude = get_float_data(row, field_name=qn("decimalLongitude"))
+        latitude = get_float_data(row, field_name=qn("decimalLatitude"))
+        occurrence_id_str = get_string_data(row, field_name=qn("occurrenceID"))
+
         # Some dates are incomplete, we're good as long as we have a year
         year = int(year_str)
         try:
@@ -131,20 +266,6 @@ def import_single_observation(row: CoreRow, current_data_import: DataImport) ->
         except ValueError:
             day = 1
 
-        date = datetime.date(year, month, day)
-        gbif_dataset_key = get_string_data(
-            row, field_name="http://rs.gbif.org/terms/1.0/datasetKey"
-        )
-        dataset_name = get_string_data(row, field_name=qn("datasetName"))
-        # Ugly hack necessary to circumvent a GBIF bug. See https://github.com/riparias/early-warning-webapp/issues/41
-        if dataset_name == "":
-            dataset_name = get_dataset_name_from_gbif_api(gbif_dataset_key)
-
-        dataset, _ = Dataset.objects.get_or_create(
-            gbif_dataset_key=gbif_dataset_key,
-            defaults={"name": dataset_name},
-        )
-
         try:
             individual_count: Optional[int] = get_int_data(
                 row, field_name=qn("individualCount")
@@ -159,16 +280,32 @@ def import_single_observation(row: CoreRow, current_data_import: DataImport) ->
         except ValueError:
             coordinates_uncertainty = None
 
-        new_observation = Observation(
+        gbif_dataset_key = get_string_data(
+            row, field_name="http://rs.gbif.org/terms/1.0/datasetKey"
+        )
+
+        return ParsedObservation(
             gbif_id=int(
                 get_string_data(row, field_name="http://rs.gbif.org/terms/1.0/gbifID")
             ),
             occurrence_id=occurrence_id_str,
-            species=species_for_row(row),
-            location=point,
-            date=date,
-            data_import=current_data_import,
-            source_dataset=dataset,
+            stable_id=Observation.build_stable_id(occurrence_id_str, gbif_dataset_key),
+            taxon_keys=(
+                get_string_data(
+                    row, field_name="http://rs.gbif.org/terms/1.0/taxonKey"
+                ),
+                get_string_data(
+                    row, field_name="http://rs.gbif.org/terms/1.0/acceptedTaxonKey"
+                ),
+                get_string_data(
+                    row, field_name="http://rs.gbif.org/terms/1.0/speciesKey"
+                ),
+            ),
+            gbif_dataset_key=gbif_dataset_key,
+            dataset_name=get_string_data(row, field_name=qn("datasetName")),
+            longitude=longitude,
+            latitude=latitude,
+            date=datetime.date(year, month, day),
             individual_count=individual_count,
             locality=get_string_data(row, field_name=qn("locality")),
             municipality=get_string_data(row, field_name=qn("municipality")),
@@ -177,14 +314,412 @@ def import_single_observation(row: CoreRow, current_data_import: DataImport) ->
             coordinate_uncertainty_in_meters=coordinates_uncertainty,
             references=get_string_data(row, field_name=qn("references")),
         )
-        new_observation.set_or_migrate_initial_data_import(
-            current_data_import=current_data_import
+
+    return SkippedRow(reason=skip_reason)
+
+
+class ResolvedObservation(NamedTuple):
+    """A parsed DwC-A row, with its species and dataset resolved: ready to be written to the database"""
+
+    parsed: ParsedObservation
+    species_id: int
+    source_dataset_id: int
+    content_hash: str
+
+
+def compute_content_hash(
+    parsed: ParsedObservation, species_id: int, source_dataset_id: int
+) -> str:
+    """Compute a hash of the values imported from the data source (see Observation.content_hash)"""
+    values = (
+        parsed.gbif_id,
+        parsed.occurrence_id,
+        species_id,
+        parsed.longitude,
+        parsed.latitude,
+        parsed.date.isoformat(),
+        parsed.individual_count,
+        parsed.locality,
+        parsed.municipality,
+        parsed.basis_of_record,
+        parsed.recorded_by,
+        parsed.coordinate_uncertainty_in_meters,
+        parsed.references,
+        source_dataset_id,
+    )
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+
+def resolve_parsed_row(
+    parsed: ParsedObservation, resolver: SpeciesAndDatasetResolver
+) -> ResolvedObservation:
+    """Resolve the species and dataset of a parsed DwC-A row
+
+    :raise: Species.DoesNotExist if the species referenced in the row cannot be found in the database
+    """
+    species_id = resolver.species_for_taxon_keys(parsed.taxon_keys).pk
+    source_dataset_id = resolver.dataset_for_key(
+        parsed.gbif_dataset_key, parsed.dataset_name
+    ).pk
+    return ResolvedObservation(
+        parsed=parsed,
+        species_id=species_id,
+        source_dataset_id=source_dataset_id,
+        content_hash=compute_content_hash(parsed, species_id, source_dataset_id),
+    )
+
+
+def parse_core_lines(
+    lines: List[str], core_descriptor: DataFileDescriptor
+) -> List[Union[ParsedObservation, SkippedRow]]:
+    """Parse a buffer of raw lines from the core data file (see parse_row())"""
+    return [
+        parse_row(CoreRow(line, 0, core_descriptor))  # The row position is not used
+        for line in lines
+    ]
+
+
+# Core data file descriptor, set in each parsing worker by _init_parsing_worker()
+_worker_core_descriptor: Optional[DataFileDescriptor] = None
+
+
+def _init_parsing_worker(core_descriptor_xml: bytes) -> None:
+    global _worker_core_descriptor
+    _worker_core_descriptor = DataFileDescriptor.make_from_metafile_section(
+        ElementTree.fromstring(core_descriptor_xml)
+    )
+
+
+def _parse_core_lines_in_worker(
+    lines: List[str],
+) -> List[Union[ParsedObservation, SkippedRow]]:
+    return parse_core_lines(lines, _worker_core_descriptor)
+
+
+def iter_parsed_rows(
+    dwca: StreamingDwCAReader, workers: int, start_row: int = 0
+) -> Iterator[Union[ParsedObservation, SkippedRow]]:
+    """Parse all core rows of the DwC-A (in order, skipping the start_row first ones), with a pool of worker
+    processes if workers > 1
+
+    The core file is read by buffers of ROWS_BUFFER_SIZE lines. With workers, only a few buffers are parsed ahead of
+    the consumer, so memory usage doesn't depend on the archive size either.
+    """
+    line_buffers = dwca.iter_line_buffers(ROWS_BUFFER_SIZE, start_row=start_row)
+
+    if workers <= 1:
+        for line_buffer in line_buffers:
+            yield from parse_core_lines(line_buffer, dwca.core_descriptor)
+        return
+
+    # Workers are forked: they don't import anything, and don't touch the (inherited) database connection
+    with multiprocessing.get_context("fork").Pool(
+        processes=workers,
+        initializer=_init_parsing_worker,
+        initargs=(ElementTree.tostring(dwca.core_descriptor.raw_element),),
+    ) as pool:
+        pending = deque(
+            pool.apply_async(_parse_core_lines_in_worker, (line_buffer,))
+            for line_buffer in itertools.islice(line_buffers, workers * 2)
+        )
+        while pending:
+            parsed_rows = pending.popleft().get()
+            next_buffer = next(line_buffers, None)
+            if next_buffer is not None:
+                pending.append(
+                    pool.apply_async(_parse_core_lines_in_worker, (next_buffer,))
+                )
+            yield from parsed_rows
+
+
+# The values of a chunk of observations are sent as one array per column, and turned back into rows with unnest().
+# Coordinates are reprojected by PostGIS for the whole chunk, so no GEOS object is created during the import.
+SQL_FRAGMENT_CHUNK_VALUES = Template(
+    """
+    SELECT chunk.id, gbif_id, occurrence_id, stable_id, content_hash, species_id,
+           ST_Transform(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326), $data_srid) AS location,
+           date, source_dataset_id, individual_count, locality, municipality, basis_of_record, recorded_by,
+           coordinate_uncertainty_in_meters, "references"
+    FROM unnest(
+        %(ids)s::bigint[], %(gbif_ids)s::varchar[], %(occurrence_ids)s::text[], %(stable_ids)s::varchar[],
+        %(content_hashes)s::varchar[], %(species_ids)s::bigint[], %(longitudes)s::double precision[],
+        %(latitudes)s::double precision[], %(dates)s::date[], %(source_dataset_ids)s::bigint[],
+        %(individual_counts)s::integer[], %(localities)s::text[], %(municipalities)s::text[],
+        %(basis_of_records)s::text[], %(recorded_bys)s::text[],
+        %(coordinate_uncertainties)s::double precision[], %(references)s::text[]
+    ) AS chunk(
+        id, gbif_id, occurrence_id, stable_id, content_hash, species_id, longitude, latitude, date,
+        source_dataset_id, individual_count, locality, municipality, basis_of_record, recorded_by,
+        coordinate_uncertainty_in_meters, "references"
+    )
+"""
+).substitute(data_srid=DATA_SRID)
+
+
+def chunk_values_params(
+    observations: List[ResolvedObservation], ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """Query parameters for SQL_FRAGMENT_CHUNK_VALUES
+
+    :param ids: the primary keys of the observations, if they already exist in the database
+    """
+    return {
+        "ids": ids if ids is not None else [None] * len(observations),
+        "gbif_ids": [str(o.parsed.gbif_id) for o in observations],
+        "occurrence_ids": [o.parsed.occurrence_id for o in observations],
+        "stable_ids": [o.parsed.stable_id for o in observations],
+        "content_hashes": [o.content_hash for o in observations],
+        "species_ids": [o.species_id for o in observations],
+        "longitudes": [o.parsed.longitude for o in observations],
+        "latitudes": [o.parsed.latitude for o in observations],
+        "dates": [o.parsed.date for o in observations],
+        "source_dataset_ids": [o.source_dataset_id for o in observations],
+        "individual_counts": [o.parsed.individual_count for o in observations],
+        "localities": [o.parsed.locality for o in observations],
+        "municipalities": [o.parsed.municipality for o in observations],
+        "basis_of_records": [o.parsed.basis_of_record for o in observations],
+        "recorded_bys": [o.parsed.recorded_by for o in observations],
+        "coordinate_uncertainties": [
+            o.parsed.coordinate_uncertainty_in_meters for o in observations
+        ],
+        "references": [o.parsed.references for o in observations],
+    }
+
+
+def import_observations_chunk(
+    observations: List[ResolvedObservation], current_data_import: DataImport
+) -> None:
+    """Insert a chunk of new observations for current_data_import, in a single statement
+
+    initial_data_import temporarily points to current_data_import, it's adjusted later for the whole import at once
+    (see reconcile_with_previous_imports()), as are the linked entities (see migrate_linked_entities())
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {OBSERVATIONS_TABLE_NAME} (
+                gbif_id, occurrence_id, stable_id, content_hash, species_id, location, date, data_import_id,
+                initial_data_import_id, source_dataset_id, individual_count, locality, municipality, basis_of_record,
+                recorded_by, coordinate_uncertainty_in_meters, "references"
+            )
+            SELECT gbif_id, occurrence_id, stable_id, content_hash, species_id, location, date,
+                   %(current_data_import_id)s, %(current_data_import_id)s, source_dataset_id, individual_count,
+                   locality, municipality, basis_of_record, recorded_by, coordinate_uncertainty_in_meters, "references"
+            FROM ({SQL_FRAGMENT_CHUNK_VALUES}) AS new_obs
+            """,
+            {
+                "current_data_import_id": current_data_import.pk,
+                **chunk_values_params(observations),
+            },
         )
-        new_observation.save()
-        new_observation.migrate_linked_entities()
-        return True
 
-    return False  # Observation was skipped
+
+def save_observations_chunk(
+    observations: List[ResolvedObservation],
+    current_data_import: DataImport,
+    row_offset: int,
+) -> None:
+    """Insert a chunk of observations and move the checkpoint of current_data_import to row_offset, atomically
+
+    The counters of current_data_import are saved with the checkpoint.
+    """
+    with transaction.atomic():
+        if observations:
+            import_observations_chunk(observations, current_data_import)
+        current_data_import.imported_observations_counter += len(observations)
+        current_data_import.checkpoint_row_offset = row_offset
+        current_data_import.save(
+            update_fields=[
+                "checkpoint_row_offset",
+                "imported_observations_counter",
+                "skipped_observations_counter",
+                "skipped_observations_by_reason",
+            ]
+        )
+
+
+def update_changed_observations_chunk(
+    observations: List[ResolvedObservation],
+    ids: List[int],
+    current_data_import: DataImport,
+) -> None:
+    """Overwrite the existing observations (ids) with the new values, in a single statement
+
+    The identifiers and initial_data_import are kept, data_import is set to current_data_import.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {OBSERVATIONS_TABLE_NAME} AS obs
+            SET gbif_id = changed.gbif_id, content_hash = changed.content_hash, species_id = changed.species_id,
+                location = changed.location, date = changed.date, data_import_id = %(current_data_import_id)s,
+                individual_count = changed.individual_count, locality = changed.locality,
+                municipality = changed.municipality, basis_of_record = changed.basis_of_record,
+                recorded_by = changed.recorded_by,
+                coordinate_uncertainty_in_meters = changed.coordinate_uncertainty_in_meters,
+                "references" = changed."references"
+            FROM ({SQL_FRAGMENT_CHUNK_VALUES}) AS changed
+            WHERE obs.id = changed.id
+            """,
+            {
+                "current_data_import_id": current_data_import.pk,
+                **chunk_values_params(observations, ids),
+            },
+        )
+
+
+def current_observations_index() -> Dict[str, Tuple[int, str]]:
+    """Return {stable_id: (pk, content_hash)} for the observations currently published on the website"""
+    return {
+        stable_id: (pk, content_hash)
+        for stable_id, pk, content_hash in Observation.objects.published()
+        .values_list("stable_id", "pk", "content_hash")
+        .iterator()
+    }
+
+
+@dataclass
+class IncrementalImportReport:
+    new_observations_counter: int = 0
+    updated_observations_counter: int = 0
+    unchanged_observations_counter: int = 0
+    deleted_observations_counter: int = 0
+
+
+@dataclass
+class ReconciliationReport:
+    """Outcome of reconcile_with_previous_imports()
+
+    Observations listed in the conflicts keep their initial_data_import (= the current import) and don't replace
+    anything.
+    """
+
+    # Number of new observations that replace one from a previous import
+    replaced_observations_counter: int = 0
+    # stable_ids matching multiple observations from previous imports
+    multiple_matches_stable_ids: List[str] = field(default_factory=list)
+    # stable_ids for which the other identical observation is more recent than the current import
+    other_is_newer_stable_ids: List[str] = field(default_factory=list)
+
+    @property
+    def has_conflicts(self) -> bool:
+        return bool(self.multiple_matches_stable_ids or self.other_is_newer_stable_ids)
+
+
+# For each observation of the current import, the observation(s) from other imports that share the stable_id
+SQL_FRAGMENT_REPLACEMENT_CANDIDATES = Template(
+    """
+    SELECT new_obs.id AS new_id, new_obs.stable_id, old_obs.id AS old_id,
+           old_obs.initial_data_import_id, old_obs.data_import_id AS old_data_import_id
+    FROM $observations_table_name AS new_obs
+    INNER JOIN $observations_table_name AS old_obs
+    ON old_obs.stable_id = new_obs.stable_id AND old_obs.data_import_id <> new_obs.data_import_id
+    WHERE new_obs.data_import_id = %(current_data_import_id)s
+"""
+).substitute(observations_table_name=OBSERVATIONS_TABLE_NAME)
+
+# Same as above, restricted to the unambiguous cases (exactly one older observation): the ones that are replaced
+SQL_FRAGMENT_REPLACEMENTS = Template(
+    """
+    SELECT new_id, MIN(old_id) AS old_id, MIN(initial_data_import_id) AS initial_data_import_id
+    FROM ($replacement_candidates) AS candidates
+    GROUP BY new_id
+    HAVING COUNT(*) = 1 AND MAX(old_data_import_id) < %(current_data_import_id)s
+"""
+).substitute(replacement_candidates=SQL_FRAGMENT_REPLACEMENT_CANDIDATES)
+
+
+def reconcile_with_previous_imports(
+    current_data_import: DataImport,
+) -> ReconciliationReport:
+    """Set initial_data_import for all observations of the current import, in a single statement
+
+    To be called once all the observations of the current import are saved. It's the set-based equivalent of
+    Observation.set_or_migrate_initial_data_import(), except that conflicts (see Observation.replaced_observation)
+    are reported instead of raised.
+    """
+    params = {"current_data_import_id": current_data_import.pk}
+    report = ReconciliationReport()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH replacements AS ({SQL_FRAGMENT_REPLACEMENTS})
+            UPDATE {OBSERVATIONS_TABLE_NAME} AS obs
+            SET initial_data_import_id = replacements.initial_data_import_id
+            FROM replacements WHERE obs.id = replacements.new_id
+            """,
+            params,
+        )
+        report.replaced_observations_counter = cursor.rowcount
+
+        cursor.execute(
+            f"""
+            SELECT stable_id, COUNT(*), MAX(old_data_import_id)
+            FROM ({SQL_FRAGMENT_REPLACEMENT_CANDIDATES}) AS candidates
+            GROUP BY stable_id
+            HAVING COUNT(*) > 1 OR MAX(old_data_import_id) > %(current_data_import_id)s
+            """,
+            params,
+        )
+        for stable_id, matches_count, max_data_import_id in cursor.fetchall():
+            if matches_count > 1:
+                report.multiple_matches_stable_ids.append(stable_id)
+            else:
+                report.other_is_newer_stable_ids.append(stable_id)
+
+    return report
+
+
+def migrate_linked_entities(current_data_import: DataImport) -> None:
+    """Migrate comments and user views of the replaced observations to the ones of the current import
+
+    Set-based equivalent of Observation.migrate_linked_entities(): one UPDATE ... FROM statement per entity type. The
+    number of migrated entities is recorded on current_data_import (but not saved).
+    """
+    with connection.cursor() as cursor:
+        for table_name, counter_name in (
+            (OBSERVATIONCOMMENTS_TABLE_NAME, "migrated_comments_counter"),
+            (OBSERVATIONVIEWS_TABLE_NAME, "migrated_views_counter"),
+        ):
+            cursor.execute(
+                f"""
+                WITH replacements AS ({SQL_FRAGMENT_REPLACEMENTS})
+                UPDATE {table_name} AS entity SET observation_id = replacements.new_id
+                FROM replacements WHERE entity.observation_id = replacements.old_id
+                """,
+                {"current_data_import_id": current_data_import.pk},
+            )
+            setattr(current_data_import, counter_name, cursor.rowcount)
+
+
+def refresh_hexagon_aggregates(current_data_import: DataImport) -> None:
+    """Rebuild ObservationHexagonAggregate from the published observations, and flag current_data_import (saved)
+
+    Each observation is counted in the hexagon(s) it intersects, like the aggregated tiles of views.maps do. To be
+    called in a transaction, once current_data_import is completed and committed: until then, the map doesn't use the
+    aggregates (see DataImport.hexagon_aggregates_ready).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {HEXAGON_AGGREGATES_TABLE_NAME}")
+        for hex_size_meters in sorted(set(ZOOM_TO_HEX_SIZE.values())):
+            cursor.execute(
+                f"""
+                INSERT INTO {HEXAGON_AGGREGATES_TABLE_NAME}
+                    (hex_size_meters, hex_i, hex_j, species_id, source_dataset_id, month, count)
+                SELECT %(hex_size_meters)s, hexes.i, hexes.j, obs.species_id, obs.source_dataset_id,
+                       DATE_TRUNC('month', obs.date)::date AS month, COUNT(*)
+                FROM {OBSERVATIONS_TABLE_NAME} AS obs
+                CROSS JOIN LATERAL ST_HexagonGrid(%(hex_size_meters)s, obs.location) AS hexes
+                WHERE obs.data_import_id NOT IN (SELECT id FROM {DATAIMPORTS_TABLE_NAME} WHERE staging)
+                AND ST_Intersects(obs.location, hexes.geom)
+                GROUP BY hexes.i, hexes.j, obs.species_id, obs.source_dataset_id, month
+                """,
+                {"hex_size_meters": hex_size_meters},
+            )
+
+    current_data_import.hexagon_aggregates_ready = True
+    current_data_import.save(update_fields=["hexagon_aggregates_ready"])
 
 
 def send_successful_import_email():
@@ -203,34 +738,285 @@ def send_error_import_email():
     )
 
 
+# The stages of an import, in order (see ImportMetrics)
+IMPORT_STAGES = [
+    "download",
+    "parse",
+    "resolve",
+    "dataset_names",
+    "insert",
+    "reconcile",
+    "migrate_links",
+    "delete_old",
+    "complete",
+    "aggregate",
+]
+
+
+class ImportMetrics(object):
+    """Time spent in each stage of an import, throughput and peak memory usage (stored in DataImport.stage_metrics)
+
+    The DwC-A is streamed: parsing (waiting for the parsing workers, if any), resolving and inserting the rows are
+    interleaved, their time is accumulated with add_time(). The other stages are timed with stage().
+    """
+
+    def __init__(self) -> None:
+        self.seconds_by_stage: Dict[str, float] = defaultdict(float)
+        # DwC-A rows processed during this run (when resuming an import, the rows before the checkpoint are excluded)
+        self.rows_counter = 0
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.seconds_by_stage[stage] += seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    @property
+    def rows_per_second(self) -> Optional[int]:
+        """Rows processed per second (parse, resolve, dataset_names and insert stages)"""
+        seconds = sum(
+            self.seconds_by_stage.get(stage, 0.0)
+            for stage in ("parse", "resolve", "dataset_names", "insert")
+        )
+        if seconds == 0:
+            return None
+        return round(self.rows_counter / seconds)
+
+    @staticmethod
+    def peak_memory_mb() -> float:
+        """Peak memory usage (RSS) of this process (without the parsing workers), in MB"""
+        # ru_maxrss is in kB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": [
+                {"name": stage, "seconds": round(self.seconds_by_stage[stage], 3)}
+                for stage in IMPORT_STAGES
+                if stage in self.seconds_by_stage
+            ],
+            "rows": self.rows_counter,
+            "rows_per_second": self.rows_per_second,
+            "peak_memory_mb": self.peak_memory_mb(),
+        }
+
+    def __str__(self) -> str:
+        stages = ", ".join(
+            f"{stage['name']}: {stage['seconds']:.1f}s"
+            for stage in self.as_dict()["stages"]
+        )
+        return (
+            f"{stages}. {self.rows_counter} rows ({self.rows_per_second} rows/s), "
+            f"peak memory: {self.peak_memory_mb()} MB"
+        )
+
+
 class Command(BaseCommand):
     help = (
         "Import new observations and delete previous ones. "
         ""
-        "By default, a new download is generated at GBIF. "
+        "By default, a new download is generated at GBIF (or reused from the local cache if we already got one today). "
         "The --source-dwca option can be used to provide an existing local file instead."
     )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.transaction_was_successful = False
+        self.observations_table_is_partitioned = False
+        self.metrics = ImportMetrics()
+        self.last_progress_report = 0.0
+
+    def _report_progress(self) -> None:
+        """Print the number of processed rows, at most every PROGRESS_REPORT_INTERVAL seconds"""
+        now = time.monotonic()
+        if now - self.last_progress_report >= PROGRESS_REPORT_INTERVAL:
+            self.last_progress_report = now
+            self.stdout.write(
+                f"{self.metrics.rows_counter} rows processed ({self.metrics.rows_per_second} rows/s)"
+            )
+
+    def _name_new_datasets(self, resolver: SpeciesAndDatasetResolver) -> None:
+        """Get the names of the datasets created with an empty name since the last call from the GBIF API
+
+        Called for each chunk of rows: the DwC-A is read only once, and new datasets are rare.
+        """
+        if not resolver.unnamed_datasets:
+            return
+
+        with self.metrics.stage("dataset_names"):
+            self.stdout.write(
+                f"Getting the name of {len(resolver.unnamed_datasets)} new dataset(s) from the GBIF API..."
+            )
+            names = get_dataset_names_from_gbif_api(resolver.unnamed_datasets.keys())
+            for gbif_dataset_key, dataset in resolver.unnamed_datasets.items():
+                if gbif_dataset_key in names:
+                    dataset.name = names[gbif_dataset_key]
+                    dataset.save(update_fields=["name"])
+                else:
+                    self.stdout.write(
+                        f"WARNING: name not found for dataset {gbif_dataset_key}, run fix_empty_dataset_names later"
+                    )
+            resolver.unnamed_datasets = {}
+
+    def _timed_parsed_rows(
+        self, dwca: StreamingDwCAReader, workers: int, start_row: int = 0
+    ) -> Iterator[Union[ParsedObservation, SkippedRow]]:
+        """iter_parsed_rows(), counting the processed rows and the time spent waiting for them in self.metrics"""
+        parsed_rows = iter_parsed_rows(dwca, workers=workers, start_row=start_row)
+        while True:
+            start = time.perf_counter()
+            parsed_row = next(parsed_rows, None)
+            self.metrics.add_time("parse", time.perf_counter() - start)
+            if parsed_row is None:
+                return
+            self.metrics.rows_counter += 1
+            yield parsed_row
+
+    def _resolve(
+        self,
+        parsed_row: ParsedObservation,
+        resolver: SpeciesAndDatasetResolver,
+        data_import: DataImport,
+    ) -> Optional[ResolvedObservation]:
+        """Resolve the row, or record it as skipped on data_import (and return None) if its species is unknown"""
+        start = time.perf_counter()
+        try:
+            return resolve_parsed_row(parsed_row, resolver)
+        except Species.DoesNotExist:
+            data_import.record_skipped_observation(SKIP_REASON_UNKNOWN_SPECIES)
+            return None
+        finally:
+            self.metrics.add_time("resolve", time.perf_counter() - start)
 
     def _import_all_observations_from_dwca(
-        self, dwca: DwCAReader, data_import: DataImport
-    ) -> int:
-        """:return the number of skipped observations"""
-        skipped_observations_counter = 0
-        for core_row in dwca:
-            try:
-                r = import_single_observation(core_row, data_import)
+        self,
+        dwca: StreamingDwCAReader,
+        data_import: DataImport,
+        batch_size: int,
+        workers: int,
+    ) -> None:
+        """Import observations by chunks of batch_size rows, starting after the last checkpoint of data_import
+
+        Each chunk is saved in its own transaction (a savepoint if we're already in a transaction), together with the
+        new checkpoint and skipped observations counter of data_import.
+        """
+        resolver = SpeciesAndDatasetResolver()
+        chunk: List[ResolvedObservation] = []
+        row_offset = data_import.checkpoint_row_offset
+        for parsed_row in self._timed_parsed_rows(dwca, workers, start_row=row_offset):
+            row_offset = row_offset + 1
+            if isinstance(parsed_row, SkippedRow):
+                data_import.record_skipped_observation(parsed_row.reason)
+            else:
+                observation = self._resolve(parsed_row, resolver, data_import)
+                if observation is not None:
+                    chunk.append(observation)
+
+            if len(chunk) >= batch_size:
+                self._name_new_datasets(resolver)
+                with self.metrics.stage("insert"):
+                    save_observations_chunk(chunk, data_import, row_offset)
+                chunk = []
+                self._report_progress()
+
+        self._name_new_datasets(resolver)
+        # Also records the skipped rows at the end of the file
+        with self.metrics.stage("insert"):
+            save_observations_chunk(chunk, data_import, row_offset)
+
+    def _apply_dwca_incrementally(
+        self,
+        dwca: StreamingDwCAReader,
+        data_import: DataImport,
+        batch_size: int,
+        workers: int,
+    ) -> IncrementalImportReport:
+        """Insert the new observations, update the changed ones and delete those that disappeared from the DwC-A
 
-                if r is False:
-                    skipped_observations_counter = skipped_observations_counter + 1
-                self.stdout.write(".", ending="")
-            except Species.DoesNotExist:
-                raise CommandError(f"species not found in db for row: {core_row}")
+        Unchanged observations are left untouched (they keep their primary key and their data import).
+        """
+        report = IncrementalImportReport()
+        # Entries are removed as we encounter them in the DwC-A: the remaining ones have disappeared
+        previous_observations = current_observations_index()
+        previous_observations_counter = len(previous_observations)
+        resolver = SpeciesAndDatasetResolver()
+        new_chunk: List[ResolvedObservation] = []
+        changed_chunk: List[ResolvedObservation] = []
+        changed_chunk_ids: List[int] = []
+        rows_in_batch = 0
+        for parsed_row in self._timed_parsed_rows(dwca, workers):
+            observation = None
+            if isinstance(parsed_row, SkippedRow):
+                data_import.record_skipped_observation(parsed_row.reason)
+            else:
+                observation = self._resolve(parsed_row, resolver, data_import)
 
-        return skipped_observations_counter
+            if observation is not None:
+                previous = previous_observations.pop(observation.parsed.stable_id, None)
+                if previous is None:
+                    new_chunk.append(observation)
+                    report.new_observations_counter += 1
+                else:
+                    previous_pk, previous_content_hash = previous
+                    if previous_content_hash == observation.content_hash:
+                        report.unchanged_observations_counter += 1
+                    else:
+                        changed_chunk.append(observation)
+                        changed_chunk_ids.append(previous_pk)
+                        report.updated_observations_counter += 1
+
+            rows_in_batch = rows_in_batch + 1
+            if rows_in_batch >= batch_size:
+                self._name_new_datasets(resolver)
+            if len(new_chunk) >= batch_size:
+                with self.metrics.stage("insert"):
+                    import_observations_chunk(new_chunk, data_import)
+                new_chunk = []
+            if len(changed_chunk) >= batch_size:
+                with self.metrics.stage("insert"):
+                    update_changed_observations_chunk(
+                        changed_chunk, changed_chunk_ids, data_import
+                    )
+                changed_chunk, changed_chunk_ids = [], []
+            if rows_in_batch >= batch_size:
+                rows_in_batch = 0
+                self._report_progress()
+
+        self._name_new_datasets(resolver)
+        with self.metrics.stage("insert"):
+            if new_chunk:
+                import_observations_chunk(new_chunk, data_import)
+            if changed_chunk:
+                update_changed_observations_chunk(
+                    changed_chunk, changed_chunk_ids, data_import
+                )
+
+        with self.metrics.stage("delete_old"):
+            with connection.cursor() as cursor:
+                # Make sure no comment/view is added to an observation we're about to delete
+                cursor.execute(
+                    f"LOCK TABLE {OBSERVATIONCOMMENTS_TABLE_NAME}, {OBSERVATIONVIEWS_TABLE_NAME} "
+                    f"IN SHARE ROW EXCLUSIVE MODE"
+                )
+            disappeared_pks = [pk for pk, _ in previous_observations.values()]
+            for i in range(0, len(disappeared_pks), batch_size):
+                # Through the ORM, so the comments and views of those observations are deleted too
+                Observation.objects.filter(
+                    pk__in=disappeared_pks[i : i + batch_size]
+                ).delete()
+        report.deleted_observations_counter = len(disappeared_pks)
+        data_import.imported_observations_counter = (
+            previous_observations_counter
+            + report.new_observations_counter
+            - report.deleted_observations_counter
+        )
+
+        return report
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument(
@@ -238,41 +1024,176 @@ class Command(BaseCommand):
             type=argparse.FileType("r"),
             help="Use an existing dwca file as source (otherwise a new GBIF download will be generated and downloaded)",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Number of observations written to the database at once (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            metavar="DATA_IMPORT_ID",
+            help="Resume an interrupted --zero-downtime import from its last checkpoint, with the same DwC-A file "
+            "(by default, the one recorded on the data import)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes used to parse the DwC-A rows (default: 1, no separate process)",
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--zero-downtime",
+            action="store_true",
+            help="Don't use maintenance mode: observations are staged while the website keeps serving the previous "
+            "import, then activated in a short final transaction",
+        )
+        mode.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only write the differences with the current observations (matched by stable_id): new observations "
+            "are inserted, changed ones updated and disappeared ones deleted. Unchanged observations are kept as-is",
+        )
+        parser.add_argument(
+            "--seed-tiles",
+            action="store_true",
+            help="Once the import is successfully completed, pre-render the unfiltered map tiles with the seed_tiles "
+            "command (with its default options)",
+        )
 
     def flag_transaction_as_successful(self):
         self.transaction_was_successful = True
 
     def handle(self, *args, **options) -> None:
-        self.stdout.write("(Re)importing all observations")
+        if options["incremental"]:
+            self.stdout.write("Importing the changes in observations")
+        else:
+            self.stdout.write("(Re)importing all observations")
+        self.observations_table_is_partitioned = observations_table_is_partitioned()
+
+        resume_data_import = None
+        if options["resume"] is not None:
+            if options["incremental"]:
+                raise CommandError("--resume can't be used with --incremental")
+            try:
+                resume_data_import = DataImport.objects.get(
+                    pk=options["resume"], staging=True
+                )
+            except DataImport.DoesNotExist:
+                raise CommandError(
+                    f"There's no staging data import with id {options['resume']}"
+                )
+            if not options["source_dwca"] and not os.path.exists(
+                resume_data_import.source_archive_path
+            ):
+                raise CommandError(
+                    f"The DwC-A file of the interrupted import ({resume_data_import.source_archive_path}) is not "
+                    f"available anymore, please provide it with --source-dwca"
+                )
+        else:
+            self._discard_staging_imports()
 
         # 1. Data preparation / download
         gbif_predicate = None
         if options["source_dwca"]:
             self.stdout.write("Using a user-provided DWCA file")
-            source_data_path = options["source_dwca"].name
+            source_data_path = os.path.abspath(options["source_dwca"].name)
+        elif resume_data_import is not None:
+            self.stdout.write("Using the DWCA file of the interrupted import")
+            source_data_path = resume_data_import.source_archive_path
         else:
             self.stdout.write(
-                "No DWCA file provided, we'll generate and get a new GBIF download"
+                "No DWCA file provided, we'll use a GBIF download (from the local cache or a new one)"
+            )
+            gbif_predicate = build_gbif_predicate(
+                country_code=settings.RIPARIAS["TARGET_COUNTRY_CODE"],
+                species_list=Species.objects.all(),
+            )
+            with self.metrics.stage("download"):
+                source_data_path = self._get_gbif_download(gbif_predicate)
+
+        if options["incremental"]:
+            current_data_import = self._import_incrementally(
+                source_data_path,
+                gbif_predicate,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+            )
+        elif options["zero_downtime"] or resume_data_import is not None:
+            current_data_import = self._import_with_zero_downtime(
+                source_data_path,
+                gbif_predicate,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                resume_data_import=resume_data_import,
+            )
+        else:
+            current_data_import = self._import_in_maintenance_mode(
+                source_data_path,
+                gbif_predicate,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
             )
 
+        if self.transaction_was_successful:
+            self._refresh_hexagon_aggregates(current_data_import)
+
+        self.stdout.write("Sending email report")
+        if self.transaction_was_successful:
+            send_successful_import_email()
+        else:
+            send_error_import_email()
+
+        if options["seed_tiles"] and self.transaction_was_successful:
+            tiles_cache = get_tiles_cache()
+            if tiles_cache is None or not tiles_cache_is_shared(tiles_cache):
+                # The import succeeded, don't turn it into a failure
+                self.stdout.write(
+                    "Not seeding the tiles cache: it is disabled or local to each process"
+                )
+            else:
+                self.stdout.write("Seeding the tiles cache")
+                call_command("seed_tiles", stdout=self.stdout, stderr=self.stderr)
+
+    def _get_gbif_download(self, gbif_predicate: Dict) -> str:
+        """Return the path of a GBIF download for this predicate, from the local cache if we already got one today"""
+        today = timezone.localdate()
+        archive_path = gbif_download_cache_path(gbif_predicate, today)
+        if archive_path.exists():
+            self.stdout.write(
+                f"Reusing a GBIF download from the local cache: {archive_path}"
+            )
+        else:
             self.stdout.write(
                 "Triggering a GBIF download and waiting for it - this can be long..."
             )
-            tmp_file = tempfile.NamedTemporaryFile()
-            source_data_path = tmp_file.name
+            archive_path.parent.mkdir(parents=True, exist_ok=True)
+            # Renamed once complete, so an interrupted download doesn't end up in the cache
+            partial_archive_path = archive_path.with_name(f"{archive_path.name}.part")
             # This might takes several minutes...
-            gbif_predicate = build_gbif_predicate(
-                country_code=settings.RIPARIAS["TARGET_COUNTRY_CODE"],
-                species_list=Species.objects.all(),
-            )
             download_gbif_occurrences(
                 gbif_predicate,
                 username=settings.RIPARIAS["GBIF_USERNAME"],
                 password=settings.RIPARIAS["GBIF_PASSWORD"],
-                output_path=source_data_path,
+                output_path=str(partial_archive_path),
             )
-            self.stdout.write("Observations downloaded")
+            partial_archive_path.rename(archive_path)
+            self.stdout.write(f"Observations downloaded to {archive_path}")
+
+            for deleted_path in prune_gbif_downloads_cache(today):
+                self.stdout.write(f"Deleted old cached GBIF download {deleted_path}")
 
+        return str(archive_path)
+
+    def _import_in_maintenance_mode(
+        self,
+        source_data_path: str,
+        gbif_predicate: Optional[Dict],
+        batch_size: int,
+        workers: int,
+    ) -> DataImport:
         self.stdout.write(
             "We now have a (locally accessible) source dwca, real import is starting. We'll use a transaction and put "
             "the website in maintenance mode"
@@ -283,39 +1204,221 @@ class Command(BaseCommand):
             transaction.on_commit(self.flag_transaction_as_successful)
 
             # 2. Create the DataImport object
-            current_data_import = DataImport.objects.create(
-                start=timezone.now(), gbif_predicate=gbif_predicate
+            current_data_import = self._create_data_import(
+                source_data_path, gbif_predicate, staging=False
             )
             self.stdout.write(
                 f"Created a new DataImport object: #{current_data_import.pk}"
             )
 
             # 3. Import data from DwCA (observations + GBIF download ID)
-            with DwCAReader(source_data_path) as dwca:
+            self._load_observations(
+                source_data_path, current_data_import, batch_size, workers
+            )
+
+            # 4. Replace previous observations and finalize the DataImport object
+            self._activate(current_data_import)
+
+        self.stdout.write("Leaving maintenance mode.")
+        set_maintenance_mode(False)
+        return current_data_import
+
+    def _import_with_zero_downtime(
+        self,
+        source_data_path: str,
+        gbif_predicate: Optional[Dict],
+        batch_size: int,
+        workers: int,
+        resume_data_import: Optional[DataImport] = None,
+    ) -> DataImport:
+        self.stdout.write(
+            "We now have a (locally accessible) source dwca, real import is starting. Observations will be staged "
+            "while the website keeps serving the previous import"
+        )
+
+        # 2. Create the DataImport object: its observations stay hidden until it's completed
+        if resume_data_import is None:
+            with transaction.atomic():
+                current_data_import = self._create_data_import(
+                    source_data_path, gbif_predicate, staging=True
+                )
+            self.stdout.write(
+                f"Created a new (staging) DataImport object: #{current_data_import.pk}"
+            )
+        else:
+            current_data_import = resume_data_import
+            self.stdout.write(
+                f"Resuming the (staging) DataImport object: #{current_data_import.pk}"
+            )
+
+        try:
+            # 3. Import data from DwCA (observations + GBIF download ID). Each chunk of observations is committed
+            # with a checkpoint, so an interrupted import can be resumed
+            self._load_observations(
+                source_data_path, current_data_import, batch_size, workers
+            )
+
+            # 4. Switch to the new observations in a short transaction
+            with transaction.atomic():
+                transaction.on_commit(self.flag_transaction_as_successful)
+                with connection.cursor() as cursor:
+                    # Users keep commenting/viewing the previous observations during the import: we make sure nothing
+                    # is added between the migration of linked entities and the deletion of the previous observations
+                    cursor.execute(
+                        f"LOCK TABLE {OBSERVATIONCOMMENTS_TABLE_NAME}, {OBSERVATIONVIEWS_TABLE_NAME} "
+                        f"IN SHARE ROW EXCLUSIVE MODE"
+                    )
+                self._activate(current_data_import)
+        except Exception:
+            self.stdout.write(
+                f"Error during the import. The staged observations are kept (and hidden): run the command again with "
+                f"--resume {current_data_import.pk} and the same DwC-A file to continue it"
+            )
+            raise
+        return current_data_import
+
+    def _discard_staging_imports(self) -> None:
+        """Delete the data imports (and their observations) that are still staging after a failed import"""
+        for data_import in DataImport.objects.filter(staging=True):
+            self.stdout.write(f"Discarding the unfinished {data_import}")
+            with transaction.atomic():
+                # Not through the ORM, that would load (and cascade) the observations one by one
+                delete_data_import_observations(data_import.pk)
+                data_import.delete()
+
+    def _import_incrementally(
+        self,
+        source_data_path: str,
+        gbif_predicate: Optional[Dict],
+        batch_size: int,
+        workers: int,
+    ) -> DataImport:
+        self.stdout.write(
+            "We now have a (locally accessible) source dwca, incremental import is starting. We'll use a transaction "
+            "but no maintenance mode: the website sees all changes at once when it's committed"
+        )
+
+        with transaction.atomic():
+            transaction.on_commit(self.flag_transaction_as_successful)
+
+            current_data_import = self._create_data_import(
+                source_data_path, gbif_predicate, staging=False
+            )
+            self.stdout.write(
+                f"Created a new DataImport object: #{current_data_import.pk}"
+            )
+
+            with StreamingDwCAReader(source_data_path) as dwca:
                 current_data_import.set_gbif_download_id(
                     extract_gbif_download_id_from_dwca(dwca)
                 )
-                current_data_import.skipped_observations_counter = (
-                    self._import_all_observations_from_dwca(dwca, current_data_import)
+                report = self._apply_dwca_incrementally(
+                    dwca, current_data_import, batch_size=batch_size, workers=workers
+                )
+
+            self.stdout.write(
+                f"{report.new_observations_counter} new, {report.updated_observations_counter} updated, "
+                f"{report.unchanged_observations_counter} unchanged and {report.deleted_observations_counter} deleted "
+                f"observations ({current_data_import.skipped_observations_counter} skipped)"
+            )
+            self._complete(current_data_import)
+        return current_data_import
+
+    def _create_data_import(
+        self, source_data_path: str, gbif_predicate: Optional[Dict], staging: bool
+    ) -> DataImport:
+        """Create the DataImport object (and its partition if the observations table is partitioned)"""
+        data_import = DataImport.objects.create(
+            start=timezone.now(),
+            gbif_predicate=gbif_predicate,
+            staging=staging,
+            source_archive_path=source_data_path,
+        )
+        if self.observations_table_is_partitioned:
+            create_observations_partition(data_import)
+        return data_import
+
+    def _load_observations(
+        self,
+        source_data_path: str,
+        current_data_import: DataImport,
+        batch_size: int,
+        workers: int,
+    ) -> None:
+        """Load the DwC-A observations for current_data_import, and reconcile them with the previous imports"""
+        with StreamingDwCAReader(source_data_path) as dwca:
+            gbif_download_id = extract_gbif_download_id_from_dwca(dwca)
+            if current_data_import.checkpoint_row_offset == 0:
+                current_data_import.set_gbif_download_id(gbif_download_id)
+            elif gbif_download_id != current_data_import.gbif_download_id:
+                raise CommandError(
+                    f"{current_data_import} was started with GBIF download {current_data_import.gbif_download_id}, "
+                    f"it can't be resumed with download {gbif_download_id}"
+                )
+            else:
+                self.stdout.write(
+                    f"Resuming after row {current_data_import.checkpoint_row_offset}"
                 )
 
+            self._import_all_observations_from_dwca(
+                dwca, current_data_import, batch_size=batch_size, workers=workers
+            )
+
+        self.stdout.write(
+            "All observations imported, now reconciling them with the previous data imports..."
+        )
+        with self.metrics.stage("reconcile"):
+            report = reconcile_with_previous_imports(current_data_import)
+        self.stdout.write(
+            f"{report.replaced_observations_counter} observations replace one from a previous import"
+        )
+        if report.has_conflicts:
             self.stdout.write(
-                "All observations imported, now deleting observations linked to previous data imports..."
+                "WARNING: some observations could not be reconciled (they are treated as new):\n"
+                f"- multiple matches in previous imports: {report.multiple_matches_stable_ids}\n"
+                f"- identical observation is newer: {report.other_is_newer_stable_ids}"
             )
 
-            # 4. Remove previous observations
-            Observation.objects.exclude(data_import=current_data_import).delete()
+    def _activate(self, current_data_import: DataImport) -> None:
+        """Replace the observations from previous imports by the ones from current_data_import"""
+        with self.metrics.stage("migrate_links"):
+            migrate_linked_entities(current_data_import)
+        self.stdout.write(
+            f"Migrated {current_data_import.migrated_comments_counter} comments and "
+            f"{current_data_import.migrated_views_counter} observation views"
+        )
+
+        self.stdout.write(
+            "Now deleting observations linked to previous data imports..."
+        )
+        with self.metrics.stage("delete_old"):
+            if self.observations_table_is_partitioned:
+                retire_observations_partitions(keep_data_import=current_data_import)
+            else:
+                Observation.objects.exclude(data_import=current_data_import).delete()
+
+        self._complete(current_data_import)
 
-            # 4. Finalize the DataImport object
-            self.stdout.write("Updating the DataImport object")
+    def _complete(self, current_data_import: DataImport) -> None:
+        """Finalize current_data_import and record the metrics of the import"""
+        self.stdout.write("Updating the DataImport object")
+        with self.metrics.stage("complete"):
             current_data_import.complete()
-            self.stdout.write("Done.")
+        self._save_metrics(current_data_import)
 
-        self.stdout.write("Leaving maintenance mode.")
-        set_maintenance_mode(False)
+    def _refresh_hexagon_aggregates(self, current_data_import: DataImport) -> None:
+        """Rebuild the hexagon aggregates, once current_data_import is committed
 
-        self.stdout.write("Sending email report")
-        if self.transaction_was_successful:
-            send_successful_import_email()
-        else:
-            send_error_import_email()
+        This is kept out of the import transaction (that may hold locks, see _import_with_zero_downtime()): the map
+        uses the observations table until the aggregates are ready.
+        """
+        self.stdout.write("Refreshing the hexagon aggregates...")
+        with self.metrics.stage("aggregate"):
+            with transaction.atomic():
+                refresh_hexagon_aggregates(current_data_import)
+        self._save_metrics(current_data_import)
+
+    def _save_metrics(self, current_data_import: DataImport) -> None:
+        current_data_import.stage_metrics = self.metrics.as_dict()
+        current_data_import.save(update_fields=["stage_metrics"])
+        self.stdout.write(f"Done. {self.metrics}")
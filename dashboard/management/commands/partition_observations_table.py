@@ -0,0 +1,195 @@
+import copy
+
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from django.db import connection, transaction
+
+from .helpers import (
+    OBSERVATIONS_TABLE_NAME,
+    OBSERVATIONS_DEFAULT_PARTITION_NAME,
+    foreign_keys_referencing_observations,
+    observations_table_is_partitioned,
+    observations_partition_name,
+)
+from dashboard.models import (
+    Observation,
+    Species,
+    Dataset,
+    DataImport,
+    ObservationComment,
+    ObservationView,
+)
+
+UNPARTITIONED_TABLE_NAME = f"{OBSERVATIONS_TABLE_NAME}_unpartitioned"
+PARTITIONED_TABLE_NAME = f"{OBSERVATIONS_TABLE_NAME}_partitioned"
+PARTITIONED_ID_SEQUENCE_NAME = f"{OBSERVATIONS_TABLE_NAME}_part_id_seq"
+
+# (column, referenced table) for the foreign keys of the observations table
+FOREIGN_KEYS = [
+    ("species_id", Species.objects.model._meta.db_table),
+    ("source_dataset_id", Dataset.objects.model._meta.db_table),
+    ("data_import_id", DataImport.objects.model._meta.db_table),
+    ("initial_data_import_id", DataImport.objects.model._meta.db_table),
+]
+
+
+# A partitioned table can only be referenced on its whole primary key (id + data_import_id): the database constraints of
+# those models' observation foreign key are dropped while the table is partitioned (Django still cascades deletes)
+LINKED_MODELS = [ObservationComment, ObservationView]
+
+
+def _set_linked_models_constraints(enabled: bool) -> None:
+    """Restore (enabled=True) or drop the database constraints of the LINKED_MODELS foreign keys to Observation"""
+    with connection.schema_editor(atomic=False) as schema_editor:
+        for Model in LINKED_MODELS:
+            field = Model._meta.get_field("observation")
+            field_without_constraint = copy.copy(field)
+            field_without_constraint.db_constraint = False
+            if enabled:
+                schema_editor.alter_field(Model, field_without_constraint, field)
+            else:
+                schema_editor.alter_field(Model, field, field_without_constraint)
+
+
+def _observations_columns() -> str:
+    return ", ".join(f'"{f.column}"' for f in Observation._meta.local_concrete_fields)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the observations table to a PostgreSQL table partitioned by data import (one list partition per "
+        "import + a default partition), or back to a regular table with --revert. "
+        ""
+        "With a partitioned table, import_observations retires the previous observations by dropping their "
+        "partitions instead of deleting them row by row. The website should be in maintenance mode while this runs."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--revert",
+            action="store_true",
+            help="Convert a partitioned observations table back to a regular table",
+        )
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            if options["revert"]:
+                self._unpartition()
+            else:
+                self._partition()
+
+    def _partition(self) -> None:
+        if observations_table_is_partitioned():
+            raise CommandError("The observations table is already partitioned")
+
+        self.stdout.write(
+            "Dropping the foreign key constraints of comments and views..."
+        )
+        _set_linked_models_constraints(enabled=False)
+        referencing_constraints = foreign_keys_referencing_observations()
+        if referencing_constraints:
+            raise CommandError(
+                f"Unexpected foreign keys reference the observations table ({referencing_constraints})"
+            )
+
+        with connection.cursor() as cursor:
+            self.stdout.write("Creating the partitioned table...")
+            cursor.execute(
+                f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} RENAME TO {UNPARTITIONED_TABLE_NAME}"
+            )
+            cursor.execute(
+                f"CREATE TABLE {OBSERVATIONS_TABLE_NAME} (LIKE {UNPARTITIONED_TABLE_NAME} INCLUDING DEFAULTS) "
+                f"PARTITION BY LIST (data_import_id)"
+            )
+            # The primary key sequence (if any) belongs to the old table, we need our own
+            cursor.execute(
+                f"CREATE SEQUENCE {PARTITIONED_ID_SEQUENCE_NAME} OWNED BY {OBSERVATIONS_TABLE_NAME}.id"
+            )
+            cursor.execute(
+                f"SELECT setval('{PARTITIONED_ID_SEQUENCE_NAME}', "
+                f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {UNPARTITIONED_TABLE_NAME}), false)"
+            )
+            cursor.execute(
+                f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} "
+                f"ALTER COLUMN id SET DEFAULT nextval('{PARTITIONED_ID_SEQUENCE_NAME}')"
+            )
+
+            # Unique constraints on a partitioned table must include the partition key
+            cursor.execute(
+                f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} "
+                f"ADD CONSTRAINT {OBSERVATIONS_TABLE_NAME}_part_pkey PRIMARY KEY (id, data_import_id), "
+                f"ADD CONSTRAINT {OBSERVATIONS_TABLE_NAME}_part_gbif_id_uniq UNIQUE (gbif_id, data_import_id), "
+                f"ADD CONSTRAINT {OBSERVATIONS_TABLE_NAME}_part_stable_id_uniq UNIQUE (stable_id, data_import_id)"
+            )
+            for column, referenced_table in FOREIGN_KEYS:
+                cursor.execute(
+                    f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} "
+                    f"ADD CONSTRAINT {OBSERVATIONS_TABLE_NAME}_part_{column}_fk FOREIGN KEY ({column}) "
+                    f"REFERENCES {referenced_table} (id) DEFERRABLE INITIALLY DEFERRED"
+                )
+                cursor.execute(
+                    f"CREATE INDEX {OBSERVATIONS_TABLE_NAME}_part_{column}_idx "
+                    f"ON {OBSERVATIONS_TABLE_NAME} ({column})"
+                )
+            cursor.execute(
+                f"CREATE INDEX {OBSERVATIONS_TABLE_NAME}_part_location_idx "
+                f"ON {OBSERVATIONS_TABLE_NAME} USING GIST (location)"
+            )
+
+            self.stdout.write("Creating the partitions...")
+            cursor.execute(
+                f"SELECT DISTINCT data_import_id FROM {UNPARTITIONED_TABLE_NAME}"
+            )
+            for (data_import_id,) in cursor.fetchall():
+                cursor.execute(
+                    f"CREATE TABLE {observations_partition_name(data_import_id)} "
+                    f"PARTITION OF {OBSERVATIONS_TABLE_NAME} FOR VALUES IN ({int(data_import_id)})"
+                )
+            cursor.execute(
+                f"CREATE TABLE {OBSERVATIONS_DEFAULT_PARTITION_NAME} PARTITION OF {OBSERVATIONS_TABLE_NAME} DEFAULT"
+            )
+
+            self.stdout.write("Copying the observations...")
+            columns = _observations_columns()
+            cursor.execute(
+                f"INSERT INTO {OBSERVATIONS_TABLE_NAME} ({columns}) SELECT {columns} FROM {UNPARTITIONED_TABLE_NAME}"
+            )
+            cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE_NAME}")
+
+        self.stdout.write("Done: the observations table is now partitioned.")
+
+    def _unpartition(self) -> None:
+        if not observations_table_is_partitioned():
+            raise CommandError("The observations table is not partitioned")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {OBSERVATIONS_TABLE_NAME} RENAME TO {PARTITIONED_TABLE_NAME}"
+            )
+
+        self.stdout.write("Creating a regular table...")
+        # Let Django create the table, so it has the exact same structure (constraints/index names, ...) as before
+        with connection.schema_editor(atomic=False) as schema_editor:
+            schema_editor.create_model(Observation)
+
+        with connection.cursor() as cursor:
+            self.stdout.write("Copying the observations...")
+            columns = _observations_columns()
+            cursor.execute(
+                f"INSERT INTO {OBSERVATIONS_TABLE_NAME} ({columns}) SELECT {columns} FROM {PARTITIONED_TABLE_NAME}"
+            )
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{OBSERVATIONS_TABLE_NAME}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {OBSERVATIONS_TABLE_NAME}), false)"
+            )
+            # Partitions and the sequence are dropped with the table
+            cursor.execute(f"DROP TABLE {PARTITIONED_TABLE_NAME}")
+            # Check the deferred constraints of the copied rows now: the table can't be referenced while it has pending
+            # trigger events
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        self.stdout.write(
+            "Restoring the foreign key constraints of comments and views..."
+        )
+        _set_linked_models_constraints(enabled=True)
+
+        self.stdout.write("Done: the observations table is not partitioned anymore.")
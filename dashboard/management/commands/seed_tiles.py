@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Iterator, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.gis.db.models import Extent
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+from django.db import connection
+from django.http import HttpRequest
+
+from dashboard.models import Area
+from dashboard.tiles_cache import get_tiles_cache, tiles_cache_is_shared
+from dashboard.views.maps import (
+    mvt_tiles_observations,
+    mvt_tiles_observations_hexagon_grid_aggregated,
+    TILES_CACHE_HEADER,
+    WEB_MERCATOR_HALF_WORLD,
+)
+
+DEFAULT_MAX_ZOOM = 12
+DEFAULT_WORKERS = 4
+DEFAULT_TIME_BUDGET_SECONDS = 600
+
+# Both observation layers of the map, unfiltered (= what visitors see first)
+SEEDED_VIEWS = [
+    mvt_tiles_observations_hexagon_grid_aggregated,
+    mvt_tiles_observations,
+]
+
+
+def tiles_covering_extent(
+    extent: Tuple[float, float, float, float], zoom: int
+) -> Iterator[Tuple[int, int]]:
+    """Return the (x, y) coordinates of the tiles that cover this extent (xmin, ymin, xmax, ymax, in DATA_SRID)"""
+    tiles_per_side = 2**zoom
+    tile_size = 2 * WEB_MERCATOR_HALF_WORLD / tiles_per_side
+
+    def tile_index(meters_from_world_edge: float) -> int:
+        return min(max(int(meters_from_world_edge // tile_size), 0), tiles_per_side - 1)
+
+    xmin, ymin, xmax, ymax = extent
+    for x in range(
+        tile_index(xmin + WEB_MERCATOR_HALF_WORLD),
+        tile_index(xmax + WEB_MERCATOR_HALF_WORLD) + 1,
+    ):
+        # Tile rows are numbered from the top
+        for y in range(
+            tile_index(WEB_MERCATOR_HALF_WORLD - ymax),
+            tile_index(WEB_MERCATOR_HALF_WORLD - ymin) + 1,
+        ):
+            yield x, y
+
+
+def _anonymous_request() -> HttpRequest:
+    request = HttpRequest()
+    request.method = "GET"
+    request.user = AnonymousUser()
+    return request
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the unfiltered observation tiles (both layers) over the RIPARIAS study area and store them in the "
+        "tiles cache, so the first visitors after an import don't have to wait for them. Lower zoom levels are "
+        "seeded first, until all tiles are done or the time budget is exhausted. Can be run after each import with "
+        "import_observations --seed-tiles."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--max-zoom",
+            type=int,
+            default=DEFAULT_MAX_ZOOM,
+            help=f"Tiles are seeded from zoom level 0 to this one (default: {DEFAULT_MAX_ZOOM})",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f"Number of tiles rendered simultaneously (default: {DEFAULT_WORKERS})",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=DEFAULT_TIME_BUDGET_SECONDS,
+            help=f"No new tile is rendered after this number of seconds (default: {DEFAULT_TIME_BUDGET_SECONDS})",
+        )
+        parser.add_argument(
+            "--area-ids",
+            type=int,
+            nargs="+",
+            help="Seed the extent of those areas instead of the study area (see RIPARIAS['STUDY_AREA_NAMES'])",
+        )
+
+    def handle(self, *args, **options) -> None:
+        tiles_cache = get_tiles_cache()
+        if tiles_cache is None:
+            raise CommandError(
+                "The tiles cache is disabled, see RIPARIAS['TILES_CACHE_ALIAS']"
+            )
+        if not tiles_cache_is_shared(tiles_cache):
+            raise CommandError(
+                f"The tiles cache ({tiles_cache.__class__.__name__}) is local to each process, tiles seeded by this "
+                f"command wouldn't be seen by the web server processes. Use a shared cache backend."
+            )
+
+        if options["area_ids"]:
+            areas = Area.objects.filter(pk__in=options["area_ids"])
+        else:
+            areas = Area.objects.public().filter(
+                name__in=settings.RIPARIAS["STUDY_AREA_NAMES"]
+            )
+        extent = areas.aggregate(extent=Extent("mpoly"))["extent"]
+        if extent is None:
+            raise CommandError("The areas to seed were not found")
+
+        tiles_queue: queue.Queue = queue.Queue()
+        for zoom in range(options["max_zoom"] + 1):
+            for x, y in tiles_covering_extent(extent, zoom):
+                for view in SEEDED_VIEWS:
+                    tiles_queue.put((view, zoom, x, y))
+        total_tiles = tiles_queue.qsize()
+        self.stdout.write(
+            f"Seeding {total_tiles} tiles (zoom levels 0-{options['max_zoom']}) with {options['workers']} workers"
+        )
+
+        start = time.monotonic()
+        deadline = start + options["time_budget"]
+        cache_statuses: Counter = Counter()
+        cache_statuses_lock = threading.Lock()
+        workers = [
+            threading.Thread(
+                target=self._seed_tiles,
+                args=(tiles_queue, deadline, cache_statuses, cache_statuses_lock),
+            )
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - start
+
+        seeded_tiles = cache_statuses["HIT"] + cache_statuses["MISS"]
+        hit_ratio = cache_statuses["HIT"] / seeded_tiles if seeded_tiles else 0.0
+        tiles_per_second = seeded_tiles / elapsed if elapsed else 0.0
+        self.stdout.write(
+            f"Done in {elapsed:.1f}s: {seeded_tiles} tiles ({tiles_per_second:.1f} tiles/s), "
+            f"{cache_statuses['MISS']} rendered, {cache_statuses['HIT']} already cached (hit ratio: {hit_ratio:.0%})"
+        )
+        skipped_tiles = total_tiles - seeded_tiles
+        if skipped_tiles:
+            self.stdout.write(
+                f"The time budget is exhausted, {skipped_tiles} tiles were not seeded"
+            )
+
+    @staticmethod
+    def _seed_tiles(
+        tiles_queue: queue.Queue,
+        deadline: float,
+        cache_statuses: Counter,
+        cache_statuses_lock: threading.Lock,
+    ) -> None:
+        """Worker: render the tiles from the queue until it's empty or the deadline is passed"""
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    view, zoom, x, y = tiles_queue.get_nowait()
+                except queue.Empty:
+                    return
+                response = view(_anonymous_request(), zoom=zoom, x=x, y=y)
+                with cache_statuses_lock:
+                    cache_statuses[response.headers[TILES_CACHE_HEADER]] += 1
+        finally:
+            # Each worker thread has its own database connection
+            connection.close()
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0006_alter_alert_name_alter_alert_unique_together"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="migrated_comments_counter",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dataimport",
+            name="migrated_views_counter",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0007_dataimport_migrated_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="staging",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.0.6 on 2026-10-18 10:41
+
+from django.db import migrations
+
+
+# This migration used to drop the database constraint of ObservationComment.observation and ObservationView.observation.
+# The constraints are now only dropped while the observations table is partitioned (see partition_observations_table),
+# so it does nothing anymore. It's kept so the migrations stay in sequence and databases that applied it have no
+# orphaned migration record (they can get the constraints back with partition_observations_table, then --revert).
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0008_dataimport_staging"),
+    ]
+
+    operations = []
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0009_observation_linked_entities_no_db_constraint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="observation",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=40),
+        ),
+    ]
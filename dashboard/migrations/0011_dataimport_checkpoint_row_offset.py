@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0010_observation_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="checkpoint_row_offset",
+            field=models.IntegerField(default=0),
+        ),
+    ]
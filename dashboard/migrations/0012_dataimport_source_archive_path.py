@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0011_dataimport_checkpoint_row_offset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="source_archive_path",
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.6 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0012_dataimport_source_archive_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CachedDatasetName",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("gbif_dataset_key", models.CharField(max_length=255, unique=True)),
+                ("name", models.CharField(max_length=255)),
+                ("fetched_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0013_cacheddatasetname"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="skipped_observations_by_reason",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="dataimport",
+            name="stage_metrics",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.0.6 on 2026-10-18 16:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0014_dataimport_stage_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataimport",
+            name="hexagon_aggregates_ready",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="ObservationHexagonAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hex_size_meters", models.IntegerField()),
+                ("hex_i", models.IntegerField()),
+                ("hex_j", models.IntegerField()),
+                ("month", models.DateField()),
+                ("count", models.IntegerField()),
+                (
+                    "source_dataset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="dashboard.dataset",
+                    ),
+                ),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="dashboard.species",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="observationhexagonaggregate",
+            index=models.Index(
+                fields=["hex_size_meters", "hex_i", "hex_j"],
+                name="dashboard_o_hex_siz_6a0160_idx",
+            ),
+        ),
+    ]
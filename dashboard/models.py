@@ -13,6 +13,7 @@ from django.contrib.auth.models import AbstractUser, AnonymousUser
 from django.contrib.gis.db import models
 from django.contrib.gis.db.models.aggregates import Union as AggregateUnion
 from django.core.mail import send_mail
+from django.db import transaction
 from django.db.models import QuerySet, Q
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -22,6 +23,8 @@ from django.utils.timezone import localtime
 from django.utils.translation import gettext_lazy as _
 
 DATA_SRID = 3857  # Let's keep everything in Google Mercator to avoid reprojections
+# Number of observations updated per query when the stable_ids of a dataset are recomputed
+STABLE_IDS_UPDATE_BATCH_SIZE = 2000
 
 
 class User(AbstractUser):
@@ -97,22 +100,73 @@ class Dataset(models.Model):
 
         if self.gbif_dataset_key != self.__original_gbif_dataset_key:
             # We updated the gbif dataset key, so all related observations should have a new stable_id
-            for occ in self.observation_set.all():
-                occ.save()
+            self._update_observations_stable_ids()
 
         self.__original_gbif_dataset_key = self.gbif_dataset_key
 
+    def _update_observations_stable_ids(self) -> None:
+        """Recompute the stable_id of all observations of this dataset, with one query per batch of observations
+
+        Equivalent to saving each observation (see Observation.save()), without fetching the dataset again and
+        writing the observations one by one.
+        """
+        with transaction.atomic():
+            batch = []
+            for observation in self.observation_set.only(
+                "pk", "occurrence_id"
+            ).iterator(chunk_size=STABLE_IDS_UPDATE_BATCH_SIZE):
+                observation.stable_id = Observation.build_stable_id(
+                    observation.occurrence_id, self.gbif_dataset_key
+                )
+                batch.append(observation)
+                if len(batch) >= STABLE_IDS_UPDATE_BATCH_SIZE:
+                    Observation.objects.bulk_update(batch, ["stable_id"])
+                    batch = []
+            if batch:
+                Observation.objects.bulk_update(batch, ["stable_id"])
+
+
+class CachedDatasetName(models.Model):
+    """Dataset name retrieved from the GBIF API (see get_dataset_names_from_gbif_api())"""
+
+    gbif_dataset_key = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.gbif_dataset_key}: {self.name}"
+
 
 class DataImport(models.Model):
     start = models.DateTimeField()
     end = models.DateTimeField(blank=True, null=True)
     completed = models.BooleanField(default=False)
     gbif_download_id = models.CharField(max_length=255, blank=True)
+    # Number of observations published once this import is completed, counted by the import command while it writes
+    # them (after an incremental import, unchanged observations still belong to previous imports but are counted)
     imported_observations_counter = models.IntegerField(default=0)
     skipped_observations_counter = models.IntegerField(default=0)
+    # {reason: number of DwC-A rows skipped for that reason}, see import_observations.row_skip_reason()
+    skipped_observations_by_reason = models.JSONField(default=dict, blank=True)
+    # Comments and observation views moved from the replaced observations to the ones of this import
+    migrated_comments_counter = models.IntegerField(default=0)
+    migrated_views_counter = models.IntegerField(default=0)
     gbif_predicate = models.JSONField(
         blank=True, null=True
     )  # Null if a DwC-A file was provided - no GBIF download
+    # True while observations are loaded in the background (zero-downtime import): they stay hidden from the website
+    # (see ObservationManager.published()) until the import is completed
+    staging = models.BooleanField(default=False)
+    # Number of DwC-A core rows (including skipped ones) whose observations are committed to the database. A staging
+    # import that failed can be resumed from there (see the --resume option of import_observations)
+    checkpoint_row_offset = models.IntegerField(default=0)
+    # Local path of the DwC-A file (a GBIF download from the local cache, or the file provided with --source-dwca)
+    source_archive_path = models.CharField(max_length=1024, blank=True)
+    # Time spent in each stage of the import, throughput and peak memory usage (see import_observations.ImportMetrics).
+    # Null until the import is completed
+    stage_metrics = models.JSONField(blank=True, null=True)
+    # True once ObservationHexagonAggregate has been refreshed with the observations published by this import
+    hexagon_aggregates_ready = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-pk"]
@@ -122,13 +176,22 @@ class DataImport(models.Model):
         self.gbif_download_id = download_id
         self.save()
 
+    def record_skipped_observation(self, reason: str) -> None:
+        """Count a skipped DwC-A row (the entry is not saved)"""
+        self.skipped_observations_counter += 1
+        self.skipped_observations_by_reason[reason] = (
+            self.skipped_observations_by_reason.get(reason, 0) + 1
+        )
+
     def complete(self) -> None:
-        """Method to be called at the end of the import process to finalize this entry"""
+        """Method to be called at the end of the import process to finalize this entry
+
+        If the import was staging, its observations become visible on the website. The counters are maintained by the
+        import command, they're not recomputed here.
+        """
         self.end = timezone.now()
         self.completed = True
-        self.imported_observations_counter = Observation.objects.filter(
-            data_import=self
-        ).count()
+        self.staging = False
         self.save()
 
     def __str__(self) -> str:
@@ -142,10 +205,17 @@ class DataImport(models.Model):
             "id": self.pk,
             "str": self.__str__(),
             "startTimestamp": self.start,
+            "importedObservationsCounter": self.imported_observations_counter,
+            "skippedObservationsCounter": self.skipped_observations_counter,
+            "skippedObservationsByReason": self.skipped_observations_by_reason,
         }
 
 
 class ObservationManager(models.Manager):
+    def published(self) -> QuerySet[Observation]:
+        """Observations that can be shown on the website (= not part of a data import that is still staging)"""
+        return self.get_queryset().filter(data_import__staging=False)
+
     def filtered_from_my_params(
         self,
         species_ids: List[int],
@@ -161,7 +231,7 @@ class ObservationManager(models.Manager):
         # views.maps.JINJASQL_FRAGMENT_FILTER_OBSERVATIONS. Otherwise, observations returned on the map and on other
         # components (table, ...) will be inconsistent.
         # !! If adding new filters, make also sure they are properly documented in the docstrings of "api.py"
-        qs = self.model.objects.all()
+        qs = self.published()
 
         if species_ids:
             qs = qs.filter(species_id__in=species_ids)
@@ -206,6 +276,10 @@ class Observation(models.Model):
     # The computed stable identifier that we can use to identify the same records between data import
     stable_id = models.CharField(max_length=40)
 
+    # Hash of the imported values, used by incremental imports to detect changed records (computed by the
+    # import_observations command)
+    content_hash = models.CharField(max_length=40, blank=True)
+
     species = models.ForeignKey(Species, on_delete=models.CASCADE)
     location = models.PointField(blank=True, null=True, srid=DATA_SRID)
     date = models.DateField()
@@ -413,7 +487,33 @@ class Observation(models.Model):
         return d
 
 
+class ObservationHexagonAggregate(models.Model):
+    """Number of published observations per hexagon of the tile server grid, species, source dataset and month
+
+    There's one set of hexagons per hexagon size of the tile server (see utils.ZOOM_TO_HEX_SIZE), zoom levels with
+    the same size share it. The table is rebuilt once each data import is committed (see
+    import_observations.refresh_hexagon_aggregates()).
+    """
+
+    hex_size_meters = models.IntegerField()
+    # Position of the hexagon in the grid, as returned by ST_HexagonGrid() (the grid is aligned on the SRS origin, so
+    # positions don't depend on the extent the grid was generated for)
+    hex_i = models.IntegerField()
+    hex_j = models.IntegerField()
+    species = models.ForeignKey(Species, on_delete=models.CASCADE)
+    source_dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE)
+    month = models.DateField()  # First day of the month
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["hex_size_meters", "hex_i", "hex_j"]),
+        ]
+
+
 class ObservationComment(models.Model):
+    # The database constraint is dropped while the observations table is partitioned (see the
+    # partition_observations_table command), cascading deletes are then only handled by Django.
     observation = models.ForeignKey(Observation, on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
     text = models.TextField()
@@ -490,6 +590,7 @@ class ObservationView(models.Model):
     - Else: the timestamp of the *first* visit is kept (no sophisticated history mechanism)
     """
 
+    # See ObservationComment.observation for the database constraint
     observation = models.ForeignKey(Observation, on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now_add=True)
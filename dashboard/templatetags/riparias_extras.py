@@ -83,6 +83,13 @@ def js_config_object(context):
             "tileServerUrlTemplate": _build_mvt_url_template(
                 "dashboard:internal-api:maps:mvt-tiles"
             ),
+            "tileServerAggregatedBatchUrlTemplate": reverse(
+                "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated-batch",
+                kwargs={"zoom": 1},
+            ).replace("1", "{z}"),
+            "tileServerBatchUrlTemplate": reverse(
+                "dashboard:internal-api:maps:mvt-tiles-batch", kwargs={"zoom": 1}
+            ).replace("1", "{z}"),
             "observationDetailsUrlTemplate": observation_details_url_template_with_origin,
             "areasUrlTemplate": reverse(
                 "dashboard:internal-api:area-geojson", kwargs={"id": 1}
@@ -139,3 +146,8 @@ def as_link_if_url(value):
         return mark_safe(f'<a href="{value}">{value}</a>')
     else:
         return value
+
+
+@register.filter
+def underscores_to_spaces(value: str) -> str:
+    return value.replace("_", " ")
@@ -0,0 +1,109 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from dashboard.management.commands.generate_synthetic_dwca import (
+    SyntheticDwcaOptions,
+    write_synthetic_dwca,
+)
+from dashboard.management.commands.helpers import StreamingDwCAReader
+from dashboard.management.commands.import_observations import (
+    SkippedRow,
+    parse_row,
+    extract_gbif_download_id_from_dwca,
+)
+from dashboard.models import Species, Observation, DataImport
+
+
+class WriteSyntheticDwcaTest(TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+
+    def _parsed_rows(self, options: SyntheticDwcaOptions) -> list:
+        dwca_path = str(self.tmp_dir / f"synthetic_{options.seed}.zip")
+        write_synthetic_dwca(dwca_path, options)
+        with StreamingDwCAReader(dwca_path) as dwca:
+            self.assertEqual(
+                extract_gbif_download_id_from_dwca(dwca),
+                f"synthetic-{options.rows}-{options.seed}",
+            )
+            return [parse_row(row) for row in dwca]
+
+    def test_rows(self) -> None:
+        rows = self._parsed_rows(
+            SyntheticDwcaOptions(
+                rows=1000,
+                species_weights={1224034: 9, 7972617: 1},
+                datasets=3,
+                missing_coordinates_ratio=0.2,
+            )
+        )
+        self.assertEqual(len(rows), 1000)
+
+        skipped_rows = [r for r in rows if isinstance(r, SkippedRow)]
+        self.assertTrue(150 < len(skipped_rows) < 250)
+        self.assertEqual({r.reason for r in skipped_rows}, {"no_coordinates"})
+
+        parsed_rows = [r for r in rows if not isinstance(r, SkippedRow)]
+        self.assertEqual(len({r.gbif_dataset_key for r in parsed_rows}), 3)
+        lixus_rows = [r for r in parsed_rows if r.taxon_keys[0] == "1224034"]
+        self.assertTrue(0.8 < len(lixus_rows) / len(parsed_rows) < 0.95)
+
+    def test_replaced_ratio(self) -> None:
+        """Archives generated with different seeds share the given proportion of stable_ids"""
+        stable_ids_by_seed = {}
+        for seed in (0, 1):
+            rows = self._parsed_rows(
+                SyntheticDwcaOptions(
+                    rows=500,
+                    species_weights={1224034: 1},
+                    missing_coordinates_ratio=0,
+                    replaced_ratio=0.6,
+                    seed=seed,
+                )
+            )
+            stable_ids_by_seed[seed] = {r.stable_id for r in rows}
+
+        self.assertEqual(len(stable_ids_by_seed[0] & stable_ids_by_seed[1]), 300)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class GenerateSyntheticDwcaCommandTest(TransactionTestCase):
+    def test_archives_can_be_imported(self) -> None:
+        Species.objects.all().delete()
+        Species.objects.create(name="Lixus bardanae", gbif_taxon_key=1224034)
+        Species.objects.create(name="Polydrusus planifrons", gbif_taxon_key=7972617)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for seed in (0, 1):
+                dwca_path = str(Path(tmp_dir) / f"synthetic_{seed}.zip")
+                call_command(
+                    "generate_synthetic_dwca",
+                    dwca_path,
+                    rows=200,
+                    seed=seed,
+                    missing_coordinates_ratio=0,
+                    replaced_ratio=0.5,
+                    stdout=StringIO(),
+                )
+                with open(dwca_path, "rb") as dwca_file:
+                    call_command(
+                        "import_observations", source_dwca=dwca_file, stdout=StringIO()
+                    )
+
+        first_import, second_import = DataImport.objects.order_by("pk")
+        self.assertEqual(Observation.objects.count(), 200)
+        # Half of the observations replace one from the first import
+        self.assertEqual(
+            Observation.objects.filter(initial_data_import=first_import).count(), 100
+        )
+        self.assertEqual(
+            Observation.objects.filter(initial_data_import=second_import).count(), 100
+        )
@@ -0,0 +1,126 @@
+import datetime
+import json
+import multiprocessing
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from django.core.management import CommandError
+from django.test import TestCase, SimpleTestCase
+from django.utils import timezone
+
+from dashboard.management.commands.helpers import (
+    get_dataset_names_from_gbif_api,
+    receive_from_child_process,
+)
+from dashboard.models import CachedDatasetName
+
+STUB_DATASET_TITLES = {
+    "50c9509d-22c7-4a22-a47d-8c48425ef4a7": "iNaturalist research-grade observations",
+    "ce416850-8934-11dc-9962-b8a03c50a862": "Ghent university - Zoology Museum - Insect Collection",
+}
+
+
+class StubGbifApiHandler(BaseHTTPRequestHandler):
+    """Answers /dataset/<key> like the GBIF API, for the datasets in STUB_DATASET_TITLES"""
+
+    def do_GET(self) -> None:
+        self.server.requested_paths.append(self.path)  # type: ignore
+        dataset_key = self.path.removeprefix("/dataset/")
+        if dataset_key in STUB_DATASET_TITLES:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(
+                json.dumps({"title": STUB_DATASET_TITLES[dataset_key]}).encode()
+            )
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, format, *args) -> None:
+        pass  # Keep the test output clean
+
+
+class GetDatasetNamesFromGbifApiTest(TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGbifApiHandler)
+        self.server.requested_paths = []  # type: ignore
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.api_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_names_resolved_and_cached(self) -> None:
+        names = get_dataset_names_from_gbif_api(
+            STUB_DATASET_TITLES.keys(), gbif_api_url=self.api_url
+        )
+        self.assertEqual(names, STUB_DATASET_TITLES)
+        self.assertEqual(len(self.server.requested_paths), 2)  # type: ignore
+        self.assertEqual(CachedDatasetName.objects.count(), 2)
+
+        # Second time: from the database cache
+        names = get_dataset_names_from_gbif_api(
+            STUB_DATASET_TITLES.keys(), gbif_api_url=self.api_url
+        )
+        self.assertEqual(names, STUB_DATASET_TITLES)
+        self.assertEqual(len(self.server.requested_paths), 2)  # type: ignore
+
+    def test_expired_cache_entry(self) -> None:
+        """Cached names older than the TTL are requested again"""
+        CachedDatasetName.objects.create(
+            gbif_dataset_key="50c9509d-22c7-4a22-a47d-8c48425ef4a7",
+            name="Old name",
+            fetched_at=timezone.now() - datetime.timedelta(days=365),
+        )
+
+        names = get_dataset_names_from_gbif_api(
+            ["50c9509d-22c7-4a22-a47d-8c48425ef4a7"], gbif_api_url=self.api_url
+        )
+        self.assertEqual(
+            names,
+            {
+                "50c9509d-22c7-4a22-a47d-8c48425ef4a7": "iNaturalist research-grade observations"
+            },
+        )
+        self.assertEqual(
+            CachedDatasetName.objects.get().name,
+            "iNaturalist research-grade observations",
+        )
+
+    def test_unknown_dataset(self) -> None:
+        """Datasets whose name can't be retrieved are absent from the result, and not cached"""
+        names = get_dataset_names_from_gbif_api(
+            ["unknown", "50c9509d-22c7-4a22-a47d-8c48425ef4a7"],
+            gbif_api_url=self.api_url,
+        )
+        self.assertEqual(list(names.keys()), ["50c9509d-22c7-4a22-a47d-8c48425ef4a7"])
+        self.assertFalse(
+            CachedDatasetName.objects.filter(gbif_dataset_key="unknown").exists()
+        )
+
+
+def _send_and_exit(message, sending_end) -> None:
+    if message is not None:
+        sending_end.send(message)
+    os._exit(0)
+
+
+class ReceiveFromChildProcessTest(SimpleTestCase):
+    def _receive(self, message):
+        context = multiprocessing.get_context("fork")
+        receiving_end, sending_end = context.Pipe(duplex=False)
+        process = context.Process(target=_send_and_exit, args=(message, sending_end))
+        process.start()
+        try:
+            return receive_from_child_process(process, receiving_end)
+        finally:
+            process.join()
+
+    def test_results(self) -> None:
+        self.assertEqual(self._receive((1, 2.0)), (1, 2.0))
+
+    def test_exit_without_results(self) -> None:
+        """A child process that exits without sending anything doesn't block the parent forever"""
+        with self.assertRaises(CommandError):
+            self._receive(None)
@@ -1,14 +1,31 @@
 import datetime
+import tempfile
+from io import StringIO
 from pathlib import Path
 from unittest import mock
 
 import requests_mock
+from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.core.management import call_command
-from django.test import TransactionTestCase, override_settings
+from django.test import TransactionTestCase, TestCase, override_settings
 from django.utils import timezone
+from dwca.read import DwCAReader  # type: ignore
 from maintenance_mode.core import set_maintenance_mode  # type: ignore
 
+from dashboard.management.commands.helpers import (
+    foreign_keys_referencing_observations,
+    observations_partitions_data_import_ids,
+    StreamingDwCAReader,
+)
+from dashboard.management.commands.import_observations import (
+    SpeciesAndDatasetResolver,
+    SkippedRow,
+    iter_parsed_rows,
+    extract_gbif_download_id_from_dwca,
+    import_observations_chunk,
+)
+
 from dashboard.models import (
     Species,
     DataImport,
@@ -17,6 +34,7 @@ from dashboard.models import (
     ObservationComment,
     User,
     ObservationView,
+    ObservationHexagonAggregate,
 )
 
 THIS_SCRIPT_PATH = Path(__file__).parent
@@ -28,6 +46,19 @@ SAMPLE_DATA_PATH = THIS_SCRIPT_PATH / "sample_data"
 )
 class ImportObservationsTest(TransactionTestCase):
     def setUp(self) -> None:
+        # Each test gets an empty cache of GBIF downloads
+        gbif_downloads_cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(gbif_downloads_cache_dir.cleanup)
+        self.gbif_downloads_cache_dir = Path(gbif_downloads_cache_dir.name)
+        settings_override = override_settings(
+            RIPARIAS={
+                **settings.RIPARIAS,
+                "GBIF_DOWNLOADS_CACHE_DIR": self.gbif_downloads_cache_dir,
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
         Species.objects.all().delete()  # There are initially a few species in the database (loaded in data migration)
         self.lixus = Species.objects.create(
             name="Lixus bardanae", gbif_taxon_key=1224034
@@ -115,6 +146,257 @@ class ImportObservationsTest(TransactionTestCase):
         self.assertEqual(totally_new_obs.initial_data_import, latest_di)
         self.assertEqual(totally_new_obs.data_import, latest_di)
 
+    def test_reconciliation_conflict_multiple_matches(self):
+        """If multiple observations from previous imports share a stable_id, the import completes and the new
+        observation is considered as new"""
+        other_di = DataImport.objects.create(start=timezone.now())
+        Observation.objects.create(
+            gbif_id=1,
+            occurrence_id="https://www.inaturalist.org/observations/33366292",
+            source_dataset=Dataset.objects.get(name="iNaturalist"),
+            species=self.polydrusus,
+            date=datetime.date.today() - datetime.timedelta(days=1),
+            data_import=other_di,
+            initial_data_import=other_di,
+            location=Point(5.09513, 50.48941, srid=4326),
+        )
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command("import_observations", source_dwca=gbif_download_file)
+
+        latest_di = DataImport.objects.latest("id")
+        self.assertTrue(latest_di.completed)
+        observation_new_import = Observation.objects.get(
+            occurrence_id="https://www.inaturalist.org/observations/33366292"
+        )
+        self.assertEqual(observation_new_import.initial_data_import, latest_di)
+
+    def test_zero_downtime_import(self) -> None:
+        """With --zero-downtime, the maintenance mode is not used and the import has the same outcome"""
+        with mock.patch(
+            "dashboard.management.commands.import_observations.set_maintenance_mode"
+        ) as mocked_set_maintenance_mode:
+            with open(
+                SAMPLE_DATA_PATH / "gbif_download.zip", "rb"
+            ) as gbif_download_file:
+                call_command(
+                    "import_observations",
+                    source_dwca=gbif_download_file,
+                    zero_downtime=True,
+                )
+            mocked_set_maintenance_mode.assert_not_called()
+
+        latest_di = DataImport.objects.latest("id")
+        self.assertTrue(latest_di.completed)
+        self.assertFalse(latest_di.staging)
+        self.assertEqual(Observation.objects.count(), 7)
+        self.assertEqual(Observation.objects.published().count(), 7)
+        observation_new_import = Observation.objects.get(
+            occurrence_id="https://www.inaturalist.org/observations/33366292"
+        )
+        self.assertEqual(observation_new_import.initial_data_import, self.initial_di)
+        self.assertEqual(
+            ObservationComment.objects.get().observation, observation_new_import
+        )
+
+    def test_zero_downtime_import_failure(self) -> None:
+        """With --zero-downtime, a failure leaves the previous observations untouched and keeps the staged ones hidden"""
+        observations_before = list(Observation.objects.all().order_by("pk"))
+
+        with mock.patch(
+            "dashboard.models.DataImport.complete", side_effect=Exception("Boom!")
+        ):
+            with open(
+                SAMPLE_DATA_PATH / "gbif_download.zip", "rb"
+            ) as gbif_download_file:
+                with self.assertRaises(Exception):
+                    call_command(
+                        "import_observations",
+                        source_dwca=gbif_download_file,
+                        zero_downtime=True,
+                        stdout=StringIO(),
+                    )
+
+        self.assertEqual(
+            list(Observation.objects.published().order_by("pk")), observations_before
+        )
+        staging_di = DataImport.objects.latest("id")
+        self.assertTrue(staging_di.staging)
+        self.assertEqual(Observation.objects.filter(data_import=staging_di).count(), 7)
+        # The comment was not migrated
+        self.assertEqual(
+            ObservationComment.objects.get().observation.data_import, self.initial_di
+        )
+
+    def test_resume(self) -> None:
+        """An interrupted --zero-downtime import can be resumed from its last checkpoint"""
+        # The import fails after the first chunk of 2 observations
+        chunks_counter = 0
+
+        def failing_import_observations_chunk(*args) -> None:
+            nonlocal chunks_counter
+            chunks_counter = chunks_counter + 1
+            if chunks_counter == 2:
+                raise Exception("Boom!")
+            import_observations_chunk(*args)
+
+        with mock.patch(
+            "dashboard.management.commands.import_observations.import_observations_chunk",
+            side_effect=failing_import_observations_chunk,
+        ):
+            with open(
+                SAMPLE_DATA_PATH / "gbif_download.zip", "rb"
+            ) as gbif_download_file:
+                with self.assertRaises(Exception):
+                    call_command(
+                        "import_observations",
+                        source_dwca=gbif_download_file,
+                        zero_downtime=True,
+                        batch_size=2,
+                        stdout=StringIO(),
+                    )
+
+        staging_di = DataImport.objects.latest("id")
+        self.assertTrue(staging_di.staging)
+        self.assertGreater(staging_di.checkpoint_row_offset, 0)
+        self.assertEqual(Observation.objects.filter(data_import=staging_di).count(), 2)
+
+        # The DwC-A file recorded on the data import is used
+        self.assertEqual(
+            staging_di.source_archive_path,
+            str((SAMPLE_DATA_PATH / "gbif_download.zip").absolute()),
+        )
+        call_command(
+            "import_observations",
+            resume=staging_di.pk,
+            batch_size=2,
+            stdout=StringIO(),
+        )
+
+        staging_di.refresh_from_db()
+        self.assertTrue(staging_di.completed)
+        self.assertFalse(staging_di.staging)
+        self.assertEqual(staging_di.checkpoint_row_offset, 13)
+        self.assertEqual(staging_di.skipped_observations_counter, 6)
+        self.assertEqual(
+            staging_di.skipped_observations_by_reason,
+            {"no_year": 1, "no_coordinates": 3, "no_occurrence_id": 1, "absent": 1},
+        )
+        self.assertEqual(Observation.objects.count(), 7)
+        self.assertEqual(
+            ObservationComment.objects.get().observation.data_import, staging_di
+        )
+
+    def test_new_import_discards_staging_imports(self) -> None:
+        """Starting a new import (without --resume) discards the leftovers of an interrupted one"""
+        staging_di = DataImport.objects.create(start=timezone.now(), staging=True)
+        staging_observation = Observation.objects.create(
+            gbif_id=3,
+            occurrence_id="3",
+            source_dataset=Dataset.objects.get(name="iNaturalist"),
+            species=self.lixus,
+            date=datetime.date.today(),
+            data_import=staging_di,
+            initial_data_import=staging_di,
+            location=Point(5.09513, 50.48941, srid=4326),
+        )
+        ObservationView.objects.create(
+            user=User.objects.get(username="testuser"),
+            observation=staging_observation,
+        )
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations", source_dwca=gbif_download_file, stdout=StringIO()
+            )
+
+        self.assertFalse(DataImport.objects.filter(pk=staging_di.pk).exists())
+        self.assertFalse(Observation.objects.filter(occurrence_id="3").exists())
+        self.assertFalse(
+            ObservationView.objects.filter(
+                observation_id=staging_observation.pk
+            ).exists()
+        )
+
+    def test_incremental_import(self) -> None:
+        """With --incremental, only new/changed/disappeared observations are written"""
+        replaced_observation = Observation.objects.get(
+            occurrence_id="https://www.inaturalist.org/observations/33366292"
+        )
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations",
+                source_dwca=gbif_download_file,
+                incremental=True,
+                stdout=StringIO(),
+            )
+
+        first_di = DataImport.objects.latest("id")
+        self.assertTrue(first_di.completed)
+        self.assertEqual(first_di.skipped_observations_counter, 6)
+        self.assertEqual(Observation.objects.count(), 7)
+        # The existing observation has been updated in place (it was created without content hash)
+        updated_observation = Observation.objects.get(
+            occurrence_id="https://www.inaturalist.org/observations/33366292"
+        )
+        self.assertEqual(updated_observation.pk, replaced_observation.pk)
+        self.assertEqual(updated_observation.data_import, first_di)
+        self.assertEqual(updated_observation.initial_data_import, self.initial_di)
+        self.assertEqual(
+            ObservationComment.objects.get().observation, updated_observation
+        )
+        # The observation that disappeared from the DwC-A is deleted, with its views
+        self.assertFalse(Observation.objects.filter(occurrence_id="2").exists())
+        self.assertFalse(
+            ObservationView.objects.filter(
+                pk=self.observation_view_to_delete.pk
+            ).exists()
+        )
+
+        observations_before = list(
+            Observation.objects.all()
+            .order_by("pk")
+            .values_list("pk", "stable_id", "data_import_id")
+        )
+        out = StringIO()
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations",
+                source_dwca=gbif_download_file,
+                incremental=True,
+                stdout=out,
+            )
+
+        # Nothing changed: observations are untouched
+        self.assertIn("0 new, 0 updated, 7 unchanged and 0 deleted", out.getvalue())
+        self.assertEqual(
+            list(
+                Observation.objects.all()
+                .order_by("pk")
+                .values_list("pk", "stable_id", "data_import_id")
+            ),
+            observations_before,
+        )
+        self.assertEqual(
+            DataImport.objects.latest("id").imported_observations_counter, 7
+        )
+
+    def test_parallel_parsing(self) -> None:
+        """The result of an import is the same when rows are parsed in several processes"""
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations", source_dwca=gbif_download_file, workers=3
+            )
+
+        latest_di = DataImport.objects.latest("id")
+        self.assertEqual(latest_di.skipped_observations_counter, 6)
+        self.assertEqual(Observation.objects.count(), 7)
+        self.assertEqual(
+            ObservationComment.objects.get().observation.initial_data_import,
+            self.initial_di,
+        )
+
     def test_transaction(self) -> None:
         """The whole process happens in a transaction: no DB changes are made if an exception occurs near the end
         of the process"""
@@ -172,8 +454,25 @@ class ImportObservationsTest(TransactionTestCase):
         self.assertEqual(
             DataImport.objects.latest("id").skipped_observations_counter, 6
         )
+        self.assertEqual(
+            DataImport.objects.latest("id").skipped_observations_by_reason,
+            {"no_year": 1, "no_coordinates": 3, "no_occurrence_id": 1, "absent": 1},
+        )
         # TODO: more testing to make sure it's the usable ones that were loaded?
 
+    def test_unknown_species_skipped(self) -> None:
+        """Rows whose species is not in the database are skipped (and counted as such)"""
+        self.lixus.delete()
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command("import_observations", source_dwca=gbif_download_file)
+
+        self.assertEqual(Observation.objects.count(), 5)
+        di = DataImport.objects.latest("id")
+        self.assertEqual(di.imported_observations_counter, 5)
+        self.assertEqual(di.skipped_observations_counter, 8)
+        self.assertEqual(di.skipped_observations_by_reason["unknown_species"], 2)
+
     def test_load_observations_values(self) -> None:
         """Imported values look correct"""
         with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
@@ -330,6 +629,15 @@ class ImportObservationsTest(TransactionTestCase):
         self.assertNotEqual(ov.observation_id, previous_observation_id)
         self.assertEqual(ov.observation.stable_id, previous_stable_id)
 
+    def test_migrated_entities_counters(self) -> None:
+        """The number of migrated comments and observation views is recorded on the DataImport"""
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command("import_observations", source_dwca=gbif_download_file)
+
+        di = DataImport.objects.latest("id")
+        self.assertEqual(di.migrated_comments_counter, 1)
+        self.assertEqual(di.migrated_views_counter, 1)
+
     def test_unmigrated_ov_gets_deleted(self) -> None:
         ov_id = self.observation_view_to_delete.id
 
@@ -379,6 +687,62 @@ class ImportObservationsTest(TransactionTestCase):
             Observation.objects.filter(data_import=di).count(),
         )
 
+    def test_stage_metrics(self) -> None:
+        """The time spent in each stage, the throughput and the peak memory usage are recorded"""
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations", source_dwca=gbif_download_file, stdout=StringIO()
+            )
+
+        metrics = DataImport.objects.latest("id").stage_metrics
+        # No download: we used a local DwC-A
+        self.assertEqual(
+            [stage["name"] for stage in metrics["stages"]],
+            [
+                "parse",
+                "resolve",
+                "insert",
+                "reconcile",
+                "migrate_links",
+                "delete_old",
+                "complete",
+                "aggregate",
+            ],
+        )
+        for stage in metrics["stages"]:
+            self.assertGreaterEqual(stage["seconds"], 0)
+        self.assertEqual(metrics["rows"], 13)
+        self.assertGreater(metrics["rows_per_second"], 0)
+        self.assertGreater(metrics["peak_memory_mb"], 0)
+
+    def test_hexagon_aggregates_ready_after_commit(self) -> None:
+        """The hexagon aggregates are rebuilt once the import is committed, then the import is flagged as ready"""
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command(
+                "import_observations", source_dwca=gbif_download_file, stdout=StringIO()
+            )
+
+        di = DataImport.objects.latest("id")
+        self.assertTrue(di.hexagon_aggregates_ready)
+        self.assertTrue(ObservationHexagonAggregate.objects.exists())
+
+    def test_seed_tiles_cache_disabled(self) -> None:
+        """--seed-tiles doesn't turn a successful import into a failure when the tiles cache is disabled"""
+        stdout = StringIO()
+        with self.settings(RIPARIAS={**settings.RIPARIAS, "TILES_CACHE_ALIAS": None}):
+            with open(
+                SAMPLE_DATA_PATH / "gbif_download.zip", "rb"
+            ) as gbif_download_file:
+                call_command(
+                    "import_observations",
+                    source_dwca=gbif_download_file,
+                    seed_tiles=True,
+                    stdout=stdout,
+                )
+
+        self.assertIn("Not seeding the tiles cache", stdout.getvalue())
+        self.assertTrue(DataImport.objects.latest("id").completed)
+
     def test_gbif_request_not_necessary(self) -> None:
         """No HTTP request emitted if the --source-dwca option is used"""
         with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
@@ -424,6 +788,58 @@ class ImportObservationsTest(TransactionTestCase):
                     "https://api.gbif.org/v1/occurrence/download/request/1000",
                 )
 
+    def test_gbif_download_cached(self) -> None:
+        """A GBIF download is kept in the local cache, and reused by the next import of the day"""
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            with requests_mock.Mocker() as m:
+                m.post(
+                    "https://api.gbif.org/v1/occurrence/download/request", text="1000"
+                )
+                m.get(
+                    "https://api.gbif.org/v1/occurrence/download/request/1000",
+                    body=gbif_download_file,
+                )
+
+                call_command("import_observations", stdout=StringIO())
+                first_di = DataImport.objects.latest("id")
+                requests_counter = len(m.request_history)
+
+                call_command("import_observations", stdout=StringIO())
+                second_di = DataImport.objects.latest("id")
+                # No new download
+                self.assertEqual(len(m.request_history), requests_counter)
+
+        self.assertNotEqual(first_di, second_di)
+        self.assertTrue(second_di.completed)
+        self.assertEqual(first_di.source_archive_path, second_di.source_archive_path)
+        cached_archive_path = Path(second_di.source_archive_path)
+        self.assertEqual(cached_archive_path.parent, self.gbif_downloads_cache_dir)
+        self.assertTrue(
+            cached_archive_path.name.endswith(
+                f"_{timezone.localdate().isoformat()}.zip"
+            )
+        )
+        self.assertTrue(cached_archive_path.exists())
+
+    def test_old_gbif_downloads_pruned(self) -> None:
+        """Cached GBIF downloads older than the retention period are deleted after a new download"""
+        old_download = self.gbif_downloads_cache_dir / "0123abc_2020-01-01.zip"
+        old_download.touch()
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            with requests_mock.Mocker() as m:
+                m.post(
+                    "https://api.gbif.org/v1/occurrence/download/request", text="1000"
+                )
+                m.get(
+                    "https://api.gbif.org/v1/occurrence/download/request/1000",
+                    body=gbif_download_file,
+                )
+                call_command("import_observations", stdout=StringIO())
+
+        self.assertFalse(old_download.exists())
+        self.assertEqual(len(list(self.gbif_downloads_cache_dir.glob("*.zip"))), 1)
+
     def test_gbif_predicate_stored(self):
         """In case of GBIF request, the predicate is stored in the DataImport object"""
         with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
@@ -460,3 +876,148 @@ class ImportObservationsTest(TransactionTestCase):
                         }
                     },
                 )
+
+
+class ImportObservationsPartitionedTableTest(ImportObservationsTest):
+    """Same tests as ImportObservationsTest, but with a partitioned observations table"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        call_command("partition_observations_table", stdout=StringIO())
+
+    def tearDown(self) -> None:
+        call_command("partition_observations_table", revert=True, stdout=StringIO())
+        super().tearDown()
+
+    def test_linked_entities_constraints(self) -> None:
+        """The foreign keys of comments and views only lose their constraint while the table is partitioned"""
+        self.assertEqual(foreign_keys_referencing_observations(), [])
+
+        call_command("partition_observations_table", revert=True, stdout=StringIO())
+        self.assertEqual(len(foreign_keys_referencing_observations()), 2)
+        # Partitioned again for tearDown()
+        call_command("partition_observations_table", stdout=StringIO())
+
+    def test_previous_partitions_dropped(self) -> None:
+        self.assertEqual(
+            observations_partitions_data_import_ids(), [self.initial_di.pk]
+        )
+
+        with open(SAMPLE_DATA_PATH / "gbif_download.zip", "rb") as gbif_download_file:
+            call_command("import_observations", source_dwca=gbif_download_file)
+
+        latest_di = DataImport.objects.latest("id")
+        self.assertEqual(observations_partitions_data_import_ids(), [latest_di.pk])
+        self.assertEqual(
+            Observation.objects.filter(data_import=latest_di).count(),
+            Observation.objects.count(),
+        )
+
+
+class SpeciesAndDatasetResolverTest(TestCase):
+    def setUp(self) -> None:
+        Species.objects.all().delete()
+        self.polydrusus = Species.objects.create(
+            name="Polydrusus planifrons", gbif_taxon_key=7972617
+        )
+        self.inaturalist = Dataset.objects.create(
+            name="iNaturalist", gbif_dataset_key="50c9509d-22c7-4a22-a47d-8c48425ef4a7"
+        )
+
+    def test_lookups_without_queries(self) -> None:
+        """Once the resolver is created, known species and datasets are resolved without querying the database"""
+        resolver = SpeciesAndDatasetResolver()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolver.species_for_taxon_keys(("7972617", "", "")), self.polydrusus
+            )
+            self.assertEqual(
+                resolver.dataset_for_key(
+                    "50c9509d-22c7-4a22-a47d-8c48425ef4a7", "iNaturalist"
+                ),
+                self.inaturalist,
+            )
+
+    def test_species_fallback_keys(self) -> None:
+        """acceptedTaxonKey and speciesKey are used if taxonKey is unknown"""
+        resolver = SpeciesAndDatasetResolver()
+        self.assertEqual(
+            resolver.species_for_taxon_keys(("1", "7972617", "")), self.polydrusus
+        )
+        self.assertEqual(
+            resolver.species_for_taxon_keys(("1", "2", "7972617")), self.polydrusus
+        )
+
+    def test_unknown_species(self) -> None:
+        Species.objects.all().delete()
+        resolver = SpeciesAndDatasetResolver()
+        with self.assertRaises(Species.DoesNotExist):
+            resolver.species_for_taxon_keys(("7972617", "", ""))
+
+    def test_unknown_dataset_created_once(self) -> None:
+        self.inaturalist.delete()
+        resolver = SpeciesAndDatasetResolver()
+        dataset = resolver.dataset_for_key(
+            "50c9509d-22c7-4a22-a47d-8c48425ef4a7", "iNaturalist"
+        )
+        self.assertEqual(
+            dataset.gbif_dataset_key, "50c9509d-22c7-4a22-a47d-8c48425ef4a7"
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolver.dataset_for_key(
+                    "50c9509d-22c7-4a22-a47d-8c48425ef4a7", "iNaturalist"
+                ),
+                dataset,
+            )
+
+    def test_unnamed_dataset_recorded(self) -> None:
+        """Datasets created with an empty name are recorded, so their names can be retrieved from the GBIF API"""
+        resolver = SpeciesAndDatasetResolver()
+        resolver.dataset_for_key("50c9509d-22c7-4a22-a47d-8c48425ef4a7", "")
+        self.assertEqual(resolver.unnamed_datasets, {})  # Already known
+
+        dataset = resolver.dataset_for_key("a307e4d7-1de2-4adc-95d5-a0a8d5f57236", "")
+        resolver.dataset_for_key("ce416850-8934-11dc-9962-b8a03c50a862", "Insects")
+        self.assertEqual(
+            resolver.unnamed_datasets,
+            {"a307e4d7-1de2-4adc-95d5-a0a8d5f57236": dataset},
+        )
+
+
+class StreamingDwCAReaderTest(TestCase):
+    def test_same_rows_as_dwca_reader(self) -> None:
+        """The streaming reader returns the same rows as python-dwca-reader (that extracts the archive)"""
+        with DwCAReader(str(SAMPLE_DATA_PATH / "gbif_download.zip")) as dwca:
+            expected_rows_data = [core_row.data for core_row in dwca]
+
+        with StreamingDwCAReader(str(SAMPLE_DATA_PATH / "gbif_download.zip")) as dwca:
+            self.assertEqual([core_row.data for core_row in dwca], expected_rows_data)
+            self.assertEqual(
+                extract_gbif_download_id_from_dwca(dwca), "0076720-210914110416597"
+            )
+
+    def test_line_buffers(self) -> None:
+        """Header lines are skipped and buffers don't exceed the requested size"""
+        with StreamingDwCAReader(str(SAMPLE_DATA_PATH / "gbif_download.zip")) as dwca:
+            self.assertEqual(
+                [len(line_buffer) for line_buffer in dwca.iter_line_buffers(5)],
+                [5, 5, 3],
+            )
+
+
+@mock.patch("dashboard.management.commands.import_observations.ROWS_BUFFER_SIZE", 2)
+class ParallelParsingTest(TestCase):
+    def test_same_rows_as_sequential_parsing(self) -> None:
+        """Rows parsed by worker processes are the same (and in the same order) as when parsed sequentially"""
+        with StreamingDwCAReader(str(SAMPLE_DATA_PATH / "gbif_download.zip")) as dwca:
+            sequential_rows = list(iter_parsed_rows(dwca, workers=1))
+            for workers in (2, 3, 5):
+                self.assertEqual(
+                    list(iter_parsed_rows(dwca, workers=workers)), sequential_rows
+                )
+
+        self.assertEqual(len(sequential_rows), 13)
+        self.assertEqual(
+            len([r for r in sequential_rows if not isinstance(r, SkippedRow)]), 7
+        )
@@ -0,0 +1,145 @@
+import datetime
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.gis.geos import Point, MultiPolygon, Polygon
+from django.core.management import call_command, CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.management.commands.seed_tiles import tiles_covering_extent
+from dashboard.models import Species, DataImport, Dataset, Observation, Area
+from dashboard.tiles_cache import get_tiles_cache
+
+TILES_CACHE_SETTINGS = {
+    "STATICFILES_STORAGE": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        # seed_tiles needs a cache shared with the web server processes
+        "tiles": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), "seed-tiles-tests"),
+        },
+    },
+    "RIPARIAS": {
+        **settings.RIPARIAS,
+        "TILES_CACHE_ALIAS": "tiles",
+        "STUDY_AREA_NAMES": ["Andenne"],
+    },
+}
+
+
+class TilesCoveringExtentTest(TestCase):
+    def test_point(self):
+        andenne = Point(5.09513, 50.48941, srid=4326).transform(3857, clone=True)
+        extent = (andenne.x, andenne.y, andenne.x, andenne.y)
+        self.assertEqual(list(tiles_covering_extent(extent, 0)), [(0, 0)])
+        self.assertEqual(list(tiles_covering_extent(extent, 10)), [(526, 345)])
+
+    def test_extent(self):
+        # A square centered on the origin: the 4 central tiles
+        self.assertEqual(
+            sorted(tiles_covering_extent((-1000, -1000, 1000, 1000), 4)),
+            [(7, 7), (7, 8), (8, 7), (8, 8)],
+        )
+
+    def test_whole_world(self):
+        half_world = 20037508.342789244
+        tiles = list(
+            tiles_covering_extent((-half_world, -half_world, half_world, half_world), 2)
+        )
+        self.assertEqual(len(tiles), 16)
+
+
+@override_settings(**TILES_CACHE_SETTINGS)
+class SeedTilesCommandTest(TransactionTestCase):
+    def setUp(self):
+        get_tiles_cache().clear()
+
+        species = Species.objects.create(
+            name="Procambarus fallax", gbif_taxon_key=8879526, group="CR"
+        )
+        di = DataImport.objects.create(start=timezone.now())
+        di.complete()
+        dataset = Dataset.objects.create(
+            name="Test dataset", gbif_dataset_key="4fa7b334-ce0d-4e88-aaae-2e0c138d049e"
+        )
+        Observation.objects.create(
+            gbif_id=1,
+            occurrence_id="1",
+            species=species,
+            date=datetime.date.today(),
+            data_import=di,
+            initial_data_import=di,
+            source_dataset=dataset,
+            location=Point(5.09513, 50.48941, srid=4326),  # Andenne
+        )
+        Area.objects.create(
+            name="Andenne",
+            mpoly=MultiPolygon(
+                Polygon(
+                    (
+                        (5.08, 50.48),
+                        (5.11, 50.48),
+                        (5.11, 50.50),
+                        (5.08, 50.50),
+                        (5.08, 50.48),
+                    ),
+                    srid=4326,
+                ),
+                srid=4326,
+            ),
+        )
+
+    def test_seed_tiles(self):
+        stdout = StringIO()
+        call_command(
+            "seed_tiles", max_zoom=10, workers=2, stdout=stdout, stderr=StringIO()
+        )
+        # The area is small enough to fit in a single tile at each zoom level: 11 tiles per layer
+        self.assertIn("22 tiles", stdout.getvalue())
+        self.assertIn("tiles/s", stdout.getvalue())
+        self.assertIn("hit ratio: 0%", stdout.getvalue())
+
+        response = self.client.get(
+            reverse(
+                "dashboard:internal-api:maps:mvt-tiles",
+                kwargs={"zoom": 10, "x": 526, "y": 345},
+            )
+        )
+        self.assertEqual(response.headers["X-Tiles-Cache"], "HIT")
+
+        # Second run: everything is already cached
+        stdout = StringIO()
+        call_command(
+            "seed_tiles", max_zoom=10, workers=2, stdout=stdout, stderr=StringIO()
+        )
+        self.assertIn("hit ratio: 100%", stdout.getvalue())
+
+    def test_time_budget(self):
+        stdout = StringIO()
+        call_command(
+            "seed_tiles", max_zoom=10, time_budget=0, stdout=stdout, stderr=StringIO()
+        )
+        self.assertIn("22 tiles were not seeded", stdout.getvalue())
+
+    def test_tiles_cache_disabled(self):
+        with self.settings(RIPARIAS={**settings.RIPARIAS, "TILES_CACHE_ALIAS": None}):
+            with self.assertRaises(CommandError):
+                call_command("seed_tiles", stdout=StringIO())
+
+    def test_process_local_cache_refused(self):
+        with self.settings(
+            CACHES={
+                **TILES_CACHE_SETTINGS["CACHES"],
+                "tiles": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "seed-tiles-tests",
+                },
+            }
+        ):
+            with self.assertRaises(CommandError):
+                call_command("seed_tiles", stdout=StringIO())
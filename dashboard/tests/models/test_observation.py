@@ -82,6 +82,26 @@ class ObservationTests(TestCase):
             location=Point(5.09513, 50.48941, srid=4326),  # Andenne
         )
 
+    def test_published_excludes_staging_imports(self):
+        """Observations of a data import that is still staging are hidden"""
+        self.assertEqual(Observation.objects.published().count(), 2)
+
+        staging_di = DataImport.objects.create(start=timezone.now(), staging=True)
+        Observation.objects.create(
+            gbif_id=3,
+            occurrence_id=SAMPLE_OCCURRENCE_ID,
+            species=self.obs.species,
+            date=datetime.date.today(),
+            data_import=staging_di,
+            initial_data_import=staging_di,
+            source_dataset=self.dataset,
+            location=Point(5.09513, 50.48941, srid=4326),
+        )
+        self.assertEqual(Observation.objects.published().count(), 2)
+
+        staging_di.complete()
+        self.assertEqual(Observation.objects.published().count(), 3)
+
     def test_as_dict_observation_seen_anonymous(self):
         """The as_dict() method does not contains observation_view data for anonymous users"""
         with self.assertRaises(KeyError):
@@ -1,5 +1,8 @@
 import datetime
+
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from django.contrib.gis.geos import Point
 from django.utils import timezone
@@ -62,6 +65,44 @@ class StableIdentifiersTests(TestCase):
         self.obs.refresh_from_db()
         self.assertNotEqual(stable_id_before, self.obs.stable_id)
 
+    def test_dataset_key_change_bulk_update(self):
+        """When the dataset key changes, all stable_ids are recomputed with a number of queries that doesn't depend on
+        the number of observations"""
+        queries_counters = []
+        for observations_counter in (1, 30):
+            dataset = Dataset.objects.create(
+                name=f"Dataset with {observations_counter} observations",
+                gbif_dataset_key=f"dataset-{observations_counter}",
+            )
+            for i in range(observations_counter):
+                Observation.objects.create(
+                    gbif_id=observations_counter * 1000 + i,
+                    occurrence_id=f"occ-{i}",
+                    species=self.species_p_fallax,
+                    date=datetime.date.today(),
+                    data_import=self.obs.data_import,
+                    initial_data_import=self.obs.data_import,
+                    source_dataset=dataset,
+                )
+
+            dataset.gbif_dataset_key = f"new-dataset-{observations_counter}"
+            with CaptureQueriesContext(connection) as context:
+                dataset.save()
+            queries_counters.append(len(context.captured_queries))
+
+            for observation in dataset.observation_set.all():
+                self.assertEqual(
+                    observation.stable_id,
+                    Observation.build_stable_id(
+                        observation.occurrence_id, f"new-dataset-{observations_counter}"
+                    ),
+                )
+
+        self.assertEqual(queries_counters[0], queries_counters[1])
+        # Other observations are untouched
+        self.obs.refresh_from_db()
+        self.assertEqual(self.obs.stable_id, EXPECTED_STABLE_ID)
+
     def test_follows_dataset_change(self):
         """The stable identifier changes if the observation gets linked to another dataset (with a different dataset key)
 
@@ -153,10 +153,24 @@ class InternalApiTests(TestCase):
                     "id": di_id,
                     "str": f"Data import #{di_id} (Feb. 11, 2022, 4:10 p.m.)",
                     "startTimestamp": "2022-02-11T15:10:00Z",
+                    "importedObservationsCounter": 0,
+                    "skippedObservationsCounter": 0,
+                    "skippedObservationsByReason": {},
                 }
             ],
         )
 
+    def test_dataimports_list_json_staging_excluded(self):
+        """Imports still loading in staging mode are not listed"""
+        DataImport.objects.create(start=timezone.now(), staging=True)
+
+        response = self.client.get(
+            reverse("dashboard:internal-api:dataimports-list-json")
+        )
+        self.assertEqual(
+            [entry["id"] for entry in response.json()], [self.__class__.di.pk]
+        )
+
     def test_areas_list_json_anonymous(self):
         """Getting the list of areas as an anonymous user"""
         response = self.client.get(reverse("dashboard:internal-api:areas-list-json"))
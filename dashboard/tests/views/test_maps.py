@@ -1,8 +1,13 @@
+import base64
 import datetime
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.gis.geos import Point, MultiPolygon, Polygon
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 import mapbox_vector_tile
@@ -15,7 +20,12 @@ from dashboard.models import (
     Dataset,
     Area,
     ObservationView,
+    ObservationHexagonAggregate,
 )
+from dashboard.management.commands.import_observations import (
+    refresh_hexagon_aggregates,
+)
+from dashboard.tiles_cache import get_tiles_cache, tiles_cache_key
 
 
 class MapsTestDataMixin(object):
@@ -113,6 +123,13 @@ class MapsTestDataMixin(object):
 class MinMaxPerHexagonTests(MapsTestDataMixin, TestCase):
     """Tests covering the min_max_in_hexagon endpoint"""
 
+    def test_missing_zoom(self):
+        """A request without a (valid) zoom level is a bad request, not a server error"""
+        url = reverse("dashboard:internal-api:maps:mvt-min-max-per-hexagon")
+        for data in ({}, {"zoom": 99}):
+            response = self.client.get(url, data=data)
+            self.assertEqual(response.status_code, 400)
+
     def test_min_max_per_hexagon(self):
         # At zoom level 8, with the initial data: we should have two polygons, both at 1. So min=1 and max=1
         response = self.client.get(
@@ -160,6 +177,18 @@ class MinMaxPerHexagonTests(MapsTestDataMixin, TestCase):
         self.assertEqual(response.json()["min"], 1)
         self.assertEqual(response.json()["max"], 1)
 
+    def test_min_max_per_hexagon_all_zoom_levels(self):
+        """The whole grid is computed at all zoom levels, even the ones with the tiniest hexagons"""
+        for zoom in range(0, 21):
+            response = self.client.get(
+                reverse("dashboard:internal-api:maps:mvt-min-max-per-hexagon"),
+                data={"zoom": zoom},
+            )
+            self.assertEqual(response.status_code, 200)
+            # From zoom level 8, Andenne and Lillois are in different hexagons
+            if zoom >= 8:
+                self.assertEqual(response.json(), {"min": 1, "max": 1})
+
     def test_min_max_per_hexagon_with_species_filter(self):
         # Add a second one in Lillois, but not next to the other one and another species
         Observation.objects.create(
@@ -456,6 +485,76 @@ class MVTServerSingleObsTests(MapsTestDataMixin, MVTServerCommonTestsMixin, Test
             decoded_tile["default"]["features"][0]["properties"]["gbif_id"], "1"
         )
 
+    def test_tiles_thinning(self):
+        """At low zoom levels, observations at the same place are merged in a single feature"""
+        for gbif_id in (3, 4):
+            Observation.objects.create(
+                gbif_id=gbif_id,
+                occurrence_id=str(gbif_id),
+                species=self.__class__.first_species,
+                date=datetime.date.today(),
+                data_import=self.__class__.di,
+                initial_data_import=self.__class__.di,
+                source_dataset=self.__class__.first_dataset,
+                location=Point(5.09513, 50.48941, srid=4326),  # Andenne
+            )
+        stable_ids = dict(Observation.objects.values_list("gbif_id", "stable_id"))
+
+        response = self.client.get(
+            reverse(self.server_url_name, kwargs={"zoom": 10, "x": 526, "y": 345})
+        )
+        features = mapbox_vector_tile.decode(response.content)["default"]["features"]
+        self.assertEqual(len(features), 1)
+        properties = features[0]["properties"]
+        self.assertEqual(properties["count"], 3)
+        self.assertIn(properties["gbif_id"], ["1", "3", "4"])
+        # The stable_id is the one of the same observation (so it can be clicked)
+        self.assertEqual(properties["stable_id"], stable_ids[properties["gbif_id"]])
+
+        # Full detail at high zoom levels
+        response = self.client.get(
+            reverse(self.server_url_name, kwargs={"zoom": 17, "x": 67391, "y": 44173})
+        )
+        features = mapbox_vector_tile.decode(response.content)["default"]["features"]
+        self.assertEqual(
+            sorted(f["properties"]["gbif_id"] for f in features), ["1", "3", "4"]
+        )
+        for feature in features:
+            self.assertNotIn("count", feature["properties"])
+
+    def test_tiles_thinning_keeps_isolated_observations(self):
+        """When the number of features is capped, observations alone in their pixel are kept first"""
+        for gbif_id in (3, 4):
+            Observation.objects.create(
+                gbif_id=gbif_id,
+                occurrence_id=str(gbif_id),
+                species=self.__class__.first_species,
+                date=datetime.date.today(),
+                data_import=self.__class__.di,
+                initial_data_import=self.__class__.di,
+                source_dataset=self.__class__.first_dataset,
+                location=Point(5.09513, 50.48941, srid=4326),  # Andenne
+            )
+        Observation.objects.create(
+            gbif_id=5,
+            occurrence_id="5",
+            species=self.__class__.first_species,
+            date=datetime.date.today(),
+            data_import=self.__class__.di,
+            initial_data_import=self.__class__.di,
+            source_dataset=self.__class__.first_dataset,
+            location=Point(5.10000, 50.49000, srid=4326),  # Andenne, a few pixels away
+        )
+
+        with mock.patch("dashboard.views.maps.POINTS_THINNING_MAX_FEATURES", 1):
+            response = self.client.get(
+                reverse(self.server_url_name, kwargs={"zoom": 10, "x": 526, "y": 345})
+            )
+        features = mapbox_vector_tile.decode(response.content)["default"]["features"]
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]["properties"]["gbif_id"], "5")
+        self.assertEqual(features[0]["properties"]["count"], 1)
+
     def test_tiles_area_filter(self):
         # Case 1: A large view over Wallonia
         base_url = reverse(
@@ -1144,3 +1243,431 @@ class MVTServerAggregatedObsTests(
         )
         decoded_tile = mapbox_vector_tile.decode(response.content)
         self.assertEqual(decoded_tile, {})
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "tiles": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "tiles-tests",
+        },
+    },
+    RIPARIAS={**settings.RIPARIAS, "TILES_CACHE_ALIAS": "tiles"},
+)
+class TilesCacheTests(MapsTestDataMixin, TestCase):
+    """Tests covering the server-side cache of the MVT server"""
+
+    def setUp(self):
+        get_tiles_cache().clear()
+
+    def _get_tile(self, url_name: str, query_string: str = "") -> tuple:
+        """Request a tile, return (decoded tile, number of tile-generating queries)"""
+        url = reverse(url_name, kwargs={"zoom": 2, "x": 2, "y": 1})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"{url}{query_string}")
+        self.assertEqual(response.status_code, 200)
+        mvt_queries = [
+            q for q in ctx.captured_queries if "st_asmvt(" in q["sql"].lower()
+        ]
+        return mapbox_vector_tile.decode(response.content), len(mvt_queries)
+
+    def test_tiles_cached(self):
+        for url_name in (
+            "dashboard:internal-api:maps:mvt-tiles",
+            "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated",
+        ):
+            first_tile, first_queries = self._get_tile(url_name)
+            self.assertEqual(first_queries, 1)
+            second_tile, second_queries = self._get_tile(url_name)
+            self.assertEqual(second_queries, 0)
+            self.assertEqual(first_tile, second_tile)
+
+    def test_min_max_cached(self):
+        url = reverse("dashboard:internal-api:maps:mvt-min-max-per-hexagon")
+        for expected_queries in (1, 0):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, data={"zoom": 8})
+            self.assertEqual(response.json(), {"min": 1, "max": 1})
+            min_max_queries = [
+                q for q in ctx.captured_queries if "MIN(count)" in q["sql"]
+            ]
+            self.assertEqual(len(min_max_queries), expected_queries)
+
+    def test_equivalent_filters_share_entry(self):
+        url_name = "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated"
+        first_dataset_id = self.__class__.first_dataset.pk
+        second_dataset_id = self.__class__.second_dataset.pk
+        _, queries = self._get_tile(
+            url_name,
+            f"?datasetsIds[]={first_dataset_id}&datasetsIds[]={second_dataset_id}",
+        )
+        self.assertEqual(queries, 1)
+        _, queries = self._get_tile(
+            url_name,
+            f"?datasetsIds[]={second_dataset_id}&datasetsIds[]={first_dataset_id}",
+        )
+        self.assertEqual(queries, 0)
+
+        # A different filter has its own entry
+        tile, queries = self._get_tile(url_name, f"?datasetsIds[]={first_dataset_id}")
+        self.assertEqual(queries, 1)
+        self.assertEqual(tile["default"]["features"][0]["properties"]["count"], 1)
+
+    def test_format_version_in_key(self):
+        """Changing TILES_FORMAT_VERSION invalidates the cache entries and the ETags"""
+        key = tiles_cache_key("mvt_tiles", 1, {"zoom": 2})
+        with mock.patch("dashboard.tiles_cache.TILES_FORMAT_VERSION", 999):
+            new_key = tiles_cache_key("mvt_tiles", 1, {"zoom": 2})
+        self.assertNotEqual(key, new_key)
+        self.assertIn(":v999:", new_key)
+
+    def test_status_filter_not_cached(self):
+        self.client.login(username="frusciante", password="12345")
+        url_name = "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated"
+        for _ in range(2):
+            _, queries = self._get_tile(url_name, "?status=seen")
+            self.assertEqual(queries, 1)
+
+    def test_user_area_filter_not_cached(self):
+        """Users can edit their areas at any time: tiles filtered by them are not cached"""
+        user_area = Area.objects.create(
+            name="Frusciante's Andenne",
+            owner=self.__class__.user,
+            mpoly=self.__class__.public_area_andenne.mpoly,
+        )
+        self.client.login(username="frusciante", password="12345")
+        url_name = "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated"
+        for _ in range(2):
+            _, queries = self._get_tile(url_name, f"?areaIds[]={user_area.pk}")
+            self.assertEqual(queries, 1)
+
+        # Public areas are only changed by administrators, their tiles are cached
+        public_area_id = self.__class__.public_area_andenne.pk
+        for expected_queries in (1, 0):
+            _, queries = self._get_tile(url_name, f"?areaIds[]={public_area_id}")
+            self.assertEqual(queries, expected_queries)
+
+    def test_new_entries_when_import_completes(self):
+        url_name = "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated"
+        tile, _ = self._get_tile(url_name)
+        self.assertEqual(tile["default"]["features"][0]["properties"]["count"], 2)
+
+        new_import = DataImport.objects.create(start=timezone.now(), staging=True)
+        Observation.objects.create(
+            gbif_id=3,
+            occurrence_id="3",
+            species=self.__class__.first_species,
+            date=datetime.date.today(),
+            data_import=new_import,
+            initial_data_import=new_import,
+            source_dataset=self.__class__.first_dataset,
+            location=Point(5.09513, 50.48941, srid=4326),  # Andenne
+        )
+        # The new observation isn't visible until the import completes
+        _, queries = self._get_tile(url_name)
+        self.assertEqual(queries, 0)
+
+        # The cache isn't cleared (it may be shared with other caches), the tile has a new entry
+        get_tiles_cache().set("other-entry", b"tile")
+        new_import.complete()
+        self.assertEqual(get_tiles_cache().get("other-entry"), b"tile")
+
+        tile, queries = self._get_tile(url_name)
+        self.assertEqual(queries, 1)
+        self.assertEqual(tile["default"]["features"][0]["properties"]["count"], 3)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class MapDataHttpCachingTests(MapsTestDataMixin, TestCase):
+    """Tests covering the HTTP caching headers and conditional requests of the map endpoints"""
+
+    def setUp(self):
+        self.__class__.di.complete()
+        self.urls = [
+            reverse(
+                "dashboard:internal-api:maps:mvt-tiles",
+                kwargs={"zoom": 2, "x": 2, "y": 1},
+            ),
+            reverse(
+                "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated",
+                kwargs={"zoom": 2, "x": 2, "y": 1},
+            ),
+            reverse("dashboard:internal-api:maps:mvt-min-max-per-hexagon") + "?zoom=8",
+        ]
+
+    def test_headers(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("ETag", response.headers)
+            self.assertIn("Last-Modified", response.headers)
+            self.assertIn("public", response.headers["Cache-Control"])
+            self.assertIn("max-age=600", response.headers["Cache-Control"])
+
+    def test_etag_depends_on_request(self):
+        base_url = reverse(
+            "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated",
+            kwargs={"zoom": 2, "x": 2, "y": 1},
+        )
+        etags = {
+            self.client.get(url).headers["ETag"]
+            for url in (
+                base_url,
+                f"{base_url}?speciesIds[]={self.__class__.first_species.pk}",
+                f"{base_url}?speciesIds[]={self.__class__.second_species.pk}",
+                reverse(
+                    "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated",
+                    kwargs={"zoom": 3, "x": 4, "y": 2},
+                ),
+                reverse(
+                    "dashboard:internal-api:maps:mvt-tiles",
+                    kwargs={"zoom": 2, "x": 2, "y": 1},
+                ),
+            )
+        }
+        self.assertEqual(len(etags), 5)
+
+    def test_not_modified(self):
+        for url in self.urls:
+            etag = self.client.get(url).headers["ETag"]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response.headers["ETag"], etag)
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_modified_after_new_import(self):
+        url = self.urls[1]
+        etag = self.client.get(url).headers["ETag"]
+
+        DataImport.objects.create(start=timezone.now()).complete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_status_filter_private(self):
+        self.client.login(username="frusciante", password="12345")
+        for url in self.urls:
+            separator = "&" if "?" in url else "?"
+            response = self.client.get(f"{url}{separator}status=seen")
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("ETag", response.headers)
+            self.assertIn("private", response.headers["Cache-Control"])
+            self.assertIn("no-cache", response.headers["Cache-Control"])
+            self.assertIn("Cookie", response.headers["Vary"])
+
+    def test_user_area_filter_private(self):
+        user_area = Area.objects.create(
+            name="Frusciante's Andenne",
+            owner=self.__class__.user,
+            mpoly=self.__class__.public_area_andenne.mpoly,
+        )
+        self.client.login(username="frusciante", password="12345")
+        for url in self.urls:
+            separator = "&" if "?" in url else "?"
+            response = self.client.get(f"{url}{separator}areaIds[]={user_area.pk}")
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("ETag", response.headers)
+            self.assertIn("private", response.headers["Cache-Control"])
+
+            # Public areas are the same for everybody
+            response = self.client.get(
+                f"{url}{separator}areaIds[]={self.__class__.public_area_andenne.pk}"
+            )
+            self.assertIn("ETag", response.headers)
+            self.assertIn("public", response.headers["Cache-Control"])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class HexagonAggregatesTests(MapsTestDataMixin, TestCase):
+    """The aggregated tiles and min/max endpoint give the same results with and without the precomputed aggregates"""
+
+    tile_url_name = "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated"
+    min_max_url_name = "dashboard:internal-api:maps:mvt-min-max-per-hexagon"
+
+    def setUp(self):
+        # Same month for both observations, so the date filters below have something to select
+        Observation.objects.update(date=datetime.date(2022, 3, 15))
+
+    def _get(self, url: str) -> tuple:
+        """Return (response data, True if the aggregates table was queried)"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        used_aggregates = any(
+            ObservationHexagonAggregate.objects.model._meta.db_table in q["sql"]
+            for q in ctx.captured_queries
+        )
+        if response.headers["Content-Type"] == "application/json":
+            return response.json(), used_aggregates
+
+        features = mapbox_vector_tile.decode(response.content).get("default", {})
+        return (
+            sorted(
+                (f["properties"]["count"], repr(f["geometry"]["coordinates"]))
+                for f in features.get("features", [])
+            ),
+            used_aggregates,
+        )
+
+    def _urls(self, query_string: str) -> list:
+        urls = [
+            f"{reverse(self.min_max_url_name)}?zoom={zoom}&{query_string}"
+            for zoom in (2, 8, 14)
+        ]
+        for zoom, x, y in ((2, 2, 1), (8, 131, 86), (10, 526, 345)):
+            tile_url = reverse(
+                self.tile_url_name, kwargs={"zoom": zoom, "x": x, "y": y}
+            )
+            urls.append(f"{tile_url}?{query_string}")
+        return urls
+
+    def test_same_results(self):
+        query_strings = [
+            "",
+            f"speciesIds[]={self.__class__.first_species.pk}",
+            f"datasetsIds[]={self.__class__.second_dataset.pk}",
+            "startDate=2022-03-01&endDate=2022-03-31",
+            "startDate=2022-04-01",
+        ]
+        urls = [url for qs in query_strings for url in self._urls(qs)]
+
+        expected_results = []
+        for url in urls:
+            data, used_aggregates = self._get(url)
+            self.assertFalse(used_aggregates)  # Not refreshed yet
+            expected_results.append(data)
+
+        refresh_hexagon_aggregates(self.__class__.di)
+        self.assertTrue(ObservationHexagonAggregate.objects.exists())
+
+        for url, expected in zip(urls, expected_results):
+            data, used_aggregates = self._get(url)
+            self.assertTrue(used_aggregates)
+            self.assertEqual(data, expected, url)
+
+    def test_aggregates_not_used(self):
+        """Filters the aggregates can't express are applied on the observations table"""
+        refresh_hexagon_aggregates(self.__class__.di)
+        self.client.login(username="frusciante", password="12345")
+        for query_string in (
+            f"areaIds[]={self.__class__.public_area_andenne.pk}",
+            "status=seen",
+            f"initialDataImportIds[]={self.__class__.di.pk}",
+            "startDate=2022-03-15",
+            "endDate=2022-03-01",
+        ):
+            for url in self._urls(query_string):
+                _, used_aggregates = self._get(url)
+                self.assertFalse(used_aggregates, url)
+
+    def test_outdated_aggregates_not_used(self):
+        refresh_hexagon_aggregates(self.__class__.di)
+        # A new import, whose aggregates are not refreshed yet
+        DataImport.objects.create(start=timezone.now())
+        for url in self._urls(""):
+            _, used_aggregates = self._get(url)
+            self.assertFalse(used_aggregates)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "tiles": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "batch-tiles-tests",
+        },
+    },
+    RIPARIAS={**settings.RIPARIAS, "TILES_CACHE_ALIAS": "tiles"},
+)
+class MVTBatchTests(MapsTestDataMixin, TestCase):
+    """Tests covering the endpoints returning several tiles at once"""
+
+    # Batch URL name -> single tile URL name
+    url_names = {
+        "dashboard:internal-api:maps:mvt-tiles-batch": "dashboard:internal-api:maps:mvt-tiles",
+        "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated-batch": "dashboard:internal-api:maps:mvt-tiles-hexagon-grid-aggregated",
+    }
+    # Andenne, its neighbours, and a tile far from the observations
+    tiles = ["526/345", "527/345", "526/346", "0/0"]
+
+    def setUp(self):
+        get_tiles_cache().clear()
+
+    def _get_batch(self, url_name: str, tiles: list, query_string: str = "") -> tuple:
+        """Request a batch of zoom 10 tiles, return ({"zoom/x/y": decoded tile}, SQL of the tile-generating queries)"""
+        url = reverse(url_name, kwargs={"zoom": 10})
+        tiles_query_string = "&".join(f"tiles[]={tile}" for tile in tiles)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"{url}?{tiles_query_string}{query_string}")
+        self.assertEqual(response.status_code, 200)
+        mvt_queries = [
+            q["sql"] for q in ctx.captured_queries if "st_asmvt(" in q["sql"].lower()
+        ]
+        return {
+            key: mapbox_vector_tile.decode(base64.b64decode(data))
+            for key, data in response.json()["tiles"].items()
+        }, mvt_queries
+
+    def test_same_tiles_as_single_requests(self):
+        for query_string in ("", f"&speciesIds[]={self.__class__.first_species.pk}"):
+            for batch_url_name, single_url_name in self.url_names.items():
+                batch_tiles, _ = self._get_batch(
+                    batch_url_name, self.tiles, query_string
+                )
+                self.assertEqual(
+                    sorted(batch_tiles.keys()),
+                    sorted(f"10/{tile}" for tile in self.tiles),
+                )
+                # Single tiles are rendered separately
+                get_tiles_cache().clear()
+                for tile in self.tiles:
+                    x, y = tile.split("/")
+                    response = self.client.get(
+                        reverse(single_url_name, kwargs={"zoom": 10, "x": x, "y": y})
+                        + f"?{query_string}"
+                    )
+                    self.assertEqual(
+                        batch_tiles[f"10/{tile}"],
+                        mapbox_vector_tile.decode(response.content),
+                    )
+                self.assertEqual(
+                    len(batch_tiles["10/526/345"]["default"]["features"]), 1
+                )
+                self.assertEqual(batch_tiles["10/0/0"], {})
+
+    def test_single_query(self):
+        for batch_url_name, single_url_name in self.url_names.items():
+            _, queries = self._get_batch(batch_url_name, self.tiles)
+            self.assertEqual(len(queries), 1)
+
+            # Tiles are cached one by one: single tile requests find them too...
+            response = self.client.get(
+                reverse(single_url_name, kwargs={"zoom": 10, "x": 526, "y": 345})
+            )
+            self.assertEqual(response.headers["X-Tiles-Cache"], "HIT")
+            # ...and a new batch only renders the tiles that aren't cached yet
+            batch_tiles, queries = self._get_batch(
+                batch_url_name, ["526/345", "525/345"]
+            )
+            self.assertEqual(len(batch_tiles), 2)
+            self.assertEqual(len(queries), 1)
+            self.assertIn("525", queries[0])
+            self.assertNotIn("526", queries[0])
+
+    def test_invalid_tiles(self):
+        url = reverse(
+            "dashboard:internal-api:maps:mvt-tiles-batch", kwargs={"zoom": 10}
+        )
+        too_many_tiles = "&".join(f"tiles[]={x}/345" for x in range(100))
+        for query_string in ("", "tiles[]=526", "tiles[]=a/b", too_many_tiles):
+            response = self.client.get(f"{url}?{query_string}")
+            self.assertEqual(response.status_code, 400)
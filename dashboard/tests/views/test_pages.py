@@ -50,6 +50,43 @@ class IndexPageTests(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class AboutDataPageTests(TestCase):
+    def test_import_metrics_shown(self):
+        DataImport.objects.create(
+            start=timezone.now(),
+            completed=True,
+            skipped_observations_counter=4,
+            skipped_observations_by_reason={"no_coordinates": 3, "absent": 1},
+            stage_metrics={
+                "stages": [
+                    {"name": "parse", "seconds": 12.345},
+                    {"name": "migrate_links", "seconds": 0.5},
+                ],
+                "rows": 250000,
+                "rows_per_second": 12000,
+                "peak_memory_mb": 87.5,
+            },
+        )
+
+        response = self.client.get(reverse("dashboard:pages:about-data"))
+        self.assertContains(response, "No coordinates: 3")
+        self.assertContains(response, "Absent: 1")
+        self.assertContains(response, "12,000 rows/s, peak memory usage: 87.5 MB")
+        self.assertContains(response, "Parse: 12.3s")
+        self.assertContains(response, "Migrate links: 0.5s")
+
+    def test_import_without_metrics(self):
+        """Imports performed before metrics were recorded are still displayed"""
+        DataImport.objects.create(start=timezone.now(), completed=True)
+
+        response = self.client.get(reverse("dashboard:pages:about-data"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Import performance")
+
+
 @override_settings(
     STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
 )
@@ -0,0 +1,57 @@
+"""Cache for the data rendered by the tile server (see views.maps)
+
+Observations only change when a data import completes, so the rendered tiles can be kept until then: entries are keyed
+by the latest data import. The cache is never cleared: once an import completes, the entries of the previous one are
+simply never requested again, and they go away with the backend eviction (MAX_ENTRIES, TIMEOUT or LRU policy). The
+cache backend can therefore be shared with other caches.
+
+Keys (and the HTTP ETags of the map data, built from them) also contain TILES_FORMAT_VERSION, so a deployment that
+changes the content of the tiles doesn't serve tiles rendered by the previous code.
+
+The cache is one of the Django caches (settings.CACHES), selected by RIPARIAS["TILES_CACHE_ALIAS"] (None: no caching).
+The backend should be shared by all the web server processes and bounded in size: a FileBasedCache (with MAX_ENTRIES)
+or a dedicated Redis instance (with maxmemory and an LRU eviction policy). A LocMemCache keeps a separate copy of the
+tiles in each process, with no bound on its size in bytes: it's only meant for development.
+"""
+
+import hashlib
+import json
+from typing import Optional, Dict, Any
+
+from django.conf import settings
+from django.core.cache import caches, BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Bump this when the content of the rendered tiles (or other map data) changes: layers, properties, thinning, ...
+TILES_FORMAT_VERSION = 2
+
+
+def get_tiles_cache() -> Optional[BaseCache]:
+    """Return the tiles cache, or None if tiles shouldn't be cached"""
+    alias = settings.RIPARIAS.get("TILES_CACHE_ALIAS")
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def tiles_cache_is_shared(tiles_cache: BaseCache) -> bool:
+    """Return True if the tiles stored in this cache by a process can be used by the other ones (see seed_tiles)"""
+    return not isinstance(tiles_cache, (LocMemCache, DummyCache))
+
+
+def tiles_cache_key(layer: str, data_import_id: Optional[int], params: Dict) -> str:
+    """Build the cache key of a tile (or other map data) of this layer, for those query parameters
+
+    Parameters are normalized (empty filters removed, lists sorted), so equivalent requests share their entry.
+    """
+    normalized_params: Dict[str, Any] = {}
+    for name, value in params.items():
+        if value is None or value == [] or value == "":
+            continue
+        normalized_params[name] = sorted(value) if isinstance(value, list) else value
+
+    params_hash = hashlib.sha1(
+        json.dumps(normalized_params, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"tiles:v{TILES_FORMAT_VERSION}:{layer}:{data_import_id}:{params_hash}"
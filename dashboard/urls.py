@@ -36,6 +36,16 @@ maps_api_urls = [
         views.mvt_tiles_observations_hexagon_grid_aggregated,
         name="mvt-tiles-hexagon-grid-aggregated",
     ),
+    path(
+        "tiles/observations/batch/<int:zoom>",
+        views.mvt_tiles_observations_batch,
+        name="mvt-tiles-batch",
+    ),
+    path(
+        "tiles/observations/hexagon-grid-aggregated/batch/<int:zoom>",
+        views.mvt_tiles_observations_hexagon_grid_aggregated_batch,
+        name="mvt-tiles-hexagon-grid-aggregated-batch",
+    ),
 ]
 
 public_api_urls = [
@@ -1,5 +1,36 @@
 import subprocess
 
+# Hexagon size (in meters) of the aggregated map grid (see views.maps) according to the zoom level. Adjust
+# ZOOM_TO_HEX_SIZE_MULTIPLIER to simultaneously configure all zoom levels
+ZOOM_TO_HEX_SIZE_MULTIPLIER = 2
+ZOOM_TO_HEX_SIZE_BASELINE = {
+    0: 640000,
+    1: 320000,
+    2: 160000,
+    3: 80000,
+    4: 40000,
+    5: 20000,
+    6: 10000,
+    7: 5000,
+    8: 2500,
+    9: 1250,
+    10: 675,
+    11: 335,
+    12: 160,
+    13: 80,
+    14: 40,
+    15: 20,
+    16: 10,
+    17: 5,
+    18: 5,
+    19: 5,
+    20: 5,
+}
+ZOOM_TO_HEX_SIZE = {
+    key: value * ZOOM_TO_HEX_SIZE_MULTIPLIER
+    for key, value in ZOOM_TO_HEX_SIZE_BASELINE.items()
+}
+
 
 def readable_string(input_string: str) -> str:
     """Remove multiple whitespaces and \n to make a long string more readable"""
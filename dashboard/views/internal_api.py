@@ -39,9 +39,13 @@ from dashboard.views.jobs import mark_many_observations_as_seen
 def dataimports_list_json(_) -> JsonResponse:
     """A list of all data imports known to the system, in JSON format
 
+    Imports still loading in staging mode are excluded (their observations are hidden).
+
     Order: undetermined
     """
-    return model_to_json_list(DataImport)
+    data_imports = DataImport.objects.filter(staging=False)
+
+    return JsonResponse([di.as_dict for di in data_imports], safe=False)
 
 
 def areas_list_json(request: HttpRequest) -> JsonResponse:
@@ -1,56 +1,75 @@
 """Observations tile server + related endpoints"""
 
+import base64
+import datetime
+from calendar import timegm
+from functools import wraps
 from string import Template
+from typing import Optional, Dict, Callable, Any, Tuple, List, NamedTuple
 
+from django.conf import settings
+from django.core.exceptions import BadRequest
 from django.db import connection
 from django.http import HttpResponse, JsonResponse, HttpRequest
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+    quote_etag,
+)
+from django.utils.http import http_date
+from jinja2 import Template as JinjaTemplate
 from jinjasql import JinjaSql
 
-from dashboard.models import Observation, Area, ObservationView
-from dashboard.utils import readable_string
-from dashboard.views.helpers import filters_from_request, extract_int_request
+from dashboard.models import (
+    Observation,
+    Area,
+    ObservationView,
+    DataImport,
+    ObservationHexagonAggregate,
+)
+from dashboard.tiles_cache import get_tiles_cache, tiles_cache_key
+from dashboard.utils import readable_string, ZOOM_TO_HEX_SIZE
+from dashboard.views.helpers import (
+    filters_from_request,
+    extract_int_request,
+    extract_str_request,
+    extract_array_request,
+    extract_int_array_request,
+)
 
 AREAS_TABLE_NAME = Area.objects.model._meta.db_table
+DATAIMPORTS_TABLE_NAME = DataImport.objects.model._meta.db_table
 OBSERVATIONS_TABLE_NAME = Observation.objects.model._meta.db_table
 OBSERVATIONVIEWS_TABLE_NAME = ObservationView.objects.model._meta.db_table
+HEXAGON_AGGREGATES_TABLE_NAME = ObservationHexagonAggregate.objects.model._meta.db_table
 
 OBSERVATIONS_FIELD_NAME_POINT = "location"
 
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+# ST_AsMVTGeom() defaults: tile resolution, and margin (in the same unit) around the tile where geometries are kept
+MVT_EXTENT = 4096
+MVT_BUFFER = 256
+# Half of the width of the world in Web Mercator (DATA_SRID), in meters
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+# Tiles are displayed at this size by the frontend (OpenLayers)
+TILE_SIZE_PIXELS = 256
+
+# Up to this zoom level, the non-aggregated observations tiles are thinned: observations in the same pixel are merged,
+# and a tile has at most POINTS_THINNING_MAX_FEATURES features. Isolated observations (alone in their pixel) are kept
+# first, since they're often the new arrivals an early warning is about, then the pixels with the most observations.
+# Above this zoom level, tiles have all the observations
+POINTS_THINNING_MAX_ZOOM = 15
+POINTS_THINNING_MAX_FEATURES = 5000
+# Set on cacheable tiles: HIT if the tile comes from the tiles cache, MISS if it has been rendered
+TILES_CACHE_HEADER = "X-Tiles-Cache"
+# Maximum number of tiles requested at once from the batch views (a screen of the map is about 20 tiles)
+BATCH_MAX_TILES = 64
+
 # ! Make sure the following formats are in sync
 DB_DATE_EXCHANGE_FORMAT_PYTHON = "%Y-%m-%d"  # To be passed to strftime()
 DB_DATE_EXCHANGE_FORMAT_POSTGRES = "YYYY-MM-DD"  # To be used in SQL queries
 
-# Hexagon size (in meters) according to the zoom level. Adjust ZOOM_TO_HEX_SIZE_MULTIPLIER to simultaneously configure
-# all zoom levels
-ZOOM_TO_HEX_SIZE_MULTIPLIER = 2
-ZOOM_TO_HEX_SIZE_BASELINE = {
-    0: 640000,
-    1: 320000,
-    2: 160000,
-    3: 80000,
-    4: 40000,
-    5: 20000,
-    6: 10000,
-    7: 5000,
-    8: 2500,
-    9: 1250,
-    10: 675,
-    11: 335,
-    12: 160,
-    13: 80,
-    14: 40,
-    15: 20,
-    16: 10,
-    17: 5,
-    18: 5,
-    19: 5,
-    20: 5,
-}
-ZOOM_TO_HEX_SIZE = {
-    key: value * ZOOM_TO_HEX_SIZE_MULTIPLIER
-    for key, value in ZOOM_TO_HEX_SIZE_BASELINE.items()
-}
-
 # !! IMPORTANT !! Make sure the observation filtering here is equivalent to what's done in
 # other places (views.helpers.filtered_observations_from_request). Otherwise, observations returned on the map and on
 # other components (table, ...) will be inconsistent.
@@ -66,7 +85,7 @@ JINJASQL_FRAGMENT_FILTER_OBSERVATIONS = Template(
     , (SELECT mpoly FROM $areas_table_name WHERE $areas_table_name.id IN {{ area_ids | inclause }}) AS areas
     {% endif %}
     WHERE (
-        1 = 1
+        obs.data_import_id NOT IN (SELECT id FROM $dataimports_table_name WHERE staging)
         {% if species_ids %}
             AND obs.species_id IN {{ species_ids | inclause }}
         {% endif %}
@@ -103,52 +122,287 @@ JINJASQL_FRAGMENT_FILTER_OBSERVATIONS = Template(
     areas_table_name=AREAS_TABLE_NAME,
     observations_table_name=OBSERVATIONS_TABLE_NAME,
     observationview_table_name=OBSERVATIONVIEWS_TABLE_NAME,
+    dataimports_table_name=DATAIMPORTS_TABLE_NAME,
     date_format=DB_DATE_EXCHANGE_FORMAT_POSTGRES,
 )
 
+# When use_hexagon_aggregates is set, counts come from the precomputed aggregates instead of the observations table
+# (see _hexagon_aggregates_usable() for the filters they can express). With grid_extent_viewport, the grid covers the
+# tile. Otherwise, it covers all the filtered observations: each one is located in its hexagon(s), and the counts are
+# grouped by hexagon position, without geometries. The cost only depends on the number of observations (not on the
+# extent of the map nor on the size of the hexagons).
 JINJASQL_FRAGMENT_AGGREGATED_GRID = Template(
     """
+    {% if use_hexagon_aggregates %}
+    SELECT SUM(agg.count) AS count
+                    {% if grid_extent_viewport %}
+                        , hexes.geom
+                    FROM
+                        ST_HexagonGrid({{ hex_size_meters }}, ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y)) AS hexes
+                    INNER JOIN $hexagon_aggregates_table_name AS agg
+                    ON agg.hex_i = hexes.i AND agg.hex_j = hexes.j
+                    {% else %}
+                    FROM $hexagon_aggregates_table_name AS agg
+                    {% endif %}
+                    WHERE agg.hex_size_meters = {{ hex_size_meters }}
+                    {% if species_ids %}
+                        AND agg.species_id IN {{ species_ids | inclause }}
+                    {% endif %}
+                    {% if datasets_ids %}
+                        AND agg.source_dataset_id IN {{ datasets_ids | inclause }}
+                    {% endif %}
+                    {% if start_date %}
+                        AND agg.month >= TO_DATE({{ start_date }}, '$date_format')
+                    {% endif %}
+                    {% if end_date %}
+                        AND agg.month <= TO_DATE({{ end_date }}, '$date_format')
+                    {% endif %}
+                    {% if grid_extent_viewport %}
+                    GROUP BY hexes.geom
+                    {% else %}
+                    GROUP BY agg.hex_i, agg.hex_j
+                    {% endif %}
+    {% elif grid_extent_viewport %}
     SELECT COUNT(*), hexes.geom
                     FROM
-                        ST_HexagonGrid(
-                            {{ hex_size_meters }},
-                            {% if grid_extent_viewport %}
-                                ST_TileEnvelope({{ zoom }}, {{ x }}, {{ y }})
-                            {% else %}
-                                ST_SetSRID(ST_EstimatedExtent('$observations_table_name', '$observations_field_name_point'), 3857)
-                            {% endif %} 
-                        ) AS hexes
+                        ST_HexagonGrid({{ hex_size_meters }}, ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y)) AS hexes
                     INNER JOIN ($jinjasql_fragment_filter_observations)
                     AS dashboard_filtered_occ
 
                     ON ST_Intersects(dashboard_filtered_occ.$observations_field_name_point, hexes.geom)
                     GROUP BY hexes.geom
+    {% else %}
+    SELECT COUNT(*)
+                    FROM ($jinjasql_fragment_filter_observations) AS dashboard_filtered_occ
+                    CROSS JOIN LATERAL
+                        ST_HexagonGrid({{ hex_size_meters }}, dashboard_filtered_occ.$observations_field_name_point) AS hexes
+                    WHERE ST_Intersects(dashboard_filtered_occ.$observations_field_name_point, hexes.geom)
+                    GROUP BY hexes.i, hexes.j
+    {% endif %}
 """
 ).substitute(
-    observations_table_name=OBSERVATIONS_TABLE_NAME,
+    hexagon_aggregates_table_name=HEXAGON_AGGREGATES_TABLE_NAME,
+    date_format=DB_DATE_EXCHANGE_FORMAT_POSTGRES,
     observations_field_name_point=OBSERVATIONS_FIELD_NAME_POINT,
     jinjasql_fragment_filter_observations=JINJASQL_FRAGMENT_FILTER_OBSERVATIONS,
 )
 
 
+# A single instance is enough: JinjaSql is thread-safe (bind parameters are collected in thread-local storage)
+JINJASQL = JinjaSql()
+
+
+def compile_sql_template(sql: str) -> JinjaTemplate:
+    """Compile a JinjaSQL template once (at import time): requests then only have to render it"""
+    return JINJASQL.env.from_string(readable_string(sql))
+
+
+# Source (SQL_*) and compiled (SQL_TEMPLATE_*) queries of the views
+#
+# Tile queries render all the requested tiles of a zoom level at once: the `tiles` parameter is a list of (x, y), the
+# query returns a (x, y, mvt) row per tile. Single tiles are a list of one, batches (see _mvt_batch_response()) save
+# a request and a query per tile.
+SQL_FRAGMENT_TILES_VALUES = """
+        WITH tiles(x, y) AS (
+            VALUES {% for x, y in tiles %}({{ x }}, {{ y }}){% if not loop.last %}, {% endif %}{% endfor %}
+        )
+"""
+
+SQL_OBSERVATIONS_TILE = Template(
+    """
+        $tiles_values
+        SELECT tiles.x, tiles.y, tile.mvt FROM tiles
+        CROSS JOIN LATERAL (
+            SELECT ST_AsMVT(mvtgeom.*) AS mvt FROM (
+                {% if thinning_grid_size_meters %}
+                SELECT ST_AsMVTGeom(cells.geom, ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y)), cells.gbif_id, cells.stable_id, cells.count
+                FROM (
+                    SELECT ST_SnapToGrid(tile_observations.location, {{ thinning_grid_size_meters }}) AS geom,
+                           (ARRAY_AGG(tile_observations.gbif_id ORDER BY tile_observations.stable_id))[1] AS gbif_id,
+                           MIN(tile_observations.stable_id) AS stable_id,
+                           COUNT(*) AS count
+                    FROM $tile_observations
+                    GROUP BY 1
+                    ORDER BY COUNT(*) = 1 DESC, COUNT(*) DESC, MIN(tile_observations.stable_id)
+                    LIMIT {{ max_features }}
+                ) AS cells
+                {% else %}
+                SELECT ST_AsMVTGeom(tile_observations.location, ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y)), tile_observations.gbif_id, tile_observations.stable_id
+                FROM $tile_observations
+                {% endif %}
+            ) AS mvtgeom
+        ) AS tile;
+"""
+).substitute(
+    tiles_values=SQL_FRAGMENT_TILES_VALUES,
+    tile_observations=Template(
+        """(
+                        SELECT * FROM ($jinjasql_filtered_observations) AS observations
+                        WHERE observations.location && ST_Expand(ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y), {{ tile_buffer_meters }})
+                    ) AS tile_observations"""
+    ).substitute(jinjasql_filtered_observations=JINJASQL_FRAGMENT_FILTER_OBSERVATIONS),
+)
+SQL_TEMPLATE_OBSERVATIONS_TILE = compile_sql_template(SQL_OBSERVATIONS_TILE)
+
+SQL_AGGREGATED_TILE = Template(
+    """
+        $tiles_values
+        SELECT tiles.x, tiles.y, tile.mvt FROM tiles
+        CROSS JOIN LATERAL (
+            SELECT ST_AsMVT(mvtgeom.*) AS mvt FROM (
+                SELECT ST_AsMVTGeom(grid.geom, ST_TileEnvelope({{ zoom }}, tiles.x, tiles.y)) AS geom, grid.count
+                FROM ($jinjasql_fragment_aggregated_grid) AS grid
+            ) AS mvtgeom
+        ) AS tile;
+"""
+).substitute(
+    tiles_values=SQL_FRAGMENT_TILES_VALUES,
+    jinjasql_fragment_aggregated_grid=JINJASQL_FRAGMENT_AGGREGATED_GRID,
+)
+SQL_TEMPLATE_AGGREGATED_TILE = compile_sql_template(SQL_AGGREGATED_TILE)
+
+SQL_MIN_MAX = Template(
+    """
+        WITH grid AS ($jinjasql_fragment_aggregated_grid)
+        SELECT MIN(count), MAX(count) FROM grid;
+"""
+).substitute(jinjasql_fragment_aggregated_grid=JINJASQL_FRAGMENT_AGGREGATED_GRID)
+SQL_TEMPLATE_MIN_MAX = compile_sql_template(SQL_MIN_MAX)
+
+
+def _filtered_by_user_area(area_ids: Optional[List[int]]) -> bool:
+    """Return True if one of those areas belongs to a user (they can edit it at any time, without a new data import)"""
+    return bool(area_ids) and (
+        Area.objects.filter(pk__in=area_ids, owner__isnull=False).exists()
+    )
+
+
+def _tiles_cacheable(sql_params: Dict) -> bool:
+    """Return True if the map data for those SQL parameters only changes with data imports (so it can be cached)"""
+    return "status" not in sql_params and not _filtered_by_user_area(
+        sql_params.get("area_ids")
+    )
+
+
+def map_data_http_caching(view_func):
+    """Decorator: HTTP caching for the views of this module
+
+    Map data only changes when a data import completes, so responses are validated by an ETag derived from the latest
+    published data import (the same one as the tiles cache, see _latest_published_data_import()) and the request
+    parameters, and by the import end time (Last-Modified). Conditional requests are answered with a 304 after a single
+    (cheap) query. Responses are public, browsers and proxies can reuse them for RIPARIAS["TILES_HTTP_MAX_AGE_SECONDS"]
+    without revalidation.
+
+    Responses filtered by status or by a user area depend on the user (the observations they've seen since, the area
+    they can edit): they're private and always revalidated.
+    """
+
+    @wraps(view_func)
+    def inner(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if extract_str_request(request, "status") or _filtered_by_user_area(
+            extract_int_array_request(request, "areaIds[]")
+        ):
+            response = view_func(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Cookie"])
+            return response
+
+        latest_import = _latest_published_data_import()
+        etag = quote_etag(
+            tiles_cache_key(
+                view_func.__name__,
+                latest_import.id,
+                {**kwargs, **dict(request.GET.lists())},
+            )
+        )
+        last_modified = (
+            timegm(latest_import.end.utctimetuple()) if latest_import.end else None
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.RIPARIAS["TILES_HTTP_MAX_AGE_SECONDS"],
+        )
+        return response
+
+    return inner
+
+
+@map_data_http_caching
 def mvt_tiles_observations(
     request: HttpRequest, zoom: int, x: int, y: int
 ) -> HttpResponse:
-    """Tile server, showing non-aggregated observations. Filters are honoured."""
-    sql_template = readable_string(
-        Template(
-            """
-            WITH mvtgeom AS (
-                SELECT ST_AsMVTGeom(observations.location, ST_TileEnvelope({{ zoom }}, {{ x }}, {{ y }})), observations.gbif_id, observations.stable_id
-                FROM ($jinjasql_filtered_observations) AS observations
-            )
-            SELECT st_asmvt(mvtgeom.*) FROM mvtgeom;
+    """Tile server, showing non-aggregated observations. Filters are honoured.
+
+    Up to POINTS_THINNING_MAX_ZOOM, observations in the same pixel are merged in a single feature (with the gbif_id and
+    stable_id of one of them, and a count property), and the number of features is capped.
     """
-        ).substitute(
-            jinjasql_filtered_observations=JINJASQL_FRAGMENT_FILTER_OBSERVATIONS
-        )
+    return _mvt_response(
+        "observations",
+        SQL_TEMPLATE_OBSERVATIONS_TILE,
+        _observations_tile_sql_params(request, zoom),
+        x,
+        y,
     )
 
+
+@map_data_http_caching
+def mvt_tiles_observations_hexagon_grid_aggregated(
+    request: HttpRequest, zoom: int, x: int, y: int
+) -> HttpResponse:
+    """Tile server, showing observations aggregated by hexagon squares. Filters are honoured."""
+    return _mvt_response(
+        "hexagon-grid-aggregated",
+        SQL_TEMPLATE_AGGREGATED_TILE,
+        _aggregated_tile_sql_params(request, zoom),
+        x,
+        y,
+    )
+
+
+@map_data_http_caching
+def mvt_tiles_observations_batch(request: HttpRequest, zoom: int) -> JsonResponse:
+    """Batch version of mvt_tiles_observations(): several tiles of a zoom level, for the same filters
+
+    See _mvt_batch_response() for the parameters and the response format.
+    """
+    return _mvt_batch_response(
+        request,
+        "observations",
+        SQL_TEMPLATE_OBSERVATIONS_TILE,
+        _observations_tile_sql_params(request, zoom),
+        zoom,
+    )
+
+
+@map_data_http_caching
+def mvt_tiles_observations_hexagon_grid_aggregated_batch(
+    request: HttpRequest, zoom: int
+) -> JsonResponse:
+    """Batch version of mvt_tiles_observations_hexagon_grid_aggregated()
+
+    See _mvt_batch_response() for the parameters and the response format.
+    """
+    return _mvt_batch_response(
+        request,
+        "hexagon-grid-aggregated",
+        SQL_TEMPLATE_AGGREGATED_TILE,
+        _aggregated_tile_sql_params(request, zoom),
+        zoom,
+    )
+
+
+def _observations_tile_sql_params(request: HttpRequest, zoom: int) -> Dict:
+    """SQL parameters of the observations tiles of this zoom level (the tiles themselves are not included)"""
     (
         species_ids,
         datasets_ids,
@@ -159,11 +413,11 @@ def mvt_tiles_observations(
         initial_data_import_ids,
     ) = filters_from_request(request)
 
+    tile_width_meters = 2 * WEB_MERCATOR_HALF_WORLD / 2**zoom
     sql_params = {
         # Map technicalities
         "zoom": zoom,
-        "x": x,
-        "y": y,
+        "tile_buffer_meters": tile_width_meters * MVT_BUFFER / MVT_EXTENT,
         # Filter included observations
         "species_ids": species_ids,
         "datasets_ids": datasets_ids,
@@ -181,28 +435,15 @@ def mvt_tiles_observations(
     if end_date is not None:
         sql_params["end_date"] = end_date.strftime(DB_DATE_EXCHANGE_FORMAT_PYTHON)
 
-    return HttpResponse(
-        _mvt_query_data(sql_template, sql_params),
-        content_type="application/vnd.mapbox-vector-tile",
-    )
+    if zoom <= POINTS_THINNING_MAX_ZOOM:
+        sql_params["thinning_grid_size_meters"] = tile_width_meters / TILE_SIZE_PIXELS
+        sql_params["max_features"] = POINTS_THINNING_MAX_FEATURES
 
+    return sql_params
 
-def mvt_tiles_observations_hexagon_grid_aggregated(
-    request: HttpRequest, zoom: int, x: int, y: int
-) -> HttpResponse:
-    """Tile server, showing observations aggregated by hexagon squares. Filters are honoured."""
-    sql_template = readable_string(
-        Template(
-            """
-            WITH grid AS ($jinjasql_fragment_aggregated_grid),
-                 mvtgeom AS (SELECT ST_AsMVTGeom(geom, ST_TileEnvelope({{ zoom }}, {{ x }}, {{ y }})) AS geom, count FROM grid)
-            SELECT st_asmvt(mvtgeom.*) FROM mvtgeom;
-    """
-        ).substitute(
-            jinjasql_fragment_aggregated_grid=JINJASQL_FRAGMENT_AGGREGATED_GRID
-        )
-    )
 
+def _aggregated_tile_sql_params(request: HttpRequest, zoom: int) -> Dict:
+    """SQL parameters of the aggregated tiles of this zoom level (the tiles themselves are not included)"""
     (
         species_ids,
         datasets_ids,
@@ -218,8 +459,6 @@ def mvt_tiles_observations_hexagon_grid_aggregated(
         "hex_size_meters": ZOOM_TO_HEX_SIZE[zoom],
         "grid_extent_viewport": True,
         "zoom": zoom,
-        "x": x,
-        "y": y,
         # Filter included observations
         "species_ids": species_ids,
         "datasets_ids": datasets_ids,
@@ -237,77 +476,240 @@ def mvt_tiles_observations_hexagon_grid_aggregated(
     if end_date is not None:
         sql_params["end_date"] = end_date.strftime(DB_DATE_EXCHANGE_FORMAT_PYTHON)
 
-    return HttpResponse(
-        _mvt_query_data(sql_template, sql_params),
-        content_type="application/vnd.mapbox-vector-tile",
+    sql_params["use_hexagon_aggregates"] = _hexagon_aggregates_usable(
+        sql_params, start_date, end_date
     )
 
+    return sql_params
+
 
+@map_data_http_caching
 def observation_min_max_in_hex_grid_json(request: HttpRequest):
     """Return the min, max observations count per hexagon, according to the zoom level. JSON format.
 
     This can be useful to dynamically color the grid according to the count
     """
     zoom = extract_int_request(request, "zoom")
-    if zoom is not None:
-        (
-            species_ids,
-            datasets_ids,
-            start_date,
-            end_date,
-            area_ids,
-            status_for_user,
-            initial_data_import_ids,
-        ) = filters_from_request(request)
-
-        sql_template = readable_string(
-            Template(
-                """
-        WITH grid AS ($jinjasql_fragment_aggregated_grid)
-        SELECT MIN(count), MAX(count) FROM grid;
-        """
-            ).substitute(
-                jinjasql_fragment_aggregated_grid=JINJASQL_FRAGMENT_AGGREGATED_GRID
-            )
-        )
+    if zoom not in ZOOM_TO_HEX_SIZE:
+        raise BadRequest("A valid zoom parameter is required")
 
-        sql_params = {
-            "hex_size_meters": ZOOM_TO_HEX_SIZE[zoom],
-            "grid_extent_viewport": False,
-            "species_ids": species_ids,
-            "datasets_ids": datasets_ids,
-            "area_ids": area_ids,
-            "initial_data_import_ids": initial_data_import_ids,
-        }
+    (
+        species_ids,
+        datasets_ids,
+        start_date,
+        end_date,
+        area_ids,
+        status_for_user,
+        initial_data_import_ids,
+    ) = filters_from_request(request)
+
+    sql_params = {
+        "hex_size_meters": ZOOM_TO_HEX_SIZE[zoom],
+        "grid_extent_viewport": False,
+        "species_ids": species_ids,
+        "datasets_ids": datasets_ids,
+        "area_ids": area_ids,
+        "initial_data_import_ids": initial_data_import_ids,
+    }
 
-        if status_for_user and request.user.is_authenticated:
-            sql_params["status"] = status_for_user
-            sql_params["user_id"] = request.user.pk
+    if status_for_user and request.user.is_authenticated:
+        sql_params["status"] = status_for_user
+        sql_params["user_id"] = request.user.pk
 
-        if start_date:
-            sql_params["start_date"] = start_date.strftime(
-                DB_DATE_EXCHANGE_FORMAT_PYTHON
-            )
-        if end_date:
-            sql_params["end_date"] = end_date.strftime(DB_DATE_EXCHANGE_FORMAT_PYTHON)
-
-        j = JinjaSql()
-        query, bind_params = j.prepare_query(sql_template, sql_params)
-        with connection.cursor() as cursor:
-            cursor.execute(query, bind_params)
-            r = cursor.fetchone()
-            return JsonResponse({"min": r[0], "max": r[1]})
-
-
-def _mvt_query_data(sql_template, sql_params):
-    """Return binary data for the SQL query defined by sql_template and sql_params.
-    Only for queries that returns a binary MVT (i.e. starts with "ST_AsMVT")"""
-    j = JinjaSql()
-    query, bind_params = j.prepare_query(sql_template, sql_params)
+    if start_date:
+        sql_params["start_date"] = start_date.strftime(DB_DATE_EXCHANGE_FORMAT_PYTHON)
+    if end_date:
+        sql_params["end_date"] = end_date.strftime(DB_DATE_EXCHANGE_FORMAT_PYTHON)
+
+    sql_params["use_hexagon_aggregates"] = _hexagon_aggregates_usable(
+        sql_params, start_date, end_date
+    )
+
+    min_max, _ = _through_tiles_cache(
+        "min-max",
+        sql_params,
+        lambda: _min_max_query_data(SQL_TEMPLATE_MIN_MAX, sql_params),
+    )
+    return JsonResponse(min_max)
+
+
+def _hexagon_aggregates_usable(
+    sql_params: Dict,
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+) -> bool:
+    """True if the aggregated grid for those parameters can be computed from ObservationHexagonAggregate
+
+    Aggregates are per species, dataset and month: they can't be filtered by area, status or initial data import, and
+    date filters must cover whole months. They also have to be up-to-date with the published observations.
+    """
+    if any(
+        sql_params.get(name)
+        for name in ("area_ids", "status", "initial_data_import_ids")
+    ):
+        return False
+    if start_date is not None and start_date.day != 1:
+        return False
+    if end_date is not None and (end_date + datetime.timedelta(days=1)).day != 1:
+        return False
+
+    return _latest_published_data_import().hexagon_aggregates_ready
+
+
+def _min_max_query_data(
+    sql_template: JinjaTemplate, sql_params: Dict
+) -> Dict[str, Optional[int]]:
+    query, bind_params = JINJASQL.prepare_query(sql_template, sql_params)
     with connection.cursor() as cursor:
         cursor.execute(query, bind_params)
-        if cursor.rowcount != 0:
-            data = cursor.fetchone()[0].tobytes()
-        else:
-            data = ""
-        return data
+        r = cursor.fetchone()
+        return {"min": r[0], "max": r[1]}
+
+
+def _mvt_query_data(
+    sql_template: JinjaTemplate, sql_params: Dict, tiles: List[Tuple[int, int]]
+) -> Dict[Tuple[int, int], bytes]:
+    """Return the binary MVT data of those (x, y) tiles, rendered in a single query
+
+    Only for the tile queries, that return a (x, y, mvt) row per tile.
+    """
+    query, bind_params = JINJASQL.prepare_query(
+        sql_template, {**sql_params, "tiles": tiles}
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(query, bind_params)
+        return {(x, y): mvt.tobytes() for x, y, mvt in cursor.fetchall()}
+
+
+class PublishedDataImport(NamedTuple):
+    id: Optional[int]
+    end: Optional[datetime.datetime]
+    hexagon_aggregates_ready: bool
+
+
+def _latest_published_data_import() -> PublishedDataImport:
+    """The latest data import whose observations are published (not staging), that the map data depends on
+
+    The HTTP validators, the tiles cache keys and the use of the hexagon aggregates are all based on it.
+    """
+    latest_import = (
+        DataImport.objects.filter(staging=False)
+        .order_by("-pk")
+        .values_list("pk", "end", "hexagon_aggregates_ready")
+        .first()
+    )
+    if latest_import is None:
+        return PublishedDataImport(None, None, False)
+    return PublishedDataImport(*latest_import)
+
+
+def _mvt_response(
+    layer: str, sql_template: JinjaTemplate, sql_params: Dict, x: int, y: int
+) -> HttpResponse:
+    """Return the (x, y) tile defined by sql_template and sql_params (see _mvt_query_data()), through the tiles cache
+
+    The TILES_CACHE_HEADER header of cacheable tiles tells if they were found in the cache (HIT) or rendered (MISS).
+    """
+    data, cache_status = _mvt_tiles(layer, sql_template, sql_params, [(x, y)])[(x, y)]
+    response = HttpResponse(data, content_type=MVT_CONTENT_TYPE)
+    if cache_status is not None:
+        response.headers[TILES_CACHE_HEADER] = cache_status
+    return response
+
+
+def _mvt_batch_response(
+    request: HttpRequest,
+    layer: str,
+    sql_template: JinjaTemplate,
+    sql_params: Dict,
+    zoom: int,
+) -> JsonResponse:
+    """Return several tiles of this zoom level, listed in the tiles[] parameter as "x/y" (at most BATCH_MAX_TILES)
+
+    The response maps "zoom/x/y" to the base64-encoded tile: {"tiles": {"12/2100/1380": "GoQC...", ...}}. Tiles are
+    rendered in a single query and go through the tiles cache, as the ones of _mvt_response().
+    """
+    tiles = []
+    for tile in extract_array_request(request, "tiles[]"):
+        try:
+            x, y = (int(coordinate) for coordinate in tile.split("/"))
+        except ValueError:
+            raise BadRequest(f"Invalid tile: {tile}")
+        if (x, y) not in tiles:
+            tiles.append((x, y))
+    if not 0 < len(tiles) <= BATCH_MAX_TILES:
+        raise BadRequest(f"Between 1 and {BATCH_MAX_TILES} tiles can be requested")
+
+    tiles_data = _mvt_tiles(layer, sql_template, sql_params, tiles)
+    return JsonResponse(
+        {
+            "tiles": {
+                f"{zoom}/{x}/{y}": base64.b64encode(data).decode("ascii")
+                for (x, y), (data, _) in tiles_data.items()
+            }
+        }
+    )
+
+
+def _mvt_tiles(
+    layer: str,
+    sql_template: JinjaTemplate,
+    sql_params: Dict,
+    tiles: List[Tuple[int, int]],
+) -> Dict[Tuple[int, int], Tuple[bytes, Optional[str]]]:
+    """Return {(x, y): (binary tile, cache status)} for those tiles, through the tiles cache
+
+    Cached tiles are read at once, the others are rendered in a single query (see _mvt_query_data()). Cache statuses
+    are as in _through_tiles_cache(). Tiles are cached one by one (the key has the x and y parameters), so a tile
+    rendered in a batch is also found by single tile requests, and the other way around.
+    """
+    tiles_cache = get_tiles_cache()
+    if tiles_cache is None or not _tiles_cacheable(sql_params):
+        return {
+            tile: (data, None)
+            for tile, data in _mvt_query_data(sql_template, sql_params, tiles).items()
+        }
+
+    latest_data_import_id = _latest_published_data_import().id
+    keys = {
+        (x, y): tiles_cache_key(
+            layer, latest_data_import_id, {**sql_params, "x": x, "y": y}
+        )
+        for x, y in tiles
+    }
+    cached_data = tiles_cache.get_many(keys.values())
+
+    result = {}
+    for tile, key in keys.items():
+        if key in cached_data:
+            result[tile] = (cached_data[key], "HIT")
+    missing_tiles = [tile for tile in tiles if tile not in result]
+    if missing_tiles:
+        rendered_data = _mvt_query_data(sql_template, sql_params, missing_tiles)
+        tiles_cache.set_many({keys[tile]: data for tile, data in rendered_data.items()})
+        for tile, data in rendered_data.items():
+            result[tile] = (data, "MISS")
+    return result
+
+
+def _through_tiles_cache(
+    layer: str, sql_params: Dict, compute: Callable[[], Any]
+) -> Tuple[Any, Optional[str]]:
+    """Return (the result of compute(), cache status), through the tiles cache (see dashboard.tiles_cache)
+
+    The result is the map data of this layer for those SQL parameters. The cache status is HIT or MISS, or None if
+    the result can't be cached: caching is disabled, it's filtered by status (specific to the user, and changes when
+    they view observations) or by a user area (the user can edit it, the key only has its id).
+    """
+    tiles_cache = get_tiles_cache()
+    if tiles_cache is None or not _tiles_cacheable(sql_params):
+        return compute(), None
+
+    key = tiles_cache_key(layer, _latest_published_data_import().id, sql_params)
+    data = tiles_cache.get(key)
+    if data is not None:
+        return data, "HIT"
+
+    data = compute()
+    tiles_cache.set(key, data)
+    return data, "MISS"
@@ -45,12 +45,14 @@ def about_site_page(request: HttpRequest):
 
 
 def about_data_page(request: HttpRequest):
-    data_imports = DataImport.objects.all().order_by("-start")
+    data_imports = DataImport.objects.filter(staging=False).order_by("-start")
     return render(request, "dashboard/about_data.html", {"data_imports": data_imports})
 
 
 def observation_details_page(request: HttpRequest, stable_id: str):
-    observation = get_object_or_404(Observation, stable_id=stable_id)
+    observation = get_object_or_404(
+        Observation.objects.published(), stable_id=stable_id
+    )
     observation.mark_as_seen_by(request.user)
     first_seen = observation.first_seen_at(request.user)
     origin_url = extract_str_request(request, "origin")
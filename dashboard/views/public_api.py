@@ -39,7 +39,8 @@ def species_per_polygon_json(request: HttpRequest) -> JsonResponse:
     feature = GEOSGeometry(request.GET.get("p"), srid=4326)
 
     annotated_species = Species.objects.filter(
-        observation__location__within=feature.transform(DATA_SRID, clone=True)
+        observation__location__within=feature.transform(DATA_SRID, clone=True),
+        observation__data_import__staging=False,
     ).annotate(num_observations=Count("observation"))
 
     r = []
@@ -27,6 +27,28 @@ RQ_QUEUES = {
     },
 }
 
+# Caches: the "tiles" cache keeps the tiles rendered by the tile server until the next data import. It must be shared
+# by all the web server processes (and by seed_tiles): a FileBasedCache on a local disk, or a Redis instance dedicated
+# to it with a "maxmemory" limit and the "allkeys-lru" eviction policy (don't evict the RQ jobs of RQ_QUEUES):
+#   "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6380",
+# Size bound of the FileBasedCache: MAX_ENTRIES tiles of at most ~100 KB (tiles are thinned/capped, see views.maps),
+# so ~2 GB on disk. Reaching MAX_ENTRIES removes a third of the entries (CULL_FREQUENCY).
+# For development only, a per-process cache can be used instead (each process has its own copy, seed_tiles refuses it):
+#   "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tiles",
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "tiles": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": "/var/tmp/riparias-tiles-cache",
+        # Entries of previous data imports are never requested again, they expire (or are culled by MAX_ENTRIES)
+        "TIMEOUT": 7 * 24 * 3600,
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+}
+RIPARIAS["TILES_CACHE_ALIAS"] = "tiles"
+
 # Email-sending configuration
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "email-smtp.eu-west-1.amazonaws.com"
@@ -177,4 +177,19 @@ LOGGING = {
 
 MARKDOWNX_MARKDOWN_EXTENSIONS = ["markdown.extensions.toc"]
 
-RIPARIAS = {"TARGET_COUNTRY_CODE": "BE"}
+RIPARIAS = {
+    "TARGET_COUNTRY_CODE": "BE",
+    # GBIF downloads are kept there, so import_observations can reuse them (reruns the same day, benchmarks, ...)
+    "GBIF_DOWNLOADS_CACHE_DIR": BASE_DIR / "gbif_downloads_cache",
+    # Cached downloads older than this are deleted when a new one is stored
+    "GBIF_DOWNLOADS_CACHE_RETENTION_DAYS": 7,
+    # Dataset names retrieved from the GBIF API are cached in the database for this long
+    "GBIF_DATASET_NAMES_CACHE_TTL_DAYS": 30,
+    # Alias (in CACHES) of the cache used by the tile server (see dashboard/tiles_cache.py). None: tiles aren't cached
+    "TILES_CACHE_ALIAS": None,
+    # Browsers and proxies can reuse tiles (and other map data) for this long without checking if they're still valid
+    "TILES_HTTP_MAX_AGE_SECONDS": 600,
+    # Public areas that make up the RIPARIAS study area (loaded from Riparias_Official_StudyArea.geojson, see the
+    # load_area command). Tiles are pre-rendered over their extent by the seed_tiles command
+    "STUDY_AREA_NAMES": ["Dijle - Dyle", "Mark - Marcq", "Zenne - Senne"],
+}